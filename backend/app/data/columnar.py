@@ -0,0 +1,143 @@
+import io
+import json
+
+import numpy as np
+
+PARQUET_MAGIC = b"PAR1"
+ARROW_FILE_MAGIC = b"ARROW1"
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+
+CONTENT_TYPES = {
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/x-arrow": "arrow",
+}
+MEDIA_TYPES = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.stream"}
+
+
+class UnsupportedFormat(ValueError):
+    """Upload is in a format this server cannot read (for instance, pyarrow is not installed)."""
+
+
+def pyarrow():
+    try:
+        import pyarrow as pa  # optional: only Parquet / Arrow uploads and outputs need it
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise UnsupportedFormat("Parquet and Arrow support requires the 'pyarrow' package.")
+    return pa
+
+
+def detect_format(file, content_type: str = None) -> str:
+    """``"parquet"``, ``"arrow"`` or ``"csv"``, from the magic bytes first and the content type second."""
+    start = file.tell()
+    head = file.read(8)
+    file.seek(start)
+    if head.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if head.startswith(ARROW_FILE_MAGIC) or head.startswith(ARROW_STREAM_MAGIC):
+        return "arrow"
+    return CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower(), "csv")
+
+
+def column_names(file, fmt: str):
+    """Column names from the Parquet footer or the Arrow schema, without reading any data."""
+    pa = pyarrow()
+    start = file.tell()
+    try:
+        if fmt == "parquet":
+            return pa.parquet.ParquetFile(file).schema_arrow.names
+        return _open_ipc(pa, file).schema.names
+    finally:
+        file.seek(start)
+
+
+def read_batches(file, fmt: str, columns, batch_size: int = None):
+    """Iterate record batches holding only ``columns``; a single ``pyarrow.Table`` when ``batch_size`` is None."""
+    pa = pyarrow()
+    if fmt == "parquet":
+        parquet = pa.parquet.ParquetFile(file)
+        if batch_size is None:
+            yield parquet.read(columns=columns)
+            return
+        yield from parquet.iter_batches(batch_size=batch_size, columns=columns)
+        return
+    table = _open_ipc(pa, file).read_all().select(columns)
+    if batch_size is None:
+        yield table
+        return
+    yield from table.to_batches(max_chunksize=batch_size)
+
+
+def _open_ipc(pa, file):
+    start = file.tell()
+    head = file.read(len(ARROW_FILE_MAGIC))
+    file.seek(start)
+    if head == ARROW_FILE_MAGIC:
+        return pa.ipc.open_file(file)
+    return pa.ipc.open_stream(file)
+
+
+def results_batch(results, labels):
+    """Columnar prediction results as a RecordBatch: id, prediction, confidence, one probability column per class."""
+    pa = pyarrow()
+    n = len(results["id"])
+    columns = {
+        "id": pa.array(results["id"], type=pa.string()),
+        "prediction": pa.array(results["prediction"], type=pa.string()),
+        "confidence": pa.array(results["confidence"], type=pa.float64()),
+    }
+    probability = results["probability"]
+    probas = np.asarray(probability, dtype=np.float64) if n and probability[0] is not None else None
+    for j, label in enumerate(labels):
+        columns[f"probability_{label}"] = (
+            pa.array(probas[:, j]) if probas is not None else pa.nulls(n, type=pa.float64())
+        )
+    return pa.RecordBatch.from_pydict(columns)
+
+
+def write_parquet(batch, summary) -> bytes:
+    """One Parquet file; the summary is stored as JSON under the ``exoai.summary`` schema metadata key."""
+    pa = pyarrow()
+    table = pa.Table.from_batches([batch]).replace_schema_metadata({"exoai.summary": json.dumps(summary)})
+    buffer = io.BytesIO()
+    pa.parquet.write_table(table, buffer)
+    return buffer.getvalue()
+
+
+class ArrowStreamWriter:
+    """Incremental Arrow IPC stream: the schema with the first batch, then one message per batch.
+
+    ``close(summary)`` writes a final empty batch whose custom metadata holds the
+    summary JSON (under ``key``), then the end-of-stream marker.
+    """
+
+    def __init__(self):
+        self._pa = pyarrow()
+        self._sink = io.BytesIO()
+        self._writer = None
+        self._schema = None
+
+    def write(self, batch) -> bytes:
+        if self._writer is None:
+            self._schema = batch.schema
+            self._writer = self._pa.ipc.new_stream(self._sink, batch.schema)
+        self._writer.write_batch(batch)
+        return self._drain()
+
+    def close(self, summary, key: str = "exoai.summary") -> bytes:
+        if self._writer is None:
+            return b""
+        empty = self._pa.RecordBatch.from_pylist([], schema=self._schema)
+        self._writer.write_batch(empty, custom_metadata={key: json.dumps(summary)})
+        self._writer.close()
+        return self._drain()
+
+    def _drain(self) -> bytes:
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
@@ -86,3 +86,6 @@ K2_EXPECTED_COLUMNS = ["pl_name",
 
 K2_STRING_COLUMNS = ["pl_name"]
 K2_NUMERIC_COLUMNS = [col for col in K2_EXPECTED_COLUMNS if col not in K2_STRING_COLUMNS]
+
+# Valid values of the "target" column of both families (0 candidate, 1 confirmed, 2 false positive).
+TARGET_LABELS = (0, 1, 2)
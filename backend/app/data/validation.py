@@ -0,0 +1,348 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.data import columnar
+from app.data.data import (
+    KEPLER_EXPECTED_COLUMNS, KEPLER_STRING_COLUMNS, K2_EXPECTED_COLUMNS, K2_STRING_COLUMNS, TARGET_LABELS,
+)
+from app.services.telemetry import stage
+
+MAX_REPORTED_ERRORS = int(os.getenv("EXOAI_MAX_REPORTED_ERRORS", "50"))
+
+
+class SchemaError(ValueError):
+    """Upload does not match the schema; ``detail`` is a message or a capped error report."""
+
+    def __init__(self, detail):
+        self.detail = detail
+        super().__init__(detail["message"] if isinstance(detail, dict) else detail)
+
+
+class ErrorReport:
+    """Cell-level errors: exact per-column counts, but at most ``limit`` example cells kept."""
+
+    def __init__(self, limit: int = MAX_REPORTED_ERRORS):
+        self.limit = limit
+        self.count = 0
+        self.columns = {}
+        self.cells = []
+
+    def add(self, rows, column: str, error: str, values=None):
+        n = len(rows)
+        if not n:
+            return
+        self.count += n
+        self.columns[column] = self.columns.get(column, 0) + n
+        room = self.limit - len(self.cells)
+        for i in range(min(room, n)):
+            cell = {"row": int(rows[i]), "column": column, "error": error}
+            if values is not None:
+                cell["value"] = values[i]
+            self.cells.append(cell)
+
+    def raise_if_any(self):
+        if not self.count:
+            return
+        kinds = sorted({cell["error"] for cell in self.cells})
+        raise SchemaError({
+            "message": f"Upload contains {self.count} invalid value(s) ({', '.join(kinds)}). Please clean the data.",
+            "error_count": self.count,
+            "column_errors": dict(sorted(self.columns.items(), key=lambda item: -item[1])),
+            "row_errors": sorted(self.cells, key=lambda cell: cell["row"]),
+            "truncated": self.count > len(self.cells),
+        })
+
+
+class TableSchema:
+    """Expected columns of an upload, with string columns and everything else numeric.
+
+    ``read_csv`` checks the header once, then parses with explicit ``usecols``
+    and ``dtype`` and without NA detection, so pandas does no type inference and
+    an empty or non-numeric cell makes the typed parse fail outright; only then
+    is the file re-read as text to build the report. Each parsed (chunk of the)
+    frame gets one vectorized pass for empty strings and non-finite numbers.
+    Row numbers in reports are 0-based data rows, counted across chunks.
+    ``labels`` maps numeric columns to the only values they may hold.
+    """
+
+    def __init__(self, columns, string_columns, float_dtype=np.float64, labels: dict = None):
+        self.columns = list(columns)
+        self.string_columns = [col for col in self.columns if col in set(string_columns)]
+        self.numeric_columns = [col for col in self.columns if col not in set(self.string_columns)]
+        self.float_dtype = np.dtype(float_dtype)
+        self.dtypes = {col: (str if col in self.string_columns else self.float_dtype) for col in self.columns}
+        self.labels = {col: np.asarray(values, dtype=np.float64) for col, values in (labels or {}).items()}
+
+    def check_columns(self, columns):
+        present, expected = set(columns), set(self.columns)
+        missing = [col for col in self.columns if col not in present]
+        if missing:
+            raise SchemaError(f"Missing required columns: {', '.join(missing)}")
+        extra = [col for col in columns if col not in expected]
+        if extra:
+            raise SchemaError(f"Unexpected extra columns: {', '.join(map(str, extra))}")
+
+    def validate(self, df: pd.DataFrame, offset: int = 0, rows: np.ndarray = None) -> pd.DataFrame:
+        """Raise ``SchemaError`` if a parsed frame has missing or non-finite values.
+
+        ``rows`` gives the upload row of every frame row when the frame is a
+        subset of the upload; otherwise frame row ``i`` is upload row ``offset + i``.
+        """
+        with stage("validate", len(df)):
+            return self._validate(df, offset if rows is None else np.asarray(rows))
+
+    def _validate(self, df: pd.DataFrame, at) -> pd.DataFrame:
+        # ``at`` is an offset or an array of upload rows; ``positions + at`` / ``at[positions]`` map to upload rows.
+        where = (lambda positions: at[positions]) if isinstance(at, np.ndarray) else (lambda positions: positions + at)
+        report = ErrorReport()
+        for col in self.numeric_columns:
+            values = df[col].to_numpy()
+            finite = np.isfinite(values)
+            if not finite.all():
+                rows = np.flatnonzero(~finite)
+                report.add(where(rows[np.isnan(values[rows])]), col, "missing")
+                report.add(where(rows[~np.isnan(values[rows])]), col, "not finite")
+            if col in self.labels:
+                rows = np.flatnonzero(finite & ~np.isin(values, self.labels[col]))
+                report.add(where(rows), col, "not a valid label", values[rows].tolist())
+        for col in self.string_columns:
+            values = df[col]
+            missing = (values.isna() | (values == "")).to_numpy()
+            if missing.any():
+                report.add(where(np.flatnonzero(missing)), col, "missing")
+        report.raise_if_any()
+        return df
+
+    def read(self, file, fmt: str = "csv", chunksize: int = None):
+        """``read_csv`` for CSV, ``read_columnar`` for ``"parquet"`` / ``"arrow"`` uploads."""
+        if fmt == "csv":
+            return self.read_csv(file, chunksize=chunksize)
+        return self.read_columnar(file, fmt, chunksize=chunksize)
+
+    def read_columnar(self, file, fmt: str, chunksize: int = None):
+        """Like ``read_csv`` for Parquet or Arrow IPC: only the schema's columns are read.
+
+        Numeric columns go straight from Arrow buffers to float arrays (nulls
+        become NaN and are reported as missing); string columns accept any Arrow
+        type and are cast to strings.
+        """
+        pa = columnar.pyarrow()
+        try:
+            self.check_columns(columnar.column_names(file, fmt))
+            batches = columnar.read_batches(file, fmt, self.columns, chunksize)
+            if chunksize is not None:
+                return self._columnar_chunks(pa, batches, fmt)
+            with stage("parse"):
+                df = self._from_arrow(pa, next(batches))
+            return self.validate(df)
+        except pa.ArrowException as e:
+            raise SchemaError(f"Could not read {fmt} file: {e}")
+
+    def _columnar_chunks(self, pa, batches, fmt):
+        offset = 0
+        try:
+            for batch in batches:
+                with stage("parse", batch.num_rows):
+                    df = self._from_arrow(pa, batch)
+                yield self.validate(df, offset)
+                offset += batch.num_rows
+        except pa.ArrowException as e:
+            raise SchemaError(f"Could not read {fmt} file: {e}")
+
+    def _from_arrow(self, pa, batch) -> pd.DataFrame:
+        data = {}
+        for col in self.columns:
+            array = batch.column(col)
+            if col in self.string_columns:
+                data[col] = array.cast(pa.string()).to_pandas()
+                continue
+            if not (pa.types.is_integer(array.type) or pa.types.is_floating(array.type)
+                    or pa.types.is_boolean(array.type)):
+                raise SchemaError(f"Column '{col}' must be numeric, got {array.type}.")
+            data[col] = array.cast(pa.from_numpy_dtype(self.float_dtype)).to_numpy(zero_copy_only=False)
+        return pd.DataFrame(data, copy=False)
+
+    def read_csv(self, file, chunksize: int = None):
+        """Validated DataFrame, or an iterator of validated chunks when ``chunksize`` is set.
+
+        Raises ``pd.errors.EmptyDataError`` for an empty upload and ``SchemaError``
+        for anything that does not match the schema (for a chunk iterator, as
+        the bad chunk is reached).
+        """
+        start = file.tell()
+        self.check_columns(list(pd.read_csv(file, nrows=0).columns))
+        file.seek(start)
+        if chunksize is not None:
+            reader = pd.read_csv(file, usecols=self.columns, dtype=self.dtypes, na_filter=False, chunksize=chunksize)
+            return self._chunks(reader, file, start)
+        try:
+            with stage("parse"):
+                df = pd.read_csv(file, usecols=self.columns, dtype=self.dtypes, na_filter=False)
+        except ValueError as e:
+            self._diagnose(file, start, e)
+        return self.validate(df)
+
+    def _chunks(self, reader, file, start):
+        offset = 0
+        while True:
+            try:
+                with stage("parse"):
+                    chunk = next(reader)
+            except StopIteration:
+                return
+            except ValueError as e:
+                self._diagnose(file, start, e)
+            yield self.validate(chunk, offset)
+            offset += len(chunk)
+
+    def _diagnose(self, file, start, error, report_missing: bool = True):
+        """Typed parsing failed: re-read everything as text to report exactly which cells are bad."""
+        file.seek(start)
+        report = ErrorReport()
+        offset = 0
+        string_dtypes = {col: str for col in self.string_columns}
+        for chunk in pd.read_csv(file, usecols=self.columns, dtype=string_dtypes, chunksize=100_000):
+            for col in self.columns:
+                raw = chunk[col]
+                missing = raw.isna().to_numpy()
+                if report_missing:
+                    report.add(np.flatnonzero(missing) + offset, col, "missing")
+                if col not in self.numeric_columns:
+                    continue
+                # Only columns pandas could not infer as numbers need the slow per-cell parse.
+                parsed = raw.to_numpy() if raw.dtype.kind in "fiu" else pd.to_numeric(raw, errors="coerce").to_numpy()
+                parsed = parsed.astype(np.float64, copy=False)
+                rows = np.flatnonzero(np.isnan(parsed) & ~missing)
+                report.add(rows + offset, col, "not numeric", raw.to_numpy()[rows].tolist())
+                report.add(np.flatnonzero(np.isinf(parsed)) + offset, col, "not finite")
+            offset += len(chunk)
+        report.raise_if_any()
+        raise SchemaError(f"Could not parse CSV: {error}")
+
+
+class MultiSchema:
+    """Several models' schemas read from one upload, parsed once and split into a frame per model.
+
+    The upload holds the columns of one or more of the models (a mixed file has
+    the union, with the other models' cells left empty). Each row goes to the
+    models named in its ``discriminator`` column or, without one, to every
+    model whose columns are all present and whose id cell is filled; each
+    model's rows are then validated with that model's :class:`TableSchema`.
+    """
+
+    def __init__(self, schemas):
+        self.schemas = dict(schemas)
+        columns = list(dict.fromkeys(col for schema in self.schemas.values() for col in schema.columns))
+        strings = {col for schema in self.schemas.values() for col in schema.string_columns}
+        self.float_dtype = next(iter(self.schemas.values())).float_dtype
+        self.union = TableSchema(columns, strings, self.float_dtype)
+
+    def read(self, file, fmt: str, models, discriminator: str = None):
+        """``{model: (upload_rows, validated_frame)}`` for the models that received at least one row."""
+        start = file.tell()
+        if fmt == "csv":
+            names = list(pd.read_csv(file, nrows=0).columns)
+            file.seek(start)
+        else:
+            names = columnar.column_names(file, fmt)
+        models = self._eligible(names, models, discriminator)
+        schema = TableSchema(
+            [col for col in self.union.columns if any(col in self.schemas[model].columns for model in models)]
+            + ([discriminator] if discriminator else []),
+            self.union.string_columns + ([discriminator] if discriminator else []),
+            self.float_dtype,
+        )
+        df = self._parse(schema, file, fmt, start)
+        routed = {}
+        for model, mask in self._route(df, models, discriminator).items():
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                continue
+            model_schema = self.schemas[model]
+            frame = df[model_schema.columns].iloc[rows].reset_index(drop=True)
+            try:
+                routed[model] = rows, model_schema.validate(frame, rows=rows)
+            except SchemaError as e:
+                detail = {**e.detail, "model": model} if isinstance(e.detail, dict) else f"{model}: {e.detail}"
+                raise SchemaError(detail)
+        return routed
+
+    def _eligible(self, names, models, discriminator):
+        present = set(names)
+        if discriminator and discriminator not in present:
+            raise SchemaError(f"Discriminator column '{discriminator}' is not in the upload.")
+        eligible = [model for model in models if set(self.schemas[model].columns) <= present]
+        if not eligible:
+            missing = {
+                model: [col for col in self.schemas[model].columns if col not in present] for model in models
+            }
+            raise SchemaError("Upload matches no model schema; missing " + "; ".join(
+                f"{model}: {', '.join(cols)}" for model, cols in missing.items()
+            ))
+        known = {col for model in models for col in self.schemas[model].columns} | {discriminator}
+        extra = [col for col in names if col not in known]
+        if extra:
+            raise SchemaError(f"Unexpected extra columns: {', '.join(map(str, extra))}")
+        return eligible
+
+    @staticmethod
+    def _parse(schema: TableSchema, file, fmt: str, start: int) -> pd.DataFrame:
+        # Unlike ``TableSchema.read_csv``, empty cells must parse (as NaN): a mixed file leaves the
+        # other model's columns empty. Each model's own columns are checked for them after routing.
+        if fmt != "csv":
+            pa = columnar.pyarrow()
+            try:
+                with stage("parse"):
+                    return schema._from_arrow(pa, next(columnar.read_batches(file, fmt, schema.columns)))
+            except pa.ArrowException as e:
+                raise SchemaError(f"Could not read {fmt} file: {e}")
+        try:
+            with stage("parse"):
+                return pd.read_csv(
+                    file, usecols=schema.columns, dtype=schema.dtypes, keep_default_na=False, na_values=[""]
+                )
+        except ValueError as e:
+            schema._diagnose(file, start, e, report_missing=False)
+
+    def _route(self, df: pd.DataFrame, models, discriminator):
+        report = ErrorReport()
+        if discriminator:
+            values = df[discriminator].fillna("").astype(str).str.strip().str.lower().to_numpy()
+            masks = {model: values == model for model in models}
+            unrouted = np.flatnonzero(~np.isin(values, models))
+            report.add(unrouted, discriminator, f"not one of: {', '.join(models)}", values[unrouted].tolist())
+        elif len(models) == 1:
+            # A single-model upload: every row is that model's, and an empty id is reported by validation.
+            masks = {models[0]: np.ones(len(df), dtype=bool)}
+        else:
+            masks = {}
+            for model in models:
+                ids = df[self.schemas[model].string_columns[0]]
+                masks[model] = (ids.notna() & (ids != "")).to_numpy()
+            unrouted = np.flatnonzero(~np.logical_or.reduce(list(masks.values())))
+            id_columns = ", ".join(self.schemas[model].string_columns[0] for model in models)
+            report.add(unrouted, id_columns, "no model id")
+        report.raise_if_any()
+        return masks
+
+
+def _predict_schemas(float_dtype) -> dict:
+    return {
+        "kepler": TableSchema(KEPLER_EXPECTED_COLUMNS[:-1], KEPLER_STRING_COLUMNS, float_dtype),
+        "k2": TableSchema(K2_EXPECTED_COLUMNS[:-1], K2_STRING_COLUMNS, float_dtype),
+    }
+
+
+# Prediction uploads parse numeric columns straight to the dtype the leased version serves in
+# (``ExoplanetModel.precision``, which falls back to float64 when the float32 check fails).
+PREDICT_SCHEMAS_BY_PRECISION = {"float64": _predict_schemas(np.float64), "float32": _predict_schemas(np.float32)}
+PREDICT_SCHEMAS = PREDICT_SCHEMAS_BY_PRECISION["float64"]
+INGEST_SCHEMAS = {
+    "kepler": TableSchema(KEPLER_EXPECTED_COLUMNS, KEPLER_STRING_COLUMNS, labels={"target": TARGET_LABELS}),
+    "k2": TableSchema(K2_EXPECTED_COLUMNS, K2_STRING_COLUMNS, labels={"target": TARGET_LABELS}),
+}
+PREDICT_MULTI_SCHEMAS = {
+    precision: MultiSchema(schemas) for precision, schemas in PREDICT_SCHEMAS_BY_PRECISION.items()
+}
@@ -1,8 +1,20 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import exoplanet
+from app.routes import exoplanet, metrics
+from app.services.executors import shutdown_executors
+from app.services.telemetry import TelemetryMiddleware
 
-app = FastAPI(title="Exoplanet AI Backend", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for registry in exoplanet.registries.values():
+        registry.reload()
+    yield
+    shutdown_executors()
+
+
+app = FastAPI(title="Exoplanet AI Backend", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -10,9 +22,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id"],
 )
+app.add_middleware(TelemetryMiddleware)
 
 app.include_router(exoplanet.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def root():
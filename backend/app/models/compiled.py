@@ -0,0 +1,497 @@
+"""Pickle-free inference format for the stacking ensemble.
+
+``export_compiled`` flattens the fitted StackingClassifier (RandomForest +
+XGBoost base estimators, LogisticRegression meta-learner) and its StandardScaler
+into contiguous NumPy arrays, saved either as a directory of ``.npy`` files or
+as a single ``.npz``. ``CompiledEnsemble`` evaluates those arrays with a
+vectorized, level-by-level tree walk, so serving needs neither sklearn nor
+xgboost and never unpickles anything. A ``.npy`` directory can be
+memory-mapped, letting every worker process on a host share one read-only copy
+of the trees through the OS page cache.
+
+    python -m app.models.compiled <model.pkl> <scaler.pkl> <out_dir | out.npz>
+"""
+import json
+import os
+import shutil
+import sys
+import uuid
+
+import numpy as np
+
+FORMAT_VERSION = 1
+TOLERANCE = 1e-6
+# Rows per scoring block are sized so a block holds about this many (row, tree) cells;
+# the inner tree walk uses smaller, cache-sized sub-blocks.
+_BLOCK_CELLS = 1 << 21
+_WALK_CELLS = 1 << 16
+# Gauss-Legendre nodes and weights on [0, 1] for integrating along the XGBoost margin path in ``explain``.
+_PATH_NODES, _PATH_WEIGHTS = np.polynomial.legendre.leggauss(8)
+_PATH_NODES, _PATH_WEIGHTS = (_PATH_NODES + 1) / 2, _PATH_WEIGHTS / 2
+
+
+def _softmax(z):
+    z = np.exp(z - z.max(axis=-1, keepdims=True))
+    return z / z.sum(axis=-1, keepdims=True)
+
+
+def _children(left, right):
+    # Interleaved [left0, right0, left1, right1, ...] so one ``take`` picks the next node.
+    return np.stack([left, right], axis=1).ravel().astype(np.int32)
+
+
+def _depth(children, roots):
+    depth = 0
+    frontier = np.asarray(roots)
+    while True:
+        internal = frontier[children[2 * frontier] != frontier]
+        if internal.size == 0:
+            return depth
+        frontier = np.concatenate([children[2 * internal], children[2 * internal + 1]])
+        depth += 1
+
+
+def _node_means(children, roots, leaf_value, cover):
+    """Cover-weighted mean leaf value below every node, as XGBoost computes it for ``approx_contribs``."""
+    levels, frontier = [], np.asarray(roots)
+    while True:
+        internal = frontier[children[2 * frontier] != frontier]
+        if internal.size == 0:
+            break
+        levels.append(internal)
+        frontier = np.concatenate([children[2 * internal], children[2 * internal + 1]])
+    mean = np.asarray(leaf_value, dtype=np.float64).copy()
+    for internal in reversed(levels):
+        left, right = children[2 * internal], children[2 * internal + 1]
+        mean[internal] = (cover[left] * mean[left] + cover[right] * mean[right]) / cover[internal]
+    return mean
+
+
+def _flatten_forest(forest):
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    for est in forest.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        leaf = tree.children_left == -1
+        idx = np.arange(n) + offset
+        left.append(np.where(leaf, idx, tree.children_left + offset))
+        right.append(np.where(leaf, idx, tree.children_right + offset))
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(np.where(leaf, 0.0, tree.threshold))
+        counts = tree.value[:, 0, :]
+        value.append(counts / counts.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        offset += n
+    children = _children(np.concatenate(left), np.concatenate(right))
+    roots = np.asarray(roots, dtype=np.int32)
+    return {
+        "rf_feature": np.concatenate(feature).astype(np.int32),
+        "rf_threshold": np.concatenate(threshold).astype(np.float64),
+        "rf_children": children,
+        "rf_value": np.concatenate(value).astype(np.float64),
+        "rf_roots": roots,
+        "rf_depth": np.int32(_depth(children, roots)),
+        "rf_importances": np.asarray(forest.feature_importances_, dtype=np.float64),
+    }
+
+
+def _flatten_booster(xgb):
+    booster = xgb.get_booster()
+    raw = json.loads(booster.save_raw("json"))
+    learner = raw["learner"]
+    model = learner["gradient_booster"]["model"]
+    n_classes = int(learner["learner_model_param"].get("num_class", "0")) or 1
+    trees, tree_info = model["trees"], model["tree_info"]
+    try:
+        best = xgb.best_iteration
+        n_parallel = int(learner["gradient_booster"].get("gbtree_model_param", {}).get("num_parallel_tree", "1"))
+        limit = (best + 1) * max(n_classes, 1) * n_parallel
+        trees, tree_info = trees[:limit], tree_info[:limit]
+    except AttributeError:
+        pass
+
+    feature, threshold, left, right, default_left, value, cover, roots = [], [], [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        lc = np.asarray(tree["left_children"])
+        rc = np.asarray(tree["right_children"])
+        n = lc.size
+        leaf = lc == -1
+        idx = np.arange(n) + offset
+        cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+        left.append(np.where(leaf, idx, lc + offset))
+        right.append(np.where(leaf, idx, rc + offset))
+        feature.append(np.where(leaf, 0, np.asarray(tree["split_indices"])))
+        threshold.append(np.where(leaf, np.float32(0), cond))
+        default_left.append(np.asarray(tree["default_left"], dtype=bool))
+        value.append(np.where(leaf, cond, np.float32(0)))
+        cover.append(np.asarray(tree["sum_hessian"], dtype=np.float64))
+        roots.append(offset)
+        offset += n
+
+    base = str(learner["learner_model_param"]["base_score"])
+    if base.startswith("["):
+        base_margin = np.asarray(json.loads(base), dtype=np.float64)
+    else:
+        base_margin = np.full(n_classes, float(base), dtype=np.float64)
+    objective = learner["objective"]["name"]
+    if objective not in ("multi:softprob", "multi:softmax"):
+        raise ValueError(f"Unsupported XGBoost objective for compilation: {objective}")
+
+    children = _children(np.concatenate(left), np.concatenate(right))
+    roots = np.asarray(roots, dtype=np.int32)
+    value = np.concatenate(value).astype(np.float32)
+    return {
+        "xgb_feature": np.concatenate(feature).astype(np.int32),
+        "xgb_threshold": np.concatenate(threshold).astype(np.float32),
+        "xgb_default_left": np.concatenate(default_left),
+        "xgb_children": children,
+        "xgb_value": value,
+        "xgb_mean": _node_means(children, roots, value, np.concatenate(cover)),
+        "xgb_roots": roots,
+        "xgb_tree_class": np.asarray(tree_info, dtype=np.int32),
+        "xgb_base_margin": base_margin,
+        "xgb_depth": np.int32(_depth(children, roots)),
+        "xgb_importances": np.asarray(xgb.feature_importances_, dtype=np.float64),
+    }
+
+
+def compilable(stack) -> bool:
+    """Whether ``stack`` has the multi-class rf + xgb predict_proba layout :func:`compile_ensemble` flattens."""
+    names = [name for name, _ in getattr(stack, "estimators", [])]
+    if names != ["rf", "xgb"] or not hasattr(stack, "final_estimator_") or stack.passthrough:
+        return False
+    objective = str(getattr(stack.estimators_[1], "objective", ""))
+    return list(stack.stack_method_) == ["predict_proba"] * 2 and objective.startswith("multi:")
+
+
+def compile_ensemble(stack, scaler) -> dict:
+    """Flatten a fitted StackingClassifier (RF + XGBoost + LogisticRegression) and its scaler."""
+    if not compilable(stack):
+        raise ValueError("Only the rf + xgb predict_proba stacking layout can be compiled.")
+    rf, xgb = stack.estimators_
+    meta = stack.final_estimator_
+    arrays = {
+        "format_version": np.int32(FORMAT_VERSION),
+        "classes": np.asarray(stack.classes_),
+        "feature_names": np.asarray(getattr(scaler, "feature_names_in_", []), dtype=str),
+        "scaler_mean": np.asarray(scaler.mean_ if scaler.with_mean else np.zeros(scaler.n_features_in_), dtype=np.float64),
+        "scaler_scale": np.asarray(scaler.scale_ if scaler.with_std else np.ones(scaler.n_features_in_), dtype=np.float64),
+        "meta_coef": np.asarray(meta.coef_, dtype=np.float64),
+        "meta_intercept": np.asarray(meta.intercept_, dtype=np.float64),
+        "accuracy": np.float64(getattr(stack, "accuracy_", 0.0)),
+    }
+    arrays.update(_flatten_forest(rf))
+    arrays.update(_flatten_booster(xgb))
+    return arrays
+
+
+def export_compiled(stack, scaler, path: str, X_check=None, tolerance: float = TOLERANCE) -> float:
+    """Write the compiled bundle to ``path``; with ``X_check`` (unscaled rows) verify it first.
+
+    Returns the max absolute probability difference against the sklearn model
+    (0.0 when no check rows are given) and refuses to write if it exceeds
+    ``tolerance``.
+    """
+    arrays = compile_ensemble(stack, scaler)
+    max_diff = 0.0
+    if X_check is not None and len(X_check):
+        X_scaled = (np.asarray(X_check, dtype=np.float64) - arrays["scaler_mean"]) / arrays["scaler_scale"]
+        expected = stack.predict_proba(X_scaled)
+        got = CompiledEnsemble(arrays).predict_proba(X_scaled)
+        max_diff = float(np.max(np.abs(expected - got)))
+        if max_diff > tolerance:
+            raise ValueError(f"Compiled model deviates from the original by {max_diff:.3g} (> {tolerance}).")
+    save_compiled(arrays, path)
+    return max_diff
+
+
+def save_compiled(arrays: dict, path: str):
+    """Save as ``path.npz`` if it ends in ``.npz``, otherwise as a directory of ``.npy`` files."""
+    if path.endswith(".npz"):
+        np.savez(path, **arrays)
+        return
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:6]}"
+    os.makedirs(tmp)
+    for key, value in arrays.items():
+        np.save(os.path.join(tmp, f"{key}.npy"), value, allow_pickle=False)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(tmp, path)
+
+
+class _Importances:
+    def __init__(self, feature_importances):
+        self.feature_importances_ = feature_importances
+
+
+class CompiledScaler:
+    """StandardScaler stand-in backed by the bundle's mean/scale arrays."""
+
+    with_mean = True
+    with_std = True
+
+    def __init__(self, arrays):
+        self.mean_ = arrays["scaler_mean"]
+        self.scale_ = arrays["scaler_scale"]
+        self.n_features_in_ = self.mean_.size
+        if arrays["feature_names"].size:
+            self.feature_names_in_ = np.asarray(arrays["feature_names"], dtype=object)
+
+    def transform(self, X):
+        if hasattr(X, "columns") and hasattr(self, "feature_names_in_"):
+            X = X[list(self.feature_names_in_)]
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class CompiledEnsemble:
+    """Vectorized evaluator for a bundle written by :func:`export_compiled`.
+
+    Exposes the small part of the StackingClassifier interface ExoplanetModel
+    uses (``classes_``, ``predict_proba``, ``predict``, ``named_estimators_``)
+    and expects already-scaled input, like the original model. :meth:`explain`
+    adds per-row feature contributions computed from the same tree walk.
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.classes_ = np.asarray(arrays["classes"])
+        self.accuracy_ = float(arrays["accuracy"])
+        self.n_features_in_ = int(arrays["scaler_mean"].size)
+        self.named_estimators_ = {
+            "rf": _Importances(arrays["rf_importances"]),
+            "xgb": _Importances(arrays["xgb_importances"]),
+        }
+        self._n_classes = self.classes_.size
+        self._xgb_class_trees = [np.flatnonzero(arrays["xgb_tree_class"] == k) for k in range(self._n_classes)]
+        self._paths = None
+
+    @classmethod
+    def load(cls, path: str, mmap_mode=None):
+        """Load a bundle; ``mmap_mode="r"`` maps a ``.npy`` directory instead of reading it."""
+        if os.path.isdir(path):
+            arrays = {}
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".npy"):
+                    array = np.load(os.path.join(path, name), mmap_mode=mmap_mode, allow_pickle=False)
+                    # Plain ndarray views keep the hot path free of np.memmap subclass overhead.
+                    arrays[name[:-4]] = array.view(np.ndarray) if isinstance(array, np.memmap) else array
+        else:
+            with np.load(path, allow_pickle=False) as bundle:
+                arrays = {key: bundle[key] for key in bundle.files}
+        if int(arrays["format_version"]) != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled model format {int(arrays['format_version'])}.")
+        return cls(arrays)
+
+    def quantized(self, threshold_dtype: str = "float32") -> "CompiledEnsemble":
+        """A copy with tree thresholds and RandomForest leaf values in ``threshold_dtype``.
+
+        Thresholds are rounded toward the side the comparison keeps (down for
+        sklearn's ``<=``, up for XGBoost's ``<``), so with float32 features a
+        float32 copy routes every row exactly as the float64 thresholds do;
+        ``float16`` halves them again but can move rows near a split. The copy
+        lives in private memory, not in the shared mapping.
+        """
+        dtype = np.dtype(threshold_dtype)
+        arrays = dict(self.arrays)
+        for prefix, direction in (("rf", -np.inf), ("xgb", np.inf)):
+            threshold = np.asarray(self.arrays[prefix + "_threshold"])
+            rounded = threshold.astype(dtype)
+            off = rounded > threshold if direction < 0 else rounded < threshold
+            rounded[off] = np.nextafter(rounded[off], dtype.type(direction))
+            arrays[prefix + "_threshold"] = rounded
+        arrays["rf_value"] = np.asarray(self.arrays["rf_value"], dtype=np.float32)
+        return type(self)(arrays)
+
+    def _walk(self, block, prefix, strict):
+        """Node of every row of ``block`` in every tree of one forest, as (rows, trees), at each level from the roots.
+
+        sklearn sends ``x <= threshold`` left, XGBoost ``x < threshold`` (``strict``);
+        leaves point at themselves, so walking ``depth`` levels lands every cell on a leaf.
+        """
+        a = self.arrays
+        feature, threshold, children = a[prefix + "_feature"], a[prefix + "_threshold"], a[prefix + "_children"]
+        roots = a[prefix + "_roots"]
+        default_left = a.get(prefix + "_default_left")
+        flat = block.ravel()
+        offsets = (np.arange(len(block), dtype=np.int32) * block.shape[1])[:, None]
+        node = np.broadcast_to(roots, (len(block), roots.size)).copy()
+        yield node
+        for _ in range(int(a[prefix + "_depth"])):
+            x = flat.take(offsets + feature.take(node))
+            t = threshold.take(node)
+            go_right = x >= t if strict else x > t
+            if default_left is not None:
+                missing = np.isnan(x)
+                if missing.any():
+                    go_right = np.where(missing, ~default_left.take(node), go_right)
+            node = children.take(2 * node + go_right)
+            yield node
+
+    def _leaves(self, X, prefix, strict):
+        """Leaf index reached by every row in every tree of one forest, as (rows, trees)."""
+        roots = self.arrays[prefix + "_roots"]
+        out = np.empty((X.shape[0], roots.size), dtype=np.int32)
+        step = max(1, _WALK_CELLS // roots.size)
+        for start in range(0, X.shape[0], step):
+            for node in self._walk(X[start:start + step], prefix, strict):
+                pass
+            out[start:start + step] = node
+        return out
+
+    @property
+    def explainable(self) -> bool:
+        """Whether the bundle has the XGBoost node means :meth:`explain` needs (older exports do not)."""
+        return "xgb_mean" in self.arrays
+
+    def _path_arrays(self):
+        """Per node: the feature its parent split on and its value minus the parent's (zero at the roots)."""
+        if self._paths is None:
+            a = self.arrays
+            paths = {}
+            for prefix, values in (("rf", a["rf_value"]), ("xgb", a["xgb_mean"][:, None])):
+                children, feature = a[prefix + "_children"], a[prefix + "_feature"]
+                nodes = np.arange(feature.size, dtype=np.int32)
+                internal = nodes[children[0::2] != nodes]
+                split = np.zeros(feature.size, dtype=np.int32)
+                delta = np.zeros(values.shape, dtype=np.float64)
+                for child in (children[2 * internal], children[2 * internal + 1]):
+                    split[child] = feature[internal]
+                    delta[child] = values[child] - values[internal]
+                paths[prefix] = split, delta
+            self._paths = paths
+        return self._paths
+
+    def _contributions(self, X32, prefix, strict, outputs):
+        """Per-feature sums of the value changes along every row's path, as (rows, features, classes).
+
+        ``outputs`` is the class of every tree (XGBoost) or None when each node
+        holds a value per class (RandomForest).
+        """
+        split, delta = self._path_arrays()[prefix]
+        n_rows, n_features = X32.shape
+        width = delta.shape[1]
+        trees = self.arrays[prefix + "_roots"].size
+        column = outputs if outputs is not None else 0
+        out = np.zeros((n_rows, n_features, self._n_classes), dtype=np.float64)
+        step = max(1, _WALK_CELLS // trees)
+        for start in range(0, n_rows, step):
+            block = X32[start:start + step]
+            size = len(block) * n_features * self._n_classes
+            cells = (np.arange(len(block), dtype=np.int64) * n_features)[:, None]
+            walk = self._walk(block, prefix, strict)
+            node = next(walk)
+            for child in walk:
+                # Leaves point at themselves: only cells that went down a level add a change.
+                moved = child != node
+                index = ((cells + split.take(child)) * self._n_classes + column)[moved]
+                sums = np.bincount(
+                    (index[:, None] + np.arange(width)).ravel(), delta[child[moved]].ravel(), minlength=size
+                )
+                out[start:start + step] += sums.reshape(len(block), n_features, self._n_classes)
+                node = child
+        return out
+
+    def _base_probas(self, X32):
+        a = self.arrays
+        rf_value = a["rf_value"]
+        rf = rf_value[self._leaves(X32, "rf", strict=False)].sum(axis=1, dtype=rf_value.dtype) / a["rf_roots"].size
+
+        xgb_leaves = self._leaves(X32, "xgb", strict=True)
+        # XGBoost accumulates leaf values in float32; doing the same keeps parity within float32 rounding.
+        leaf_values = a["xgb_value"][xgb_leaves]
+        base = a["xgb_base_margin"].astype(np.float32)
+        margin = np.column_stack([
+            np.hstack([np.full((len(X32), 1), base[k]), leaf_values[:, trees]]).sum(axis=1, dtype=np.float32)
+            for k, trees in enumerate(self._xgb_class_trees)
+        ]).astype(np.float64)
+        margin -= margin.max(axis=1, keepdims=True)
+        xgb = np.exp(margin)
+        xgb /= xgb.sum(axis=1, keepdims=True)
+        return rf, xgb.astype(np.float32)
+
+    def _meta_proba(self, meta):
+        a = self.arrays
+        scores = meta @ a["meta_coef"].T + a["meta_intercept"]
+        if scores.shape[1] == 1:
+            p = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        scores -= scores.max(axis=1, keepdims=True)
+        proba = np.exp(scores)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, X):
+        # Trees compare float32 features, exactly as sklearn and XGBoost do internally.
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        n_trees = max(self.arrays["rf_roots"].size, self.arrays["xgb_roots"].size)
+        block = max(1, _BLOCK_CELLS // n_trees)
+        out = np.empty((X32.shape[0], self._n_classes), dtype=np.float64)
+        for start in range(0, X32.shape[0], block):
+            rf, xgb = self._base_probas(X32[start:start + block])
+            if self._n_classes == 2:
+                rf, xgb = rf[:, 1:], xgb[:, 1:]
+            out[start:start + block] = self._meta_proba(np.hstack([rf, xgb]))
+        return out
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def explain(self, X, target):
+        """Contribution of every feature to the meta-learner score of class index ``target`` of every scaled row.
+
+        Returns ``(base, contributions)`` with ``base + contributions.sum(axis=1)``
+        equal to the score (the log-odds of ``target`` for a binary model, its
+        logit for a multinomial one). The base models are decomposed along each
+        row's tree paths (Saabas): RandomForest probability changes exactly,
+        XGBoost margin changes (the ``approx_contribs`` of ``pred_contribs``)
+        mapped through the softmax by integrating its gradient along the margin
+        path. Both go through the meta-learner's coefficients for ``target``.
+        """
+        if not self.explainable:
+            raise ValueError("This compiled model predates explanations; export it again.")
+        a = self.arrays
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        target = np.asarray(target)
+        n_classes = self._n_classes
+        used = np.arange(n_classes) if n_classes > 2 else np.array([1])
+        coef, intercept = a["meta_coef"], a["meta_intercept"]
+        if coef.shape[0] == 1:
+            sign = np.where(target == 1, 1.0, -1.0)
+            weights, bias = sign[:, None] * coef[0], sign * intercept[0]
+        else:
+            weights, bias = coef[target], intercept[target]
+        w_rf = np.zeros((len(target), n_classes))
+        w_xgb = np.zeros((len(target), n_classes))
+        w_rf[:, used], w_xgb[:, used] = weights[:, :used.size], weights[:, used.size:]
+
+        rf_roots, xgb_roots = a["rf_roots"], a["xgb_roots"]
+        rf_base = np.asarray(a["rf_value"][rf_roots], dtype=np.float64).mean(axis=0)
+        xgb_base = a["xgb_base_margin"] + np.array(
+            [a["xgb_mean"][xgb_roots[trees]].sum() for trees in self._xgb_class_trees]
+        )
+        base = bias + w_rf @ rf_base + w_xgb @ _softmax(xgb_base)
+
+        contributions = np.empty(X32.shape, dtype=np.float64)
+        block = max(1, _BLOCK_CELLS // max(rf_roots.size, xgb_roots.size))
+        for start in range(0, X32.shape[0], block):
+            rows = slice(start, start + block)
+            rf = self._contributions(X32[rows], "rf", False, None) / rf_roots.size
+            xgb = self._contributions(X32[rows], "xgb", True, a["xgb_tree_class"])
+            margin = xgb.sum(axis=1)
+            gradient = np.zeros_like(margin)
+            for t, weight in zip(_PATH_NODES, _PATH_WEIGHTS):
+                p = _softmax(xgb_base + t * margin)
+                gradient += weight * p * (w_xgb[rows] - (p * w_xgb[rows]).sum(axis=1, keepdims=True))
+            contributions[rows] = np.einsum("nfk,nk->nf", rf, w_rf[rows]) + np.einsum("nfk,nk->nf", xgb, gradient)
+        return base, contributions
+
+
+if __name__ == "__main__":
+    import joblib
+
+    if len(sys.argv) != 4:
+        raise SystemExit("usage: python -m app.models.compiled <model.pkl> <scaler.pkl> <out_dir | out.npz>")
+    stack, scaler = joblib.load(sys.argv[1]), joblib.load(sys.argv[2])
+    export_compiled(stack, scaler, sys.argv[3])
+    print(f"[OK] Compiled model written to {sys.argv[3]}")
@@ -1,72 +1,379 @@
-import joblib
+import hashlib
+import json
 import numpy as np
 import pandas as pd
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+from app.models.compiled import CompiledEnsemble, CompiledScaler, compilable, compile_ensemble
+from app.models.neighbors import NeighborIndex
+from app.models.result_cache import result_cache, row_digests
+from app.services.telemetry import stage
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LABEL_MAP = {0: "candidate", 1: "confirmed", 2: "false positive"}
+# Threads one pickled-ensemble prediction may use; they are split between its base estimators, which run concurrently.
+BASE_ESTIMATOR_JOBS = int(os.getenv("EXOAI_BASE_ESTIMATOR_JOBS", os.cpu_count() or 1))
+# Map compiled .npy bundles read-only so worker processes share them via the page cache.
+MODEL_MMAP = os.getenv("EXOAI_MODEL_MMAP", "1").lower() in ("1", "true", "yes")
+# float32 keeps feature matrices in float32 from parse to predict; QUANTIZE_THRESHOLDS (none, float32,
+# float16) also narrows a compiled model's tree thresholds. A load falls back to float64 when fewer than
+# PRECISION_MIN_AGREEMENT of the reference rows get the float64 label.
+INFERENCE_PRECISION = os.getenv("EXOAI_INFERENCE_PRECISION", "float64").lower()
+QUANTIZE_THRESHOLDS = os.getenv("EXOAI_QUANTIZE_THRESHOLDS", "none").lower()
+PRECISION_MIN_AGREEMENT = float(os.getenv("EXOAI_PRECISION_MIN_AGREEMENT", "0.999"))
+MAX_NEIGHBORS = int(os.getenv("EXOAI_MAX_NEIGHBORS", "20"))
+# Most rows explained per request; later rows are scored without an explanation.
+EXPLAIN_MAX_ROWS = int(os.getenv("EXOAI_EXPLAIN_MAX_ROWS", "10000"))
+
+_base_estimator_pool = ThreadPoolExecutor(thread_name_prefix="exoai-base-estimator")
+
+
+@dataclass(frozen=True)
+class ModelMetadata:
+    """Everything /metrics and the prediction summary need, computed once per load."""
+
+    metrics: Mapping
+    metrics_json: bytes
+    input_features: tuple
+    column_importance: Optional[Mapping]
+    etag: str
+
 
 class ExoplanetModel:
-    def __init__(self, model_path: str, scaler_path: str = None):
+    def __init__(self, model_path: str, scaler_path: str = None, cache_namespace: str = None,
+                 precision: str = INFERENCE_PRECISION, quantize: str = QUANTIZE_THRESHOLDS, neighbors_path: str = None):
         self.model_path = model_path
         self.scaler_path = scaler_path
+        # Rows are only served from the result cache when the owner names this model version.
+        self.cache_namespace = cache_namespace
         model_full = os.path.join(BASE_DIR, model_path)
         scaler_full = os.path.join(BASE_DIR, scaler_path) if scaler_path else None
         try:
-            self.model = joblib.load(model_full)
-            self.scaler = joblib.load(scaler_full) if scaler_full else None
+            if model_full.endswith(".npz") or os.path.isdir(model_full):
+                self.model = CompiledEnsemble.load(model_full, mmap_mode="r" if MODEL_MMAP else None)
+                self.scaler = CompiledScaler(self.model.arrays)
+            else:
+                import joblib  # only pickled models need it (and, through them, sklearn/xgboost)
+
+                self.model = joblib.load(model_full)
+                self.scaler = joblib.load(scaler_full) if scaler_full else None
+            estimators = [est for est in getattr(self.model, "estimators_", []) if hasattr(est, "get_params")]
+            threaded = [est for est in estimators if "n_jobs" in est.get_params()]
+            for est in threaded:
+                # set_params also reaches an XGBoost model's booster, which keeps the thread count it was fitted with.
+                est.set_params(n_jobs=max(1, BASE_ESTIMATOR_JOBS // len(threaded)))
+            self._shift = getattr(self.scaler, "mean_", None) if getattr(self.scaler, "with_mean", False) else None
+            self._scale = getattr(self.scaler, "scale_", None) if getattr(self.scaler, "with_std", False) else None
             print(f"[OK] Model loaded: {model_full}")
         except Exception as e:
             print(f"[WARN] Model not loaded: {e}")
             self.model = None
             self.scaler = None
+        self.metadata = self._build_metadata() if self.model is not None else None
+        self.neighbors = None
+        if self.model is not None and neighbors_path and os.path.isdir(neighbors_path):
+            try:
+                self.neighbors = NeighborIndex.load(neighbors_path, mmap_mode="r" if MODEL_MMAP else None)
+            except Exception as e:
+                print(f"[WARN] Neighbour index not loaded: {e}")
+        self.precision, self.dtype = "float64", np.float64
+        self.precision_check = self.quantize = None
+        self._reference = None
+        self._compiled = None
+        self._compile_lock = threading.Lock()
+        if precision == "float32" and self.model is not None:
+            self._use_float32(quantize)
+
+    def _use_float32(self, quantize: str):
+        """Serve in float32; the float64 model is kept until :meth:`check_precision` has run."""
+        self._reference = (self.model, self._shift, self._scale)
+        if quantize != "none" and isinstance(self.model, CompiledEnsemble):
+            self.model = self.model.quantized(quantize)
+        self._shift = self._shift.astype(np.float32) if self._shift is not None else None
+        self._scale = self._scale.astype(np.float32) if self._scale is not None else None
+        self.precision, self.dtype = "float32", np.float32
+        self.quantize = quantize
+
+    def check_precision(self, rows: pd.DataFrame, min_agreement: float = PRECISION_MIN_AGREEMENT):
+        """Compare float32 with float64 labels on unscaled feature ``rows``; below ``min_agreement``, use float64.
 
-    def predict_csv(self, df: pd.DataFrame, id_col: str = None):
+        Returns the report (also kept as ``precision_check``), or None when serving float64.
+        """
+        if self._reference is None:
+            return None
+        if self.metadata.input_features:
+            rows = rows[list(self.metadata.input_features)]
+        else:
+            rows = rows.drop(columns=["target", "kepid", "pl_name"], errors="ignore")
+        model, shift, scale = self._reference
+        X = rows.to_numpy(dtype=np.float64)
+        if shift is None and scale is None and self.scaler is not None:
+            X = self.scaler.transform(X)
+        else:
+            X = (X - shift if shift is not None else X) / (scale if scale is not None else 1.0)
+        expected = self._proba(X, model)
+        got = self._proba(self._transform(rows.to_numpy(dtype=np.float32)))
+        agreement = float(np.mean(expected.argmax(axis=1) == got.argmax(axis=1))) if len(X) else 1.0
+        self.precision_check = {
+            "precision": "float32",
+            "quantize": self.quantize,
+            "rows": len(X),
+            "agreement": round(agreement, 6),
+            "min_agreement": min_agreement,
+            "max_abs_diff": float(np.max(np.abs(expected - got))) if len(X) else 0.0,
+            "fallback": agreement < min_agreement,
+        }
+        if agreement < min_agreement:
+            print(f"[WARN] float32 agreement {agreement:.4%} < {min_agreement:.4%}, serving float64: {self.model_path}")
+            self.model, self._shift, self._scale = model, shift, scale
+            self.precision, self.dtype = "float64", np.float64
+        self._reference = None
+        return self.precision_check
+
+    def _build_metadata(self) -> ModelMetadata:
+        metrics = self._compute_metrics()
+        metrics_json = json.dumps(metrics).encode()
+        input_features = tuple(getattr(self.scaler, "feature_names_in_", ()))
+        column_importance = self._feature_importances(list(input_features)) if input_features else None
+        return ModelMetadata(
+            metrics=MappingProxyType(metrics),
+            metrics_json=metrics_json,
+            input_features=input_features,
+            column_importance=MappingProxyType(column_importance) if column_importance is not None else None,
+            etag=hashlib.sha1(metrics_json).hexdigest(),
+        )
+
+    def _score(self, df: pd.DataFrame, id_col: str = None, neighbors: int = 0, explain: int = 0,
+               explain_rows: int = EXPLAIN_MAX_ROWS):
         if not self.model:
             raise ValueError("Model not loaded correctly.")
 
-        df_copy = df.copy()
-
         if not id_col:
-            if "kepid" in df_copy.columns:
+            if "kepid" in df.columns:
                 id_col = "kepid"
-            elif "pl_name" in df_copy.columns:
+            elif "pl_name" in df.columns:
                 id_col = "pl_name"
             else:
                 id_col = None
 
-        if id_col:
-            df_copy[id_col] = df_copy[id_col].astype(str)
+        ids = df[id_col].astype(str).to_numpy() if id_col else df.index.astype(str).to_numpy()
 
-        ids = df_copy[id_col] if id_col else df_copy.index.astype(str)
-
-        X = df_copy.drop(columns=["target"], errors='ignore')
+        X = df.drop(columns=["target"], errors='ignore')
         if id_col in X.columns:
             X = X.drop(columns=[id_col])
+        columns = list(X.columns)
+
+        if self.scaler is not None and hasattr(self.scaler, "feature_names_in_"):
+            X = X[list(self.scaler.feature_names_in_)]
+        features = list(X.columns)
+        X = X.to_numpy(dtype=self.dtype)
+        preds, probas = self._predict_raw(X)
+
+        results, counts = self.build_results(ids, preds, probas)
+        if neighbors:
+            results["neighbors"] = self.similar(X, neighbors)
+        if explain:
+            n = max(0, min(len(X), explain_rows))
+            explained = self.explain(X[:n], preds[:n], explain, features) if n else []
+            results["explanation"] = explained + [None] * (len(X) - n)
+            counts["explained_rows"] = n
+        return results, counts, columns
 
-        if self.scaler:
-            X[X.columns] = self.scaler.transform(X)
+    def similar(self, X: np.ndarray, k: int):
+        """The ``k`` nearest indexed known planets of every unscaled row, as ``[{"id", "distance"}, ...]`` lists."""
+        if self.neighbors is None:
+            raise ValueError("This model version has no neighbour index.")
+        with stage("neighbors", len(X)):
+            indices, distances = self.neighbors.query(self._transform(X), min(k, MAX_NEIGHBORS))
+            ids = self.neighbors.ids[indices].tolist()
+            distances = np.round(distances, 4).tolist()
+            return [
+                [{"id": i, "distance": d} for i, d in zip(row_ids, row_distances)]
+                for row_ids, row_distances in zip(ids, distances)
+            ]
 
-        preds = self.model.predict(X)
-        probas = getattr(self.model, "predict_proba", lambda _: None)(X)
+    @property
+    def explainable(self) -> bool:
+        if isinstance(self.model, CompiledEnsemble):
+            return self.model.explainable
+        return self.scaler is not None and compilable(self.model)
 
-        label_map = {0: "candidate", 1: "confirmed", 2: "false positive"}
-        mapped_preds = [label_map.get(int(p), str(p)) for p in preds]
+    def _explainer(self) -> CompiledEnsemble:
+        """The compiled ensemble explanations run on; a pickled model is compiled once, on first use."""
+        if self._compiled is None:
+            with self._compile_lock:
+                if self._compiled is None:
+                    model = self.model
+                    self._compiled = model if isinstance(model, CompiledEnsemble) else CompiledEnsemble(
+                        compile_ensemble(model, self.scaler)
+                    )
+        return self._compiled
+
+    def explain(self, X: np.ndarray, preds, top: int, features):
+        """The ``top`` largest feature contributions to the predicted class of every unscaled row.
+
+        Contributions are in units of the meta-learner's score for ``preds`` (see
+        :meth:`CompiledEnsemble.explain`); ``base`` plus ``rest`` plus the listed
+        contributions add up to it. A pickled model is compiled once for this.
+        """
+        if not self.explainable:
+            raise ValueError("This model version cannot explain predictions; retrain it.")
+        with stage("explain", len(X)):
+            compiled = self._explainer()
+            classes = np.asarray(compiled.classes_)
+            base, contributions = compiled.explain(self._transform(X), np.searchsorted(classes, preds))
+            top = min(top, contributions.shape[1])
+            order = np.argpartition(-np.abs(contributions), top - 1, axis=1)[:, :top]
+            picked = np.take_along_axis(contributions, order, axis=1)
+            rank = np.argsort(-np.abs(picked), axis=1)
+            order, picked = np.take_along_axis(order, rank, axis=1), np.take_along_axis(picked, rank, axis=1)
+            rest = np.round(contributions.sum(axis=1) - picked.sum(axis=1), 4).tolist()
+            names = np.asarray(features, dtype=object)[order].tolist()
+            values = np.take_along_axis(X, order, axis=1).tolist()
+            picked = np.round(picked, 4).tolist()
+            explanations = []
+            for b, r, row in zip(np.round(base, 4).tolist(), rest, zip(names, values, picked)):
+                contributed = [{"feature": f, "value": v, "contribution": c} for f, v, c in zip(*row)]
+                explanations.append({"base": b, "rest": r, "contributions": contributed})
+            return explanations
+
+    def predict_array(self, X: np.ndarray, ids):
+        """Score a raw feature matrix already in the scaler's column order (no pandas)."""
+        if not self.model:
+            raise ValueError("Model not loaded correctly.")
+        preds, probas = self._predict_raw(np.asarray(X, dtype=self.dtype))
+        return self.build_results(np.asarray(ids), preds, probas)
 
-        results = []
-        for i, idx in enumerate(ids):
-            row_data = {
-                "id": str(idx),
-                "prediction": mapped_preds[i],
-                "probability": probas[i].tolist() if probas is not None else None,
-                "confidence": float(np.max(probas[i]) * 100) if probas is not None else None
-            }
-            results.append(row_data)
+    def _transform(self, X: np.ndarray):
+        with stage("scale", len(X)):
+            return self._scale_features(X)
 
+    def _scale_features(self, X: np.ndarray):
+        if self.scaler is None:
+            return X
+        if self._shift is None and self._scale is None:
+            return self.scaler.transform(X)
+        # One C-ordered output buffer (a DataFrame's matrix is column-major), then scaled in place.
+        X = np.subtract(X, self._shift, order="C") if self._shift is not None else np.array(X, order="C")
+        if self._scale is not None:
+            np.divide(X, self._scale, out=X)
+        return X
+
+    def _predict_raw(self, X: np.ndarray):
+        """Labels and probabilities for unscaled feature rows, scoring only rows not in the result cache."""
+        with stage("predict", len(X)):
+            return self._predict_cached(X)
+
+    def _predict_cached(self, X: np.ndarray):
+        classes = np.asarray(self.model.classes_)
+        if (self.cache_namespace is None or not result_cache.enabled or not hasattr(self.model, "predict_proba")
+                or not result_cache.accepts(len(X))):
+            features = self._transform(X)
+            probas = self.predict_proba(features)
+            if probas is None:
+                return self.model.predict(features), None
+            return classes[probas.argmax(axis=1)], probas
+
+        keys = list(zip(*(h.tolist() for h in row_digests(X))))
+        probas, missing = result_cache.get_many(self.cache_namespace, keys, len(classes))
+        if missing.size:
+            fresh = self.predict_proba(self._transform(X[missing]))
+            probas[missing] = fresh
+            result_cache.put_many(self.cache_namespace, [keys[i] for i in missing], fresh)
+        return classes[probas.argmax(axis=1)], probas
+
+    def predict_proba(self, X):
+        """Class probabilities from a single pass through the ensemble.
+
+        For a fitted StackingClassifier the base estimators run concurrently and
+        their outputs feed the meta-learner directly, instead of separate
+        ``predict`` and ``predict_proba`` calls each re-running every base model.
+        """
+        with stage("proba", len(X)):
+            return self._proba(X)
+
+    def _proba(self, X, model=None):
+        model = model if model is not None else self.model
+        if hasattr(model, "final_estimator_") and hasattr(model, "estimators_"):
+            used = [(est, method) for est, method in zip(model.estimators_, model.stack_method_) if est != "drop"]
+            futures = [_base_estimator_pool.submit(getattr(est, method), X) for est, method in used]
+            # The meta-features StackingClassifier.transform builds: a 1-D output as one column, binary
+            # probabilities without their first column, then the raw features with passthrough.
+            binary = len(model.classes_) == 2
+            meta = []
+            for (_, method), future in zip(used, futures):
+                prediction = future.result()
+                if prediction.ndim == 1:
+                    prediction = prediction.reshape(-1, 1)
+                elif binary and method == "predict_proba":
+                    prediction = prediction[:, 1:]
+                meta.append(prediction)
+            if model.passthrough:
+                meta.append(X)
+            return model.final_estimator_.predict_proba(np.hstack(meta))
+        if hasattr(model, "predict_proba"):
+            return model.predict_proba(X)
+        return None
+
+    def build_results(self, ids, preds, probas):
+        """Assemble columnar results and summary counts from raw model output."""
+        with stage("results", len(preds)):
+            return self._build_results(ids, preds, probas)
+
+    def _build_results(self, ids, preds, probas):
+        classes = getattr(self.model, "classes_", None)
+        classes = np.asarray(classes) if classes is not None else np.unique(preds)
+        class_index = np.searchsorted(classes, preds)
+        labels = np.array([LABEL_MAP.get(int(c), str(c)) for c in classes], dtype=object)
+        by_label = dict(zip(labels.tolist(), np.bincount(class_index, minlength=len(classes)).tolist()))
+
+        n = len(preds)
+        if probas is not None:
+            confidence = probas.max(axis=1) * 100
+            probability = probas.tolist()
+            high_confidence = int(np.count_nonzero(confidence > 60))
+            confidence = confidence.tolist()
+        else:
+            probability = confidence = [None] * n
+            high_confidence = 0
+
+        results = {
+            "id": ids.tolist(),
+            "prediction": labels[class_index].tolist(),
+            "probability": probability,
+            "confidence": confidence,
+        }
+        counts = {
+            "total": n,
+            "confirmed": by_label.get("confirmed", 0),
+            "candidate": by_label.get("candidate", 0),
+            "false_positive": by_label.get("false positive", 0),
+            "high_confidence": high_confidence,
+        }
+        return results, counts
+
+    @staticmethod
+    def to_records(results):
+        records = [
+            {"id": i, "prediction": p, "probability": pr, "confidence": c}
+            for i, p, pr, c in zip(results["id"], results["prediction"], results["probability"], results["confidence"])
+        ]
+        for record, neighbors in zip(records, results.get("neighbors", ())):
+            record["neighbors"] = neighbors
+        for record, explanation in zip(records, results.get("explanation", ())):
+            record["explanation"] = explanation
+        return records
+
+    def _feature_importances(self, columns):
         feature_importances = {}
         if hasattr(self.model, "named_estimators_"):
             for est_name, est in self.model.named_estimators_.items():
                 if hasattr(est, "feature_importances_"):
-                    for col, imp in zip(X.columns, est.feature_importances_):
+                    for col, imp in zip(columns, est.feature_importances_):
                         feature_importances[col] = feature_importances.get(col, 0) + imp
 
             total = sum(feature_importances.values())
@@ -78,21 +385,46 @@ class ExoplanetModel:
             )
         else:
             feature_importances = None
+        return feature_importances
 
-        summary = {
-            "total": len(results),
-            "confirmed": mapped_preds.count("confirmed"),
-            "candidate": mapped_preds.count("candidate"),
-            "false_positive": mapped_preds.count("false positive"),
-            "high_confidence": sum(1 for r in results if r["confidence"] and r["confidence"] > 60),
-            "column_importance": feature_importances
-        }
+    def _column_importance(self, columns):
+        if self.metadata is not None and tuple(columns) == self.metadata.input_features:
+            cached = self.metadata.column_importance
+            return dict(cached) if cached is not None else None
+        return self._feature_importances(columns)
+
+    def predict_csv(self, df: pd.DataFrame, id_col: str = None, columnar: bool = False, neighbors: int = 0,
+                    explain: int = 0, explain_rows: int = EXPLAIN_MAX_ROWS):
+        results, summary, columns = self._score(df, id_col, neighbors, explain, explain_rows)
+
+        summary["column_importance"] = self._column_importance(columns)
+
+        return {"summary": summary, "results": results if columnar else self.to_records(results)}
+
+    def predict_chunks(self, chunks, id_col: str = None, neighbors: int = 0, explain: int = 0,
+                       explain_rows: int = EXPLAIN_MAX_ROWS):
+        """Score an iterable of DataFrames, yielding columnar ``(results, summary)`` per chunk.
+
+        ``summary`` is the running total over every chunk scored so far, so the
+        caller never has to keep earlier results around. ``explain_rows`` caps
+        the explained rows of all chunks together.
+        """
+        summary = {"total": 0, "confirmed": 0, "candidate": 0, "false_positive": 0, "high_confidence": 0}
+        columns = None
+        for chunk in chunks:
+            results, counts, columns = self._score(chunk, id_col, neighbors, explain, explain_rows)
+            explain_rows -= counts.get("explained_rows", 0)
+            for key, value in counts.items():
+                summary[key] = summary.get(key, 0) + value
+            yield results, summary
+        summary["column_importance"] = self._column_importance(columns) if columns else None
 
-        return {"summary": summary, "results": results}
-    
     def get_metrics(self):
-            if not self.model:
-                raise ValueError("Model not loaded.")
+        if self.metadata is None:
+            raise ValueError("Model not loaded.")
+        return json.loads(self.metadata.metrics_json)
+
+    def _compute_metrics(self):
             info = {}
             info["model_name"] = os.path.basename(self.model_path)
             classes = getattr(self.model, "classes_", [])
@@ -0,0 +1,157 @@
+"""Nearest known planets of scored rows, in the model's scaled feature space.
+
+Training builds an inverted-file index over the scaler-transformed confirmed
+planets of the training data: a small k-means splits them into cells, and the
+points are stored sorted by cell, in the ``.npy`` directory layout of compiled
+bundles (so it can be memory-mapped and shared the same way)::
+
+    <family>_neighbors/points.npy     (points, features) float32, sorted by cell
+    <family>_neighbors/ids.npy        object id of every point
+    <family>_neighbors/centroids.npy  (cells, features) float32
+    <family>_neighbors/offsets.npy    first point of every cell, plus the total
+
+A query batch is sorted by nearest centroid and cut into blocks; each block is
+scored with one matrix product against the points of every cell its rows
+probe (the ``nprobe`` nearest cells of each row), so neighbouring rows share
+the work and no row is compared with the whole catalogue.
+"""
+import os
+
+import numpy as np
+
+from app.models.compiled import save_compiled
+
+FORMAT_VERSION = 1
+# Classes indexed: confirmed planets only (see LABEL_MAP in model_handler).
+INDEX_CLASSES = (1,)
+NPROBE = int(os.getenv("EXOAI_NEIGHBOR_NPROBE", "8"))
+# Query rows scored per matrix product.
+_BLOCK_ROWS = 1024
+_KMEANS_ITERATIONS = 15
+
+
+def _sq_distances(X, Y, Y_sq):
+    """Squared euclidean distances between the rows of ``X`` and ``Y`` (``Y_sq`` = squared norms of ``Y``)."""
+    d = (X * X).sum(axis=1, dtype=np.float32)[:, None] - 2 * (X @ Y.T) + Y_sq
+    return np.maximum(d, 0, out=d)
+
+
+def _kmeans(X: np.ndarray, cells: int, rng: np.random.Generator):
+    centroids = X[rng.choice(len(X), cells, replace=False)].copy()
+    for _ in range(_KMEANS_ITERATIONS):
+        assign = _sq_distances(X, centroids, (centroids * centroids).sum(axis=1)).argmin(axis=1)
+        counts = np.bincount(assign, minlength=cells)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, X)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids, assign
+
+
+def build_index(X_scaled: np.ndarray, ids: np.ndarray, random_state: int = 42) -> dict:
+    """Index arrays for the scaled rows ``X_scaled``, with about ``sqrt(n)`` cells."""
+    X = np.ascontiguousarray(X_scaled, dtype=np.float32)
+    rng = np.random.default_rng(random_state)
+    cells = max(1, min(len(X), int(np.sqrt(len(X)))))
+    centroids, assign = _kmeans(X, cells, rng)
+    order = np.argsort(assign, kind="stable")
+    offsets = np.searchsorted(assign[order], np.arange(cells + 1)).astype(np.int64)
+    return {
+        "format_version": np.int32(FORMAT_VERSION),
+        "points": X[order],
+        "ids": np.asarray(ids, dtype=str)[order],
+        "centroids": centroids.astype(np.float32),
+        "offsets": offsets,
+    }
+
+
+def export_neighbors(scaler, X: np.ndarray, y: np.ndarray, ids: np.ndarray, path: str, k: int = 10,
+                     random_state: int = 42) -> dict:
+    """Build and save the index of the :data:`INDEX_CLASSES` rows of unscaled ``X``; returns build stats.
+
+    ``recall_at_k`` is the share of exact ``k`` nearest neighbours the index
+    finds with the default ``nprobe``, measured on up to 500 indexed points.
+    Returns None (and writes nothing) when no row is of an indexed class.
+    """
+    known = np.isin(y, INDEX_CLASSES)
+    if not known.any():
+        return None
+    arrays = build_index(scaler.transform(X[known]), ids[known], random_state)
+    save_compiled(arrays, path)
+    index = NeighborIndex(arrays)
+    sample = index.points[np.random.default_rng(random_state).choice(len(index), min(500, len(index)), replace=False)]
+    approx, _ = index.query(sample, k)
+    exact, _ = index.query(sample, k, nprobe=index.cells)
+    found = sum(len(np.intersect1d(a, e)) for a, e in zip(approx, exact))
+    return {
+        "points": len(index),
+        "cells": index.cells,
+        "nprobe": NPROBE,
+        f"recall_at_{k}": round(found / max(exact.size, 1), 4),
+    }
+
+
+class NeighborIndex:
+    """Index written by :func:`export_neighbors`; :meth:`query` returns ``(indices, distances)``."""
+
+    def __init__(self, arrays):
+        self.points = arrays["points"]
+        self.ids = arrays["ids"]
+        self.centroids = arrays["centroids"]
+        self.offsets = arrays["offsets"]
+        self.cells = len(self.centroids)
+        self._sq = (self.points * self.points).sum(axis=1, dtype=np.float32)
+        self._centroid_sq = (self.centroids * self.centroids).sum(axis=1, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.points)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode=None):
+        arrays = {}
+        for name in os.listdir(path):
+            if name.endswith(".npy"):
+                array = np.load(os.path.join(path, name), mmap_mode=mmap_mode, allow_pickle=False)
+                arrays[name[:-4]] = array.view(np.ndarray) if isinstance(array, np.memmap) else array
+        if int(arrays["format_version"]) != FORMAT_VERSION:
+            raise ValueError(f"Unsupported neighbour index format {int(arrays['format_version'])}.")
+        return cls(arrays)
+
+    def query(self, X: np.ndarray, k: int, nprobe: int = NPROBE):
+        """Indices into ``points`` / ``ids`` and euclidean distances of the ``k`` nearest points, nearest first.
+
+        ``nprobe >= cells`` makes the search exact.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        k = min(k, len(self))
+        indices = np.empty((len(X), k), dtype=np.int64)
+        distances = np.empty((len(X), k), dtype=np.float32)
+        if not len(X) or not k:
+            return indices, distances
+        nprobe = max(1, nprobe)
+        exact = nprobe >= self.cells
+        if exact:
+            order = np.arange(len(X))
+        else:
+            to_centroids = _sq_distances(X, self.centroids, self._centroid_sq)
+            probes = np.argpartition(to_centroids, nprobe - 1, axis=1)[:, :nprobe]
+            order = np.argsort(to_centroids.argmin(axis=1), kind="stable")
+        everything = np.arange(len(self))
+        for start in range(0, len(X), _BLOCK_ROWS):
+            rows = order[start:start + _BLOCK_ROWS]
+            candidates = everything
+            if not exact:
+                cells = np.unique(probes[rows])
+                candidates = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in cells])
+                if len(candidates) < k:
+                    candidates = everything
+            if candidates is everything:
+                d = _sq_distances(X[rows], self.points, self._sq)
+            else:
+                d = _sq_distances(X[rows], self.points[candidates], self._sq[candidates])
+            top = np.argpartition(d, k - 1, axis=1)[:, :k]
+            top_d = np.take_along_axis(d, top, axis=1)
+            rank = np.argsort(top_d, axis=1)
+            indices[rows] = candidates[np.take_along_axis(top, rank, axis=1)]
+            distances[rows] = np.sqrt(np.take_along_axis(top_d, rank, axis=1))
+        return indices, distances
@@ -0,0 +1,291 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+import pandas as pd
+from app.models.model_handler import ExoplanetModel, BASE_DIR
+from app.models.result_cache import result_cache
+
+FAMILIES = {"kepler": "kepler_model", "k2": "k2_model"}
+BASE_VERSION = "base"
+CURRENT_FILE = "CURRENT"
+# Root holding the <family>_model/ artifact folders (e.g. a mounted volume); defaults to the in-tree ones.
+MODEL_ROOT = os.getenv("EXOAI_MODEL_ROOT", BASE_DIR)
+POLL_SECONDS = float(os.getenv("EXOAI_REGISTRY_POLL_SECONDS", "5"))
+# auto: serve the compiled bundle when a version has one, else the pickles; compiled/pickle force one.
+MODEL_FORMAT = os.getenv("EXOAI_MODEL_FORMAT", "auto").lower()
+# background: the app warms models on a thread at startup; eager: load while constructing the registry.
+MODEL_LOADING = os.getenv("EXOAI_MODEL_LOADING", "background").lower()
+# Bundled labelled datasets: the training store's seed, and the rows a float32 load is checked against.
+SEED_DATASETS = {
+    "kepler": os.path.join(BASE_DIR, "kepler_model", "Kepler_dataset.csv"),
+    "k2": os.path.join(BASE_DIR, "k2_model", "K2_dataset.csv"),
+}
+PRECISION_CHECK_ROWS = int(os.getenv("EXOAI_PRECISION_CHECK_ROWS", "20000"))
+# Versions requested with ``version=`` kept loaded after their last lease, so repeated requests skip the load.
+# A version replaced as current is never kept: it is unloaded as soon as its last request finishes.
+PINNED_VERSIONS = int(os.getenv("EXOAI_PINNED_VERSIONS", "2"))
+
+
+class UnknownModelVersion(LookupError):
+    pass
+
+
+class ModelNotReady(RuntimeError):
+    pass
+
+
+def family_dir(family: str) -> str:
+    return os.path.join(MODEL_ROOT, FAMILIES[family])
+
+
+def versions_dir(family: str) -> str:
+    return os.path.join(family_dir(family), "versions")
+
+
+def artifact_paths(family: str, version: str):
+    folder = family_dir(family) if version == BASE_VERSION else os.path.join(versions_dir(family), version)
+    return (
+        os.path.join(folder, f"{family}_stacking_classifier.pkl"),
+        os.path.join(folder, f"{family}_scaler.pkl"),
+    )
+
+
+def compiled_path(family: str, version: str) -> str:
+    """The version's compiled bundle: a memory-mappable ``.npy`` directory, else a ``.npz``."""
+    folder = os.path.dirname(artifact_paths(family, version)[0])
+    bundle = os.path.join(folder, f"{family}_compiled")
+    if not os.path.isdir(bundle) and os.path.exists(bundle + ".npz"):
+        return bundle + ".npz"
+    return bundle
+
+
+def neighbors_path(family: str, version: str) -> str:
+    """The version's "similar known planets" index (built by training; absent for older versions)."""
+    return os.path.join(os.path.dirname(artifact_paths(family, version)[0]), f"{family}_neighbors")
+
+
+def serving_paths(family: str, version: str):
+    """``(model_path, scaler_path)`` to load for ``version`` according to ``MODEL_FORMAT``."""
+    bundle = compiled_path(family, version)
+    if MODEL_FORMAT == "compiled" or (MODEL_FORMAT == "auto" and os.path.exists(bundle)):
+        return bundle, None
+    return artifact_paths(family, version)
+
+
+def _has_artifacts(family: str, version: str) -> bool:
+    return os.path.exists(serving_paths(family, version)[0])
+
+
+def new_version_dir(family: str):
+    version = time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + "-" + uuid.uuid4().hex[:6]
+    path = os.path.join(versions_dir(family), version)
+    os.makedirs(path)
+    return version, path
+
+
+def read_current(family: str) -> str:
+    try:
+        with open(os.path.join(versions_dir(family), CURRENT_FILE)) as f:
+            return f.read().strip() or BASE_VERSION
+    except FileNotFoundError:
+        return BASE_VERSION
+
+
+def set_current(family: str, version: str):
+    """Atomically point the family at ``version`` (visible to every worker process)."""
+    if version not in list_versions(family):
+        raise UnknownModelVersion(f"Unknown {family} model version '{version}'.")
+    folder = versions_dir(family)
+    os.makedirs(folder, exist_ok=True)
+    tmp = os.path.join(folder, f".{CURRENT_FILE}.{uuid.uuid4().hex}")
+    with open(tmp, "w") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(folder, CURRENT_FILE))
+
+
+def list_versions(family: str):
+    versions = []
+    if _has_artifacts(family, BASE_VERSION):
+        versions.append(BASE_VERSION)
+    folder = versions_dir(family)
+    if os.path.isdir(folder):
+        for name in sorted(os.listdir(folder)):
+            if _has_artifacts(family, name):
+                versions.append(name)
+    return versions
+
+
+class _LoadedVersion:
+    def __init__(self, version: str, model: ExoplanetModel):
+        self.version = version
+        self.model = model
+        self.in_flight = 0
+        # pinned: requested with ``version=`` while not current; superseded: was current and got replaced.
+        self.pinned = self.superseded = False
+
+
+class ModelRegistry:
+    """Versioned, hot-swappable ``ExoplanetModel`` holder for one model family.
+
+    Requests lease a version through :meth:`acquire`; :meth:`reload` loads the new
+    current version on a background thread and swaps it in under a lock, so
+    in-flight requests finish on the version they started with, and the
+    replaced version is unloaded when its last lease ends. Up to
+    ``PINNED_VERSIONS`` idle versions that clients pinned with ``version=``
+    stay loaded, least recently leased dropped first.
+
+    Unless ``MODEL_LOADING`` is ``eager`` nothing is loaded at construction; the
+    first :meth:`reload` (the app calls it at startup) warms the current
+    version in the background and :meth:`acquire` raises ``ModelNotReady`` until
+    it is in place.
+    """
+
+    def __init__(self, family: str):
+        self.family = family
+        self._lock = threading.Lock()
+        self._loaded = OrderedDict()
+        self._current = None
+        self._checked_at = 0.0
+        self._reloading = None
+        self.load_seconds = None
+        if MODEL_LOADING == "eager":
+            self._reload()
+
+    def _load(self, version: str, check: bool = True) -> _LoadedVersion:
+        if check and version not in list_versions(self.family):
+            raise UnknownModelVersion(f"Unknown {self.family} model version '{version}'.")
+        model_path, scaler_path = serving_paths(self.family, version)
+        model = ExoplanetModel(
+            model_path=model_path, scaler_path=scaler_path, neighbors_path=neighbors_path(self.family, version)
+        )
+        if model.precision == "float32":
+            model.check_precision(pd.read_csv(SEED_DATASETS[self.family], nrows=PRECISION_CHECK_ROWS))
+        if model.metadata is not None:
+            # The etag changes with the artifacts, so a rebuilt version never reuses stale rows.
+            model.cache_namespace = f"{self.family}:{version}:{model.metadata.etag[:12]}:{model.precision}"
+        return _LoadedVersion(version, model)
+
+    @staticmethod
+    def _release(loaded: _LoadedVersion):
+        if loaded.model.cache_namespace is not None:
+            result_cache.invalidate(loaded.model.cache_namespace)
+
+    def _trim(self):
+        """Unload idle superseded versions and pinned ones beyond ``PINNED_VERSIONS`` (call with the lock held)."""
+        idle = [lv for lv in self._loaded.values() if lv is not self._current and lv.in_flight == 0]
+        pinned = [lv for lv in idle if lv.pinned and not lv.superseded]
+        dropped = [lv for lv in idle if not lv.pinned or lv.superseded]
+        dropped += pinned[:max(0, len(pinned) - PINNED_VERSIONS)]
+        for lv in dropped:
+            del self._loaded[lv.version]
+        return dropped
+
+    def _swap(self, loaded: _LoadedVersion):
+        with self._lock:
+            if self._current is not None and self._current is not loaded:
+                self._current.superseded = True
+            loaded.superseded = False
+            self._current = loaded
+            self._loaded[loaded.version] = loaded
+            self._loaded.move_to_end(loaded.version)
+            dropped = self._trim()
+            self._checked_at = time.monotonic()
+        for lv in dropped:
+            self._release(lv)
+
+    @property
+    def current_version(self) -> str:
+        return self._current.version if self._current is not None else None
+
+    def status(self):
+        """``loading`` until the first load finishes, then ``ready`` or ``unavailable`` (load failed)."""
+        current = self._current
+        if current is None:
+            state = "loading"
+        else:
+            state = "ready" if current.model.model is not None else "unavailable"
+        status = {"status": state, "version": self.current_version, "load_seconds": self.load_seconds}
+        if current is not None and current.model.precision_check is not None:
+            status["precision"] = current.model.precision_check
+        return status
+
+    def reload(self, wait: bool = False):
+        """Load the on-disk current version in the background and swap it in."""
+        with self._lock:
+            thread = self._reloading
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._reload, name=f"exoai-reload-{self.family}", daemon=True)
+                self._reloading = thread
+                thread.start()
+        if wait:
+            thread.join()
+
+    def _reload(self):
+        version = read_current(self.family)
+        first = self._current is None
+        if not first and version == self._current.version:
+            self._checked_at = time.monotonic()
+            return
+        started = time.perf_counter()
+        try:
+            loaded = self._load(version, check=not first)
+        except Exception as e:
+            print(f"[WARN] Reload of {self.family} model '{version}' failed: {e}")
+            return
+        self._swap(loaded)
+        if first:
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            print(f"[OK] {self.family} model version {version} loaded in {self.load_seconds}s")
+        else:
+            print(f"[OK] {self.family} model swapped to version {version}")
+
+    def _maybe_refresh(self):
+        if self._current is None or time.monotonic() - self._checked_at < POLL_SECONDS:
+            return
+        self._checked_at = time.monotonic()
+        if read_current(self.family) != self._current.version:
+            self.reload()
+
+    @contextmanager
+    def acquire(self, version: str = None):
+        if self._current is None and version is None:
+            self.reload()
+            raise ModelNotReady(f"The {self.family} model is still loading.")
+        self._maybe_refresh()
+        with self._lock:
+            loaded = self._current if version is None else self._loaded.get(version)
+            if loaded is not None:
+                loaded.in_flight += 1
+                loaded.pinned |= loaded is not self._current and version is not None
+                self._loaded.move_to_end(loaded.version)
+        if loaded is None:
+            pinned = self._load(version)
+            with self._lock:
+                loaded = self._loaded.setdefault(version, pinned)
+                loaded.in_flight += 1
+                loaded.pinned |= loaded is not self._current
+                self._loaded.move_to_end(version)
+        try:
+            yield loaded.model
+        finally:
+            with self._lock:
+                loaded.in_flight -= 1
+                dropped = self._trim() if loaded is not self._current and loaded.in_flight == 0 else []
+            for lv in dropped:
+                self._release(lv)
+
+    def describe(self):
+        with self._lock:
+            loaded = {v: lv.in_flight for v, lv in self._loaded.items()}
+            current = self.current_version
+        return {
+            "model": self.family,
+            "current": current,
+            "versions": [
+                {"version": v, "current": v == current, "loaded": v in loaded, "in_flight": loaded.get(v, 0)}
+                for v in list_versions(self.family)
+            ],
+        }
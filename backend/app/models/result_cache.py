@@ -0,0 +1,210 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+RESULT_CACHE_ROWS = int(os.getenv("EXOAI_RESULT_CACHE_ROWS", "100000"))
+RESULT_CACHE_SPILL = os.getenv("EXOAI_RESULT_CACHE_SPILL", "")
+RESULT_CACHE_SPILL_ROWS = int(os.getenv("EXOAI_RESULT_CACHE_SPILL_ROWS", "1000000"))
+
+_SPILL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    namespace TEXT NOT NULL,
+    h1 INTEGER NOT NULL,
+    h2 INTEGER NOT NULL,
+    proba BLOB NOT NULL,
+    UNIQUE (namespace, h1, h2)
+)
+"""
+_SQL_VARS = 300
+
+
+def _mix(h):
+    # splitmix64 finalizer; uint64 arithmetic wraps, which is what we want here.
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return h
+
+
+def row_digests(X: np.ndarray):
+    """128-bit hash of every row of a float feature matrix, as two int64 arrays.
+
+    Rows are normalized first (float64, -0.0 folded into 0.0), so equal feature
+    vectors hash equally however they were parsed.
+    """
+    bits = np.ascontiguousarray(np.asarray(X, dtype=np.float64) + 0.0).view(np.uint64)
+    h1 = np.full(len(bits), 0x243F6A8885A308D3, dtype=np.uint64)
+    h2 = np.full(len(bits), 0x13198A2E03707344, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(bits.shape[1]):
+            column = bits[:, j]
+            h1 = _mix(h1 + column)
+            h2 = _mix((h2 ^ column) * np.uint64(0x9E3779B97F4A7C15))
+    return h1.view(np.int64), h2.view(np.int64)
+
+
+class ResultCache:
+    """Per-row prediction cache: bounded in-memory LRU with optional SQLite spill.
+
+    Entries are class-probability rows keyed on ``(namespace, row digest)``,
+    where the namespace identifies one loaded model version. Rows evicted from
+    memory are written to the spill file (if configured) and promoted back on a
+    later hit. Thread-safe: the in-memory lock is never held during spill I/O,
+    which has its own lock. Batches larger than ``max_rows`` are not cached
+    (see :meth:`accepts`): they would only evict each other.
+    """
+
+    def __init__(self, max_rows: int = RESULT_CACHE_ROWS, spill_path: str = RESULT_CACHE_SPILL,
+                 spill_max_rows: int = RESULT_CACHE_SPILL_ROWS):
+        self.max_rows = max_rows
+        self.spill_path = spill_path or None
+        self.spill_max_rows = spill_max_rows
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._spill = None
+        self._spill_rows = 0
+        self.hits = self.spill_hits = self.misses = self.evictions = self.spilled = self.bypassed = 0
+        if self.spill_path and max_rows > 0:
+            self._spill = sqlite3.connect(self.spill_path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._spill.execute("PRAGMA journal_mode=WAL")
+            self._spill.execute(_SPILL_SCHEMA)
+            self._spill_rows = self._spill.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rows > 0
+
+    def accepts(self, rows: int) -> bool:
+        """Whether a batch of ``rows`` should go through the cache; larger batches are counted as bypassed."""
+        if rows <= self.max_rows:
+            return True
+        with self._lock:
+            self.bypassed += rows
+        return False
+
+    def get_many(self, namespace: str, keys, n_classes: int):
+        """Return ``(probas, missing)``: cached rows filled in, ``missing`` the indices still to score."""
+        probas = np.empty((len(keys), n_classes), dtype=np.float64)
+        missing = []
+        with self._lock:
+            entries = self._entries
+            for i, key in enumerate(keys):
+                value = entries.get((namespace, key))
+                if value is None:
+                    missing.append(i)
+                    continue
+                entries.move_to_end((namespace, key))
+                probas[i] = value
+            self.hits += len(keys) - len(missing)
+        if missing and self._spill is not None:
+            missing = self._from_spill(namespace, keys, missing, probas)
+        with self._lock:
+            self.misses += len(missing)
+        return probas, np.asarray(missing, dtype=np.intp)
+
+    def put_many(self, namespace: str, keys, probas: np.ndarray):
+        with self._lock:
+            for key, row in zip(keys, probas):
+                self._entries[(namespace, key)] = row.copy()
+                self._entries.move_to_end((namespace, key))
+            evicted = self._evict()
+        self._write_spill(evicted)
+
+    def invalidate(self, namespace: str = None):
+        """Drop every entry of ``namespace`` (or everything), in memory and on disk."""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == namespace]:
+                    del self._entries[key]
+        if self._spill is None:
+            return
+        with self._spill_lock:
+            if namespace is None:
+                self._spill.execute("DELETE FROM results")
+            else:
+                self._spill.execute("DELETE FROM results WHERE namespace = ?", (namespace,))
+            self._spill_rows = self._spill.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.spill_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "max_rows": self.max_rows,
+                "rows": len(self._entries),
+                "spill_path": self.spill_path,
+                "spill_rows": self._spill_rows,
+                "hits": self.hits,
+                "spill_hits": self.spill_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.spill_hits) / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "spilled": self.spilled,
+                "bypassed": self.bypassed,
+            }
+
+    def _evict(self):
+        """Pop the entries over ``max_rows`` (call with the lock held); returns them for :meth:`_write_spill`."""
+        overflow = len(self._entries) - self.max_rows
+        if overflow <= 0:
+            return []
+        self.evictions += overflow
+        return [self._entries.popitem(last=False) for _ in range(overflow)]
+
+    def _write_spill(self, evicted):
+        """Write rows popped by :meth:`_evict` to the spill file, outside the in-memory lock."""
+        if not evicted or self._spill is None:
+            return
+        with self._spill_lock:
+            self._spill.executemany(
+                "INSERT OR REPLACE INTO results (namespace, h1, h2, proba) VALUES (?, ?, ?, ?)",
+                ((ns, h1, h2, row.tobytes()) for (ns, (h1, h2)), row in evicted),
+            )
+            self.spilled += len(evicted)
+            self._spill_rows += len(evicted)
+            if self._spill_rows > self.spill_max_rows:
+                # Re-spilled rows replace themselves, so recount before trimming the oldest.
+                self._spill_rows = self._spill.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if self._spill_rows > self.spill_max_rows:
+                self._spill.execute(
+                    "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY rowid LIMIT ?)",
+                    (self._spill_rows - self.spill_max_rows,),
+                )
+                self._spill_rows = self.spill_max_rows
+
+    def _from_spill(self, namespace, keys, missing, probas):
+        found = {}
+        with self._spill_lock:
+            for start in range(0, len(missing), _SQL_VARS):
+                chunk = [keys[i][0] for i in missing[start:start + _SQL_VARS]]
+                rows = self._spill.execute(
+                    f"SELECT h1, h2, proba FROM results WHERE namespace = ? AND h1 IN ({','.join('?' * len(chunk))})",
+                    [namespace] + chunk,
+                ).fetchall()
+                found.update(((h1, h2), np.frombuffer(proba, dtype=np.float64)) for h1, h2, proba in rows)
+        if not found:
+            return missing
+        still_missing = []
+        with self._lock:
+            for i in missing:
+                row = found.get(keys[i])
+                if row is None:
+                    still_missing.append(i)
+                    continue
+                probas[i] = row
+                self._entries[(namespace, keys[i])] = row
+            self.spill_hits += len(missing) - len(still_missing)
+            evicted = self._evict()
+        self._write_spill(evicted)
+        return still_missing
+
+
+result_cache = ResultCache()
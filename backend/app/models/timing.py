@@ -0,0 +1,26 @@
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """Wall-clock timer for named training stages.
+
+    ``on_stage(name, seconds)`` is called with ``seconds=None`` when a stage starts
+    and with its duration when it finishes.
+    """
+
+    def __init__(self, on_stage=None):
+        self.timings = {}
+        self._on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name: str):
+        if self._on_stage:
+            self._on_stage(name, None)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 3)
+            if self._on_stage:
+                self._on_stage(name, self.timings[name])
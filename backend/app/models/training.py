@@ -0,0 +1,389 @@
+import math
+import os
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, StackingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+from app.models.compiled import export_compiled
+from app.models.neighbors import export_neighbors
+from app.models.timing import StageTimer
+from app.models.tuning import read_tuning, tune, write_tuning
+from app.models.training_store import RETRAIN_MODES, SEED_DATASETS, TARGET_COL, TrainingData, TrainingStore
+
+FAMILIES = {
+    "kepler": {"id_col": "kepid", "dataset_path": SEED_DATASETS["kepler"]},
+    "k2": {"id_col": "pl_name", "dataset_path": SEED_DATASETS["k2"]},
+}
+# Total CPU threads one training run may use, split between parallel CV folds and each model's own threads.
+TRAIN_THREADS = int(os.getenv("EXOAI_TRAIN_THREADS", os.cpu_count() or 1))
+# Fit the standalone RF/XGB diagnostic models and print their reports (they do not feed the served model).
+TRAIN_BASELINES = os.getenv("EXOAI_TRAIN_BASELINES", "0").lower() in ("1", "true", "yes")
+# An /ingest retrain rebuilds from scratch instead of updating the current model once the new or changed
+# rows exceed this share of the training store, or their mean feature shift (in training SDs) exceeds the drift threshold.
+FULL_RETRAIN_FRACTION = float(os.getenv("EXOAI_FULL_RETRAIN_FRACTION", "0.2"))
+DRIFT_THRESHOLD = float(os.getenv("EXOAI_DRIFT_THRESHOLD", "0.5"))
+# Drift is only measured on this many new rows or more: the mean of n rows wanders by about 0.8 / sqrt(n)
+# training SDs by chance alone, so a one- or two-row upload would always look drifted.
+DRIFT_MIN_ROWS = int(os.getenv("EXOAI_DRIFT_MIN_ROWS", "50"))
+# Search the RF/XGBoost hyperparameters (app/models/tuning.py) before a full rebuild, within this much CPU time.
+TRAIN_TUNE = os.getenv("EXOAI_TRAIN_TUNE", "0").lower() in ("1", "true", "yes")
+TUNE_CPU_SECONDS = float(os.getenv("EXOAI_TUNE_CPU_SECONDS", "1800"))
+
+
+@dataclass
+class TrainingConfig:
+    """Knobs of the training pipeline; defaults are what ``/ingest`` retrains with."""
+
+    baselines: bool = TRAIN_BASELINES
+    threads: int = TRAIN_THREADS
+    cv: int = 5
+    # Rounds without validation-loss improvement before XGBoost stops; None trains all n_estimators.
+    early_stopping_rounds: Optional[int] = 50
+    validation_size: float = 0.15
+    rf_params: dict = field(default_factory=lambda: {"n_estimators": 300, "max_depth": 12})
+    xgb_params: dict = field(default_factory=lambda: {"n_estimators": 500, "max_depth": 8})
+    random_state: int = 42
+    full_retrain_fraction: float = FULL_RETRAIN_FRACTION
+    drift_threshold: float = DRIFT_THRESHOLD
+    drift_min_rows: int = DRIFT_MIN_ROWS
+    # Stored rows replayed next to the new ones in an incremental update, per new row.
+    replay_ratio: float = 1.0
+    # Fewest RF trees / XGBoost rounds an incremental update adds.
+    min_incremental_estimators: int = 10
+    tune: bool = TRAIN_TUNE
+    tune_cpu_seconds: float = TUNE_CPU_SECONDS
+    tune_candidates: int = 27
+
+    def thread_split(self):
+        """``(fold_jobs, model_threads)``: parallel CV folds times threads per model stays within ``threads``."""
+        threads = max(1, self.threads)
+        fold_jobs = min(self.cv, threads)
+        return fold_jobs, max(1, threads // fold_jobs)
+
+
+def _xgb(config: TrainingConfig, threads: int, **params):
+    return XGBClassifier(
+        tree_method="hist", n_jobs=threads, random_state=config.random_state, **{**config.xgb_params, **params}
+    )
+
+
+def _save(family: str, stack, scaler, output_dir: str, X_check, timer: StageTimer):
+    with timer.stage("save"):
+        model_path = os.path.join(output_dir, f"{family}_stacking_classifier.pkl")
+        scaler_path = os.path.join(output_dir, f"{family}_scaler.pkl")
+        joblib.dump(stack, model_path)
+        joblib.dump(scaler, scaler_path)
+
+    with timer.stage("compile"):
+        compiled_path = os.path.join(output_dir, f"{family}_compiled")
+        compiled_max_diff = export_compiled(stack, scaler, compiled_path, X_check=X_check)
+    return model_path, scaler_path, compiled_max_diff
+
+
+def _index_neighbors(family: str, scaler, data: TrainingData, output_dir: str, timer: StageTimer, config):
+    """Write the "similar known planets" index of ``data`` next to the artifacts; returns its build stats."""
+    with timer.stage("neighbors"):
+        return export_neighbors(
+            scaler, data.frame(), data.y, data.ids, os.path.join(output_dir, f"{family}_neighbors"),
+            random_state=config.random_state,
+        )
+
+
+def train_model(family: str, dataset_path: str = None, output_dir: str = ".", target_col: str = TARGET_COL,
+                on_stage=None, config: TrainingConfig = None, data: TrainingData = None):
+    """Train, save and compile the stacking ensemble of one model family.
+
+    Trains on ``data`` if given, else on the CSV at ``dataset_path``, else on
+    the family's :class:`TrainingStore`. Returns ``(metrics, model_path, scaler_path)``;
+    ``metrics["stage_seconds"]`` holds the wall-clock time of every stage.
+    With ``config.tune`` the RF/XGBoost parameters are searched first on the
+    training split and the report is saved as ``tuning.json`` in ``output_dir``.
+    """
+    config = config or TrainingConfig()
+    fold_jobs, model_threads = config.thread_split()
+    timer = StageTimer(on_stage)
+
+    with timer.stage("load_data"):
+        if data is None:
+            store = TrainingStore(family)
+            if dataset_path:
+                df = pd.read_csv(dataset_path, dtype=store.schema.dtypes).rename(columns={target_col: TARGET_COL})
+                data = store.to_data(df)
+            else:
+                data = store.load()
+
+    with timer.stage("split_scale"):
+        X, y = data.frame(), data.y
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, stratify=y, random_state=config.random_state
+        )
+
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+
+    tuning = None
+    if config.tune:
+        with timer.stage("tune"):
+            tuning = tune(
+                X_train.to_numpy(), y_train, config.rf_params, config.xgb_params, cv=config.cv,
+                candidates=config.tune_candidates, cpu_seconds=config.tune_cpu_seconds, threads=config.threads,
+                random_state=config.random_state,
+            )
+            write_tuning(tuning, output_dir)
+            config = replace(config, rf_params=tuning["best"]["rf"], xgb_params=tuning["best"]["xgb"])
+
+    if config.baselines:
+        with timer.stage("baseline_rf"):
+            rf = RandomForestClassifier(
+                n_estimators=400,
+                max_depth=15,
+                class_weight="balanced_subsample",
+                random_state=config.random_state,
+                n_jobs=config.threads,
+            )
+            rf.fit(X_train, y_train)
+            y_pred_rf = rf.predict(X_test)
+            print("Random Forest metrics:")
+            print(confusion_matrix(y_test, y_pred_rf))
+            print(classification_report(y_test, y_pred_rf))
+
+        with timer.stage("baseline_xgb"):
+            xgb = _xgb(
+                config, config.threads,
+                n_estimators=600, learning_rate=0.03, subsample=0.8, colsample_bytree=0.8, eval_metric="mlogloss",
+            )
+            xgb.fit(X_train, y_train)
+            y_pred_xgb = xgb.predict(X_test)
+            print("XGBoost metrics:")
+            print(classification_report(y_test, y_pred_xgb))
+
+    xgb_rounds = config.xgb_params.get("n_estimators", 100)
+    if config.early_stopping_rounds:
+        # StackingClassifier cannot pass an eval_set to its clones, so find the round count once on a
+        # held-out slice of the training split and fit the stacked XGBoost with exactly that many.
+        with timer.stage("xgb_early_stopping"):
+            X_fit, X_val, y_fit, y_val = train_test_split(
+                X_train_scaled, y_train, test_size=config.validation_size, stratify=y_train,
+                random_state=config.random_state,
+            )
+            probe = _xgb(config, config.threads, eval_metric="mlogloss",
+                         early_stopping_rounds=config.early_stopping_rounds)
+            probe.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+            xgb_rounds = probe.best_iteration + 1
+
+    with timer.stage("stacking"):
+        stack = StackingClassifier(
+            estimators=[
+                ("rf", RandomForestClassifier(
+                    random_state=config.random_state, n_jobs=model_threads, **config.rf_params
+                )),
+                ("xgb", _xgb(config, model_threads, n_estimators=xgb_rounds)),
+            ],
+            final_estimator=LogisticRegression(max_iter=1000),
+            cv=config.cv,
+            n_jobs=fold_jobs,
+        )
+        stack.fit(X_train_scaled, y_train)
+        y_pred_stack = stack.predict(X_test_scaled)
+        print("Stacking Classifier metrics:")
+        print(classification_report(y_test, y_pred_stack))
+
+    model_path, scaler_path, compiled_max_diff = _save(family, stack, scaler, output_dir, X_test, timer)
+    neighbors = _index_neighbors(family, scaler, data, output_dir, timer, config)
+
+    metrics = {
+        "model_name": os.path.basename(model_path),
+        "accuracy": round(accuracy_score(y_test, y_pred_stack), 4),
+        "classes": np.unique(y).tolist(),
+        "features": list(X.columns),
+        "last_trained": datetime.utcnow().isoformat() + "Z",
+        "compiled_max_abs_diff": compiled_max_diff,
+        "xgb_rounds": xgb_rounds,
+        "threads": {"fold_jobs": fold_jobs, "model_threads": model_threads},
+        "params": {"rf": config.rf_params, "xgb": config.xgb_params},
+        "neighbors": neighbors,
+        "stage_seconds": timer.timings,
+    }
+    if tuning:
+        metrics["tuning"] = {key: tuning[key] for key in ("best", "current", "cpu_seconds", "budget_exhausted")}
+
+    return metrics, model_path, scaler_path
+
+
+
+def _drift(scaler, X, min_rows: int = DRIFT_MIN_ROWS):
+    """Mean absolute shift of the feature means of ``X``, in training standard deviations.
+
+    None for fewer than ``min_rows`` rows, whose means are too noisy to tell drift from chance.
+    """
+    if len(X) < max(min_rows, 1):
+        return None
+    return float(np.abs(scaler.transform(X).mean(axis=0)).mean())
+
+
+def _replay_indices(y: np.ndarray, n: int, random_state: int) -> np.ndarray:
+    """Up to ``n`` row indices, split evenly over the classes of ``y`` so every class is present."""
+    rng = np.random.default_rng(random_state)
+    classes = np.unique(y)
+    per_class = max(1, math.ceil(n / max(len(classes), 1)))
+    picks = []
+    for label in classes:
+        rows = np.flatnonzero(y == label)
+        picks.append(rng.choice(rows, min(len(rows), per_class), replace=False))
+    return np.sort(np.concatenate(picks)) if picks else np.empty(0, dtype=np.intp)
+
+
+def update_model(family: str, stack, scaler, data: TrainingData, fresh: TrainingData, output_dir: str,
+                 timer: StageTimer = None, config: TrainingConfig = None):
+    """Grow a fitted stacking ensemble with ``fresh`` rows instead of refitting it.
+
+    The RandomForest gets warm-start trees and XGBoost keeps boosting from its
+    booster, both on the fresh rows plus a class-balanced replay sample of
+    ``data`` (the whole store), so the work scales with the upload. The scaler
+    and the meta-learner are kept as they are. Tree and round counts grow with
+    the fresh rows' share of the store.
+
+    Returns ``(metrics, model_path, scaler_path)``; ``metrics["upload_accuracy"]``
+    is the accuracy of the previous model on the fresh rows, measured before
+    they were learned.
+    """
+    config = config or TrainingConfig()
+    timer = timer or StageTimer()
+    rf, xgb = stack.named_estimators_["rf"], stack.named_estimators_["xgb"]
+    upload_accuracy = None
+
+    if len(fresh):
+        with timer.stage("evaluate_upload"):
+            upload_accuracy = round(accuracy_score(fresh.y, stack.predict(scaler.transform(fresh.frame()))), 4)
+
+        with timer.stage("replay_sample"):
+            replay = data.take(_replay_indices(data.y, math.ceil(config.replay_ratio * len(fresh)), config.random_state))
+            X_fit = scaler.transform(pd.concat([replay.frame(), fresh.frame()], ignore_index=True))
+            y_fit = np.searchsorted(stack.classes_, np.concatenate([replay.y, fresh.y]))
+            share = len(fresh) / max(len(data), 1)
+
+        with timer.stage("update_rf"):
+            extra_trees = max(config.min_incremental_estimators, math.ceil(len(rf.estimators_) * share))
+            rf.set_params(warm_start=True, n_estimators=len(rf.estimators_) + extra_trees, n_jobs=config.threads)
+            rf.fit(X_fit, y_fit)
+            rf.set_params(warm_start=False)
+
+        with timer.stage("update_xgb"):
+            booster = xgb.get_booster()
+            extra_rounds = max(config.min_incremental_estimators, math.ceil(booster.num_boosted_rounds() * share))
+            boosted = XGBClassifier(**{**xgb.get_params(), "n_estimators": extra_rounds, "n_jobs": config.threads})
+            boosted.fit(X_fit, y_fit, xgb_model=booster, verbose=False)
+            stack.estimators_[list(stack.named_estimators_).index("xgb")] = boosted
+            stack.named_estimators_["xgb"] = xgb = boosted
+
+    X_check = fresh.frame() if len(fresh) else data.frame().iloc[-100:]
+    model_path, scaler_path, compiled_max_diff = _save(family, stack, scaler, output_dir, X_check, timer)
+    neighbors = _index_neighbors(family, scaler, data, output_dir, timer, config)
+
+    metrics = {
+        "model_name": os.path.basename(model_path),
+        "accuracy": None,
+        "upload_accuracy": upload_accuracy,
+        "classes": stack.classes_.tolist(),
+        "features": list(data.features),
+        "last_trained": datetime.utcnow().isoformat() + "Z",
+        "compiled_max_abs_diff": compiled_max_diff,
+        "rf_trees": len(rf.estimators_),
+        "xgb_rounds": xgb.get_booster().num_boosted_rounds(),
+        "neighbors": neighbors,
+        "stage_seconds": timer.timings,
+    }
+    return metrics, model_path, scaler_path
+
+
+def _full_retrain_reason(mode, counts, previous, fresh: TrainingData, config):
+    """Why an ``auto`` retrain must rebuild from scratch, or None when an update will do."""
+    if mode == "full":
+        return "requested"
+    if previous is None:
+        return "no_previous_model"
+    stack, scaler = previous
+    if set(np.unique(fresh.y).tolist()) - set(stack.classes_.tolist()):
+        return "new_class"
+    if mode == "incremental":
+        return None
+    if counts["fresh_rows"] / max(counts["store_rows"], 1) > config.full_retrain_fraction:
+        return "new_data_fraction"
+    drift = _drift(scaler, fresh.frame(), config.drift_min_rows)
+    if drift is not None and drift > config.drift_threshold:
+        return "drift"
+    return None
+
+
+def retrain(family: str, output_dir: str, upload_path: str = None, previous_model_path: str = None,
+            previous_scaler_path: str = None, mode: str = "auto", on_stage=None, config: TrainingConfig = None):
+    """Append the rows in ``upload_path`` to the training store and retrain on it.
+
+    ``auto`` updates the previous model (:func:`update_model`) unless the new or
+    changed rows pass ``config.full_retrain_fraction`` or ``config.drift_threshold``
+    (drift is only judged on at least ``config.drift_min_rows`` rows);
+    ``incremental`` updates whenever it can and ``full`` always rebuilds with
+    :func:`train_model`. A rebuild also happens without a previous pickled model
+    or when the upload brings a class it has never seen.
+
+    Returns ``(metrics, model_path, scaler_path)``; ``metrics["mode"]`` says which
+    path ran, ``metrics["reason"]`` why a rebuild was needed and ``metrics["rows"]``
+    how many rows were added, updated or unchanged. Unless ``config.tune`` is
+    set, a rebuild reuses the parameters in the previous version's ``tuning.json``.
+    """
+    if mode not in RETRAIN_MODES:
+        raise ValueError(f"mode must be one of {', '.join(RETRAIN_MODES)}.")
+    config = config or TrainingConfig()
+    timer = StageTimer(on_stage)
+    store = TrainingStore(family)
+
+    with timer.stage("append_store"):
+        if upload_path:
+            rows = pd.read_csv(upload_path, dtype=store.schema.dtypes)
+        else:
+            rows = pd.DataFrame(columns=store.schema.columns)
+        fresh_rows, counts = store.append(rows)
+        fresh = store.to_data(fresh_rows)
+
+    previous = None
+    if mode != "full" and previous_model_path and os.path.exists(previous_model_path):
+        with timer.stage("load_previous"):
+            previous = joblib.load(previous_model_path), joblib.load(previous_scaler_path)
+
+    reason = _full_retrain_reason(mode, counts, previous, fresh, config)
+    if reason is None:
+        stack, scaler = previous
+        with timer.stage("load_data"):
+            data = store.load()
+        metrics, model_path, scaler_path = update_model(
+            family, stack, scaler, data, fresh, output_dir, timer=timer, config=config
+        )
+    else:
+        tuned = read_tuning(os.path.dirname(previous_model_path)) if previous_model_path else None
+        if tuned and not config.tune:
+            # Rebuild with the parameters found by the last search, and keep its report with the new version.
+            config = replace(config, rf_params=tuned["best"]["rf"], xgb_params=tuned["best"]["xgb"])
+            write_tuning(tuned, output_dir)
+        metrics, model_path, scaler_path = train_model(family, output_dir=output_dir, on_stage=on_stage, config=config)
+        metrics["stage_seconds"] = {**timer.timings, **metrics["stage_seconds"]}
+    drift = _drift(previous[1], fresh.frame(), config.drift_min_rows) if previous else None
+    metrics.update({
+        "mode": "incremental" if reason is None else "full",
+        "reason": reason,
+        "rows": counts,
+        "new_fraction": round(counts["fresh_rows"] / max(counts["store_rows"], 1), 4),
+        "drift": round(drift, 4) if drift is not None else None,
+    })
+    return metrics, model_path, scaler_path
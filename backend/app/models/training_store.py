@@ -0,0 +1,274 @@
+"""Append-only, memory-mappable training-data store of one model family.
+
+Rows live in segments, each a directory of ``.npy`` files (the same layout as
+compiled model bundles)::
+
+    versions/training_store/
+        manifest.json         features, segments and the live-row mask of each
+        000001/features.npy   (rows, features) float64
+        000001/target.npy     int64 class labels
+        000001/ids.npy        object ids (kepid / pl_name) as fixed-width strings
+        000001/keys.npy       dedup keys, see KEY_COLUMNS
+        000001/hashes.npy     uint64 hash of every row, to detect unchanged re-uploads
+        000001/live-1.npy     rows not replaced by a later upload
+
+The store is seeded once from the bundled CSV. An append writes a new segment
+and new live masks, then swaps the manifest, so a crash never loses rows.
+Loads memory-map the arrays; with a single segment and no replaced rows the
+feature matrix and target are returned without any copy, and appends compact
+the store back to that state once it fragments.
+"""
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from app.data.data import TARGET_LABELS
+from app.data.validation import INGEST_SCHEMAS
+from app.models.registry import SEED_DATASETS, versions_dir
+
+FORMAT_VERSION = 1
+STORE_DIR = "training_store"
+MANIFEST_FILE = "manifest.json"
+TARGET_COL = "target"
+# Columns identifying one stored row. A Kepler star (kepid) can host several KOIs, and the K2
+# table holds several parameter solutions per planet, so a K2 upload replaces all rows of its pl_name.
+KEY_COLUMNS = {"kepler": ["kepid", "koi_tce_plnt_num"], "k2": ["pl_name"]}
+RETRAIN_MODES = ("auto", "incremental", "full")
+# Appends rewrite the store as one segment past this many segments or this share of replaced rows.
+MAX_SEGMENTS = int(os.getenv("EXOAI_STORE_MAX_SEGMENTS", "8"))
+MAX_DEAD_FRACTION = 0.25
+
+
+@dataclass
+class TrainingData:
+    """Feature matrix, labels and object ids of a set of training rows."""
+
+    features: list
+    X: np.ndarray
+    y: np.ndarray
+    ids: np.ndarray
+
+    def __len__(self):
+        return len(self.y)
+
+    def frame(self) -> pd.DataFrame:
+        """The features as a DataFrame over ``X`` (no copy for a float64 matrix)."""
+        return pd.DataFrame(self.X, columns=self.features, copy=False)
+
+    def take(self, indices) -> "TrainingData":
+        return TrainingData(self.features, self.X[indices], self.y[indices], self.ids[indices])
+
+
+class TrainingStore:
+    """Deduplicated training rows of one model family (see the module docstring for the layout).
+
+    :meth:`append` upserts rows by :data:`KEY_COLUMNS` and returns the ones that
+    are new or changed; only those carry information the current model has not
+    seen. :meth:`load` returns every live row. One training job per family runs
+    at a time, so there is a single writer.
+    """
+
+    def __init__(self, family: str, seed_path: str = None, path: str = None):
+        self.family = family
+        self.seed_path = seed_path or SEED_DATASETS[family]
+        self.schema = INGEST_SCHEMAS[family]
+        self.keys = KEY_COLUMNS[family]
+        self.id_col = self.schema.string_columns[0]
+        self.features = [col for col in self.schema.columns if col not in (self.id_col, TARGET_COL)]
+        self.path = path or os.path.join(versions_dir(family), STORE_DIR)
+
+    def normalize(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """Rows in schema column order with string ids and integer labels, as stored and hashed."""
+        rows = rows[self.schema.columns].astype({col: np.float64 for col in self.features})
+        target = rows[TARGET_COL].to_numpy(dtype=np.float64)
+        bad = ~np.isin(target, TARGET_LABELS)
+        if bad.any():
+            # Uploads are checked by INGEST_SCHEMAS; this keeps any other caller from storing a made-up class.
+            raise ValueError(
+                f"{int(bad.sum())} row(s) have a target outside {TARGET_LABELS}: {target[bad][:5].tolist()}"
+            )
+        return rows.astype({self.id_col: str, TARGET_COL: np.int64}).reset_index(drop=True)
+
+    def to_data(self, rows: pd.DataFrame) -> TrainingData:
+        rows = self.normalize(rows)
+        return TrainingData(
+            self.features,
+            rows[self.features].to_numpy(dtype=np.float64),
+            rows[TARGET_COL].to_numpy(),
+            rows[self.id_col].to_numpy(dtype=str),
+        )
+
+    def _key(self, rows: pd.DataFrame) -> np.ndarray:
+        key = rows[self.keys[0]].astype(str)
+        for col in self.keys[1:]:
+            key = key.str.cat(rows[col].astype(str), sep="|")
+        return key.to_numpy(dtype=str)
+
+    @staticmethod
+    def _hashes(rows: pd.DataFrame) -> np.ndarray:
+        return pd.util.hash_pandas_object(rows, index=False).to_numpy(dtype=np.uint64)
+
+    @staticmethod
+    def _signatures(keys: np.ndarray, hashes: np.ndarray) -> dict:
+        """Key -> sorted row hashes, so a key's rows compare equal regardless of order."""
+        if not len(keys):
+            return {}
+        order = np.lexsort((hashes, keys))
+        keys, hashes = keys[order], hashes[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        return {str(k): tuple(h.tolist()) for k, h in zip(keys[starts], np.split(hashes, starts[1:]))}
+
+    def _read_manifest(self) -> dict:
+        path = os.path.join(self.path, MANIFEST_FILE)
+        if not os.path.exists(path):
+            self._seed()
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: dict):
+        tmp = os.path.join(self.path, f".{MANIFEST_FILE}.{uuid.uuid4().hex}")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, os.path.join(self.path, MANIFEST_FILE))
+
+    def _seed(self):
+        os.makedirs(self.path, exist_ok=True)
+        rows = pd.read_csv(self.seed_path, usecols=self.schema.columns, dtype=self.schema.dtypes)
+        manifest = {"format_version": FORMAT_VERSION, "features": self.features, "generation": 0, "segments": []}
+        manifest["segments"].append(self._write_segment(manifest, self.normalize(rows).drop_duplicates()))
+        self._write_manifest(manifest)
+
+    def _write_segment(self, manifest: dict, rows: pd.DataFrame) -> dict:
+        """Write normalized ``rows`` as a new, fully live segment and return its manifest entry."""
+        manifest["generation"] += 1
+        name, live = f"{manifest['generation']:06d}", f"live-{manifest['generation']}"
+        arrays = {
+            "features": rows[self.features].to_numpy(dtype=np.float64),
+            "target": rows[TARGET_COL].to_numpy(dtype=np.int64),
+            "ids": rows[self.id_col].to_numpy(dtype=str),
+            "keys": self._key(rows),
+            "hashes": self._hashes(rows),
+            live: np.ones(len(rows), dtype=bool),
+        }
+        tmp = os.path.join(self.path, f".{name}.tmp-{uuid.uuid4().hex[:6]}")
+        os.makedirs(tmp)
+        for key, value in arrays.items():
+            np.save(os.path.join(tmp, f"{key}.npy"), value, allow_pickle=False)
+        os.replace(tmp, os.path.join(self.path, name))
+        return {"name": name, "rows": len(rows), "live": live}
+
+    def _array(self, segment: dict, key: str, mmap: bool = True) -> np.ndarray:
+        path = os.path.join(self.path, segment["name"], f"{key}.npy")
+        return np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+
+    def _live_rows(self, manifest: dict) -> int:
+        return int(sum(np.count_nonzero(self._array(s, s["live"])) for s in manifest["segments"]))
+
+    def __len__(self):
+        return self._live_rows(self._read_manifest())
+
+    def load(self, mmap: bool = True) -> TrainingData:
+        """Every live row; with one fully live segment ``X`` and ``y`` are the memory-mapped arrays."""
+        manifest = self._read_manifest()
+        parts = []
+        for segment in manifest["segments"]:
+            live = self._array(segment, segment["live"])
+            arrays = [self._array(segment, key, mmap) for key in ("features", "target", "ids")]
+            if not live.all():
+                keep = np.flatnonzero(live)
+                arrays = [a[keep] for a in arrays]
+            parts.append(arrays)
+        if len(parts) == 1:
+            X, y, ids = parts[0]
+        else:
+            X, y, ids = (np.concatenate(column) for column in zip(*parts))
+        return TrainingData(manifest["features"], X, y, ids)
+
+    def frame(self) -> pd.DataFrame:
+        """Every live row as a DataFrame in schema column order."""
+        data = self.load(mmap=False)
+        df = data.frame()
+        df.insert(0, self.id_col, data.ids)
+        df[TARGET_COL] = data.y
+        return df[self.schema.columns]
+
+    def append(self, rows: pd.DataFrame):
+        """Upsert ``rows``; returns ``(fresh, counts)``: the new or changed rows and row counts.
+
+        Upload rows replace every stored row with the same key; a key whose
+        uploaded rows equal the stored ones is counted as unchanged and not
+        written again.
+        """
+        manifest = self._read_manifest()
+        rows = self.normalize(rows).drop_duplicates().reset_index(drop=True)
+        keys, hashes = self._key(rows), self._hashes(rows)
+        uploaded = np.unique(keys)
+
+        stored_keys, stored_hashes, matches = [], [], []
+        for segment in manifest["segments"]:
+            match = np.isin(self._array(segment, "keys"), uploaded) & self._array(segment, segment["live"])
+            matches.append(match)
+            stored_keys.append(np.asarray(self._array(segment, "keys")[match]))
+            stored_hashes.append(np.asarray(self._array(segment, "hashes")[match]))
+        before = self._signatures(np.concatenate(stored_keys), np.concatenate(stored_hashes))
+        after = self._signatures(keys, hashes)
+        unchanged = np.array([key for key, signature in after.items() if before.get(key) == signature], dtype=str)
+        is_fresh = ~np.isin(keys, unchanged)
+        fresh = rows[is_fresh].reset_index(drop=True)
+
+        if len(fresh):
+            replaced = np.unique(keys[is_fresh])
+            generation = manifest["generation"] + 1
+            for segment, match in zip(manifest["segments"], matches):
+                dead = match & np.isin(self._array(segment, "keys"), replaced)
+                if dead.any():
+                    live = self._array(segment, segment["live"], mmap=False) & ~dead
+                    segment["live"] = f"live-{generation}"
+                    np.save(os.path.join(self.path, segment["name"], f"{segment['live']}.npy"), live)
+            manifest["segments"].append(self._write_segment(manifest, fresh))
+            self._write_manifest(manifest)
+            self._tidy(manifest)
+
+        counts = {
+            "added": len(uploaded) - len(before),
+            "updated": len(before) - len(unchanged),
+            "unchanged": len(unchanged),
+            "fresh_rows": len(fresh),
+            "store_rows": len(self),
+        }
+        return fresh, counts
+
+    def _tidy(self, manifest: dict):
+        total = sum(segment["rows"] for segment in manifest["segments"])
+        if len(manifest["segments"]) > MAX_SEGMENTS or total - self._live_rows(manifest) > MAX_DEAD_FRACTION * total:
+            self.compact()
+            return
+        for segment in manifest["segments"]:
+            folder = os.path.join(self.path, segment["name"])
+            for name in os.listdir(folder):
+                if name.startswith("live-") and name != f"{segment['live']}.npy":
+                    os.remove(os.path.join(folder, name))
+
+    def compact(self):
+        """Rewrite the live rows as a single segment, so loads are zero-copy again."""
+        rows = self.normalize(self.frame())
+        manifest = self._read_manifest()
+        old = [segment["name"] for segment in manifest["segments"]]
+        manifest["segments"] = [self._write_segment(manifest, rows)]
+        self._write_manifest(manifest)
+        for name in old:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+
+def stage_upload(family: str, rows: pd.DataFrame) -> str:
+    """Write validated upload rows where a training job in another process can read them."""
+    folder = os.path.join(versions_dir(family), "incoming")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{uuid.uuid4().hex}.csv")
+    rows.to_csv(path, index=False)
+    return path
@@ -0,0 +1,242 @@
+"""Hyperparameter search for the stacking ensemble by successive halving.
+
+Candidates are drawn from :data:`SEARCH_SPACE` (the configuration being
+replaced is always one of them) and scored the way ``StackingClassifier``
+trains: out-of-fold Random Forest and XGBoost probabilities over ``cv``
+folds, then the cross-validated accuracy of the logistic meta-learner on them.
+Every candidate is scored on a small stratified sample first; each rung keeps
+the best ``1 / eta`` and gives them ``eta`` times more rows, until the
+survivors are scored on all rows.
+
+The scaled folds of every rung are computed once and saved as ``.npy`` files
+that the worker processes memory-map, so no candidate rescales data or
+receives it pickled. Workers report the CPU time they used. An evaluation
+starts only while the CPU already used plus the estimated cost of the running
+ones and of the new one (the costliest evaluation of the rung so far, or the
+previous rung's scaled by its rows) fits in ``cpu_seconds``; if the running
+evaluations still overrun the budget they are killed. The best candidate of
+the highest rung reached wins. The evaluations run on a ``multiprocessing``
+pool, whose ``terminate()`` is what kills them.
+"""
+import json
+import math
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+from functools import lru_cache
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+TUNING_FILE = "tuning.json"
+SEARCH_SPACE = {
+    "rf": {
+        "n_estimators": [100, 200, 300, 600],
+        "max_depth": [8, 12, 16, None],
+        "min_samples_leaf": [1, 2, 4],
+        "max_features": ["sqrt", 0.5],
+    },
+    "xgb": {
+        "n_estimators": [200, 300, 500, 800],
+        "max_depth": [4, 6, 8],
+        "learning_rate": [0.03, 0.1, 0.3],
+        "subsample": [0.8, 1.0],
+        "colsample_bytree": [0.8, 1.0],
+    },
+}
+# A rung never scores on fewer rows than this, so small families still have usable folds.
+MIN_RUNG_ROWS = 400
+# How often the search re-checks the CPU budget while evaluations are running.
+POLL_SECONDS = 1.0
+
+
+def grid_size(space: dict = SEARCH_SPACE) -> int:
+    return math.prod(len(values) for params in space.values() for values in params.values())
+
+
+def _sample(space: dict, n: int, rng: np.random.Generator, first: dict):
+    """``first`` plus up to ``n - 1`` distinct random points of ``space``."""
+    candidates, seen = [first], {json.dumps(first, sort_keys=True)}
+    for _ in range(20 * n):
+        if len(candidates) >= n:
+            break
+        point = {model: {key: values[rng.integers(len(values))] for key, values in params.items()}
+                 for model, params in space.items()}
+        key = json.dumps(point, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            candidates.append(point)
+    return candidates
+
+
+def _cache_folds(folder: str, X: np.ndarray, y: np.ndarray, cv: int, random_state: int):
+    """Scale and save the ``cv`` folds of ``X``; the scaler is fit on each fold's training part."""
+    os.makedirs(folder)
+    folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    for k, (train, val) in enumerate(folds.split(X, y)):
+        scaler = StandardScaler().fit(X[train])
+        arrays = {
+            "X_train": scaler.transform(X[train]), "y_train": y[train],
+            "X_val": scaler.transform(X[val]), "y_val": y[val],
+        }
+        for name, value in arrays.items():
+            np.save(os.path.join(folder, f"{name}-{k}.npy"), value, allow_pickle=False)
+
+
+@lru_cache(maxsize=64)
+def _fold(folder: str, k: int):
+    return tuple(
+        np.load(os.path.join(folder, f"{name}-{k}.npy"), mmap_mode="r")
+        for name in ("X_train", "y_train", "X_val", "y_val")
+    )
+
+
+def _evaluate(folder: str, cv: int, params: dict, threads: int, random_state: int):
+    """``(accuracy, cpu_seconds)`` of one candidate on one rung's cached folds (runs in a worker process)."""
+    started = time.process_time()
+    features, labels = [], []
+    for k in range(cv):
+        X_train, y_train, X_val, y_val = _fold(folder, k)
+        rf = RandomForestClassifier(random_state=random_state, n_jobs=threads, **params["rf"])
+        xgb = XGBClassifier(tree_method="hist", n_jobs=threads, random_state=random_state, **params["xgb"])
+        features.append(np.hstack([rf.fit(X_train, y_train).predict_proba(X_val),
+                                   xgb.fit(X_train, y_train).predict_proba(X_val)]))
+        labels.append(np.asarray(y_val))
+    features, labels = np.vstack(features), np.concatenate(labels)
+    meta = cross_val_predict(LogisticRegression(max_iter=1000), features, labels, cv=cv)
+    return accuracy_score(labels, meta), time.process_time() - started
+
+
+def tune(X: np.ndarray, y: np.ndarray, rf_params: dict, xgb_params: dict, cv: int = 5, candidates: int = 27,
+         eta: int = 3, cpu_seconds: float = 1800, workers: int = None, threads: int = 1, random_state: int = 42,
+         space: dict = SEARCH_SPACE) -> dict:
+    """Search ``space`` for the best ``rf_params`` / ``xgb_params`` on unscaled ``X`` and labels ``y``.
+
+    ``workers`` processes (default: ``min(candidates, threads)``) share the
+    ``threads`` budget. Returns the JSON-ready report written to :data:`TUNING_FILE`.
+    """
+    started = time.perf_counter()
+    X, y = np.asarray(X, dtype=np.float64), np.asarray(y)
+    rng = np.random.default_rng(random_state)
+    current = {"rf": dict(rf_params), "xgb": dict(xgb_params)}
+    pool = _sample(space, candidates, rng, current)
+    rungs, survivors = 1, len(pool)
+    while survivors > 1:
+        rungs, survivors = rungs + 1, math.ceil(survivors / eta)
+    # Rows per rung grow eta-fold up to every row. Each rung takes a prefix of one ordering in which every
+    # class is spread evenly, so rungs are nested and stratified.
+    keys = np.empty(len(y))
+    for label in np.unique(y):
+        members = np.flatnonzero(y == label)
+        keys[members] = (rng.permutation(len(members)) + rng.random()) / len(members)
+    order = np.argsort(keys, kind="stable")
+    sizes = [max(min(MIN_RUNG_ROWS, len(y)), len(y) // eta ** (rungs - 1 - i)) for i in range(rungs)]
+    workers = max(1, min(workers or threads, len(pool)))
+    model_threads = max(1, threads // workers)
+
+    history, scores, cpu_used, exhausted = [], {}, 0.0, False
+    alive, cost, previous_size = list(range(len(pool))), None, None
+    processes = multiprocessing.get_context("spawn").Pool(workers)
+    # Candidates whose evaluation has finished (or failed), in completion order; see the pool's callbacks.
+    finished = queue.SimpleQueue()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            for rung, size in enumerate(sizes):
+                if rung and size == sizes[rung - 1]:
+                    # Same rows as the previous rung (a small family hit MIN_RUNG_ROWS): its scores still rank.
+                    alive = alive[:max(1, math.ceil(len(alive) / eta))]
+                    continue
+                rows = np.sort(order[:size]) if size < len(y) else np.arange(len(y))
+                folder = os.path.join(tmp, f"rung-{rung}")
+                _cache_folds(folder, X[rows], y[rows], cv, random_state)
+                # Until an evaluation of this rung finishes, its cost is the previous rung's scaled by the rows.
+                estimate = cost * size / previous_size if cost is not None else None
+                waiting, pending, results, rung_cost = list(alive), {}, {}, 0.0
+                while waiting or pending:
+                    # At most one evaluation per worker is in flight, and one more starts only when the CPU
+                    # already used plus the estimated cost of everything running and of the new one fits.
+                    while waiting and len(pending) < workers and (
+                        estimate is None or cpu_used + (len(pending) + 1) * estimate <= cpu_seconds
+                    ):
+                        i = waiting.pop(0)
+                        result = processes.apply_async(
+                            _evaluate, (folder, cv, pool[i], model_threads, random_state),
+                            callback=lambda _, i=i: finished.put(i), error_callback=lambda _, i=i: finished.put(i),
+                        )
+                        pending[i] = (result, time.perf_counter())
+                    if not pending:
+                        exhausted = True
+                        break
+                    try:
+                        done = [finished.get(timeout=POLL_SECONDS)]
+                    except queue.Empty:
+                        done = []
+                    while not finished.empty():
+                        done.append(finished.get())
+                    for i in done:
+                        result, _ = pending.pop(i)
+                        score, cpu = result.get()
+                        results[i] = score
+                        cpu_used += cpu
+                        rung_cost = max(rung_cost, cpu)
+                        estimate = rung_cost
+                    now = time.perf_counter()
+                    running = sum((now - submitted) * model_threads for _, submitted in pending.values())
+                    if pending and (scores or results) and cpu_used + running >= cpu_seconds:
+                        exhausted = True
+                        break
+                if not results:
+                    break
+                scores, cost, previous_size = results, rung_cost, size
+                ranked = sorted(results, key=lambda i: (-results[i], i))
+                history.append({
+                    "rows": int(size), "candidates": len(alive), "evaluated": len(results),
+                    "best_score": round(results[ranked[0]], 4),
+                    "current_score": round(results[0], 4) if 0 in results else None,
+                })
+                if exhausted:
+                    break
+                alive = ranked[:max(1, math.ceil(len(alive) / eta))]
+        finally:
+            # Queued evaluations are dropped and running ones killed rather than awaited.
+            processes.terminate()
+            processes.join()
+
+    # Ties go to the current configuration.
+    best = max(scores, key=lambda i: (scores[i], i == 0))
+    return {
+        "best": {**pool[best], "score": round(scores[best], 4), "rows": history[-1]["rows"]},
+        "current": {**current, "score": round(scores[0], 4) if 0 in scores else None},
+        "rungs": history,
+        "candidates": len(pool),
+        "eta": eta,
+        "cv": cv,
+        "cpu_seconds": round(cpu_used, 2),
+        "cpu_budget_seconds": cpu_seconds,
+        "budget_exhausted": exhausted,
+        "wall_seconds": round(time.perf_counter() - started, 2),
+        "grid_size": grid_size(space),
+    }
+
+
+def write_tuning(report: dict, output_dir: str) -> str:
+    path = os.path.join(output_dir, TUNING_FILE)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def read_tuning(directory: str):
+    """The tuning report saved next to a version's artifacts, or None."""
+    path = os.path.join(directory, TUNING_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -1,203 +1,453 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, FastAPI
+import asyncio
+from fastapi import APIRouter, UploadFile, File, HTTPException, FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+import numpy as np
+from starlette.background import BackgroundTask
+from contextlib import ExitStack, contextmanager
+import csv
+import math
+import os
+import io
+import json
 import pandas as pd
-from app.models.model_handler import ExoplanetModel
-from app.data.data import KEPLER_EXPECTED_COLUMNS, KEPLER_STRING_COLUMNS, KEPLER_NUMERIC_COLUMNS, K2_EXPECTED_COLUMNS, K2_STRING_COLUMNS, K2_NUMERIC_COLUMNS
+from app.models.model_handler import EXPLAIN_MAX_ROWS, ExoplanetModel, MAX_NEIGHBORS
+from app.models.result_cache import result_cache
+from app.models.training_store import RETRAIN_MODES, stage_upload
+from app.models.registry import ModelRegistry, ModelNotReady, UnknownModelVersion, list_versions, set_current
+from app.services.batching import MicroBatcher, MICROBATCH_ENABLED
+from app.services.executors import inference_executor
+from app.services.jobs import JobManager, JobStore
+from app.schemas.exoplanet import ExoplanetFeatures, ExoplanetBatch, ExoplanetPrediction, ExoplanetBatchPrediction
+from app.data import columnar
+from app.data.data import KEPLER_EXPECTED_COLUMNS, KEPLER_STRING_COLUMNS, K2_EXPECTED_COLUMNS, K2_STRING_COLUMNS
+from app.data.validation import INGEST_SCHEMAS, PREDICT_MULTI_SCHEMAS, PREDICT_SCHEMAS_BY_PRECISION, SchemaError
 
+router = APIRouter(prefix="/exoplanet", tags=["Exoplanet AI"])
+registries = {
+    "kepler": ModelRegistry("kepler"),
+    "k2": ModelRegistry("k2"),
+}
+ID_COLUMNS = {"kepler": "kepid", "k2": "pl_name"}
+FEATURE_COLUMNS = {
+    "kepler": [col for col in KEPLER_EXPECTED_COLUMNS[:-1] if col not in KEPLER_STRING_COLUMNS],
+    "k2": [col for col in K2_EXPECTED_COLUMNS[:-1] if col not in K2_STRING_COLUMNS],
+}
+FEATURE_INDEX = {model: {col: i for i, col in enumerate(cols)} for model, cols in FEATURE_COLUMNS.items()}
+MAX_JSON_BATCH = int(os.getenv("EXOAI_MAX_JSON_BATCH", "1000"))
 
-from app.models.k2_model.train_k2_model import train_k2_model
-from app.models.kepler_model.train_kepler_model import train_kepler_model
+microbatching = MICROBATCH_ENABLED
+batchers = {}
+
+training_jobs = JobManager(JobStore(), on_success=lambda model: registries[model].reload())
+
+
+def _registry(model: str) -> ModelRegistry:
+    if model not in registries:
+        raise HTTPException(status_code=400, detail="Model must be 'kepler' or 'k2'.")
+    return registries[model]
+
+
+@contextmanager
+def _lease(model: str, version: str = None):
+    try:
+        with _registry(model).acquire(version) as handler:
+            yield handler
+    except UnknownModelVersion as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ModelNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv", "arrow": columnar.MEDIA_TYPES["arrow"]}
+LABELS = ["candidate", "confirmed", "false_positive"]
+
+
+# Outputs that can carry per-row neighbours and explanations.
+RECORD_OUTPUTS = ("json", "columnar", "ndjson")
+OUTPUTS = ("json", "columnar", "parquet", *STREAM_MEDIA_TYPES)
+
+
+def _check_extras(handler: ExoplanetModel, extras: dict):
+    if extras.get("neighbors") and handler.neighbors is None:
+        raise HTTPException(
+            status_code=409, detail="This model version has no neighbour index; retrain it to build one."
+        )
+    if extras.get("explain") and not handler.explainable:
+        raise HTTPException(
+            status_code=409, detail="This model version cannot explain predictions; retrain it to enable them."
+        )
+
+
+@contextmanager
+def _schema_errors():
+    try:
+        yield
+    except SchemaError as e:
+        raise HTTPException(status_code=400, detail=e.detail)
+    except columnar.UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+
+def _read_upload(schemas, file: UploadFile, model: str, chunksize: int = None):
+    """Validated frame (or chunk iterator) from a CSV, Parquet or Arrow IPC upload."""
+    with _schema_errors():
+        fmt = columnar.detect_format(file.file, file.content_type)
+        return schemas[model].read(file.file, fmt, chunksize=chunksize)
+
+
+def _format_chunk(results, output: str) -> str:
+    if output == "ndjson":
+        return "".join(json.dumps(row) + "\n" for row in ExoplanetModel.to_records(results))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for i, p, c, pr in zip(results["id"], results["prediction"], results["confidence"], results["probability"]):
+        writer.writerow([i, p, c, *(pr or [])])
+    return buffer.getvalue()
 
-router = APIRouter(prefix="/exoplanet", tags=["Exoplanet AI"])
-model_kepler = ExoplanetModel(
-    model_path="kepler_model\\kepler_stacking_classifier.pkl",
-    scaler_path="kepler_model\\kepler_scaler.pkl"
-)
 
-model_k2 = ExoplanetModel(
-    model_path="k2_model\\k2_stacking_classifier.pkl",
-    scaler_path="k2_model\\k2_scaler.pkl"
-)
+def _stream_trailer(output: str, arrow, summary=None, error=None):
+    """Last part of a streamed response: the summary, or a marker saying the stream stopped early."""
+    key, value = ("error", error) if error is not None else ("summary", summary)
+    if output == "ndjson":
+        return json.dumps({key: value}) + "\n"
+    if output == "csv":
+        return f"# {key}: {json.dumps(value)}\n"
+    return arrow.close(value, key=f"exoai.{key}")
+
+
+async def _stream_predictions(file: UploadFile, model: str, version: str, output: str, chunksize: int, extras: dict):
+    if chunksize < 1:
+        raise HTTPException(status_code=400, detail="chunksize must be a positive integer.")
+    id_col = ID_COLUMNS.get(model)
+
+    def open_reader():
+        try:
+            reader = _read_upload(PREDICT_SCHEMAS_BY_PRECISION[handler.precision], file, model, chunksize)
+            with _schema_errors():
+                first = next(reader)
+        except (pd.errors.EmptyDataError, StopIteration):
+            raise HTTPException(status_code=400, detail="Uploaded CSV is empty or invalid format.")
+        return reader, first
+
+    # The stream holds one inference slot from here until its body is done, so open streams count
+    # against the same limit as single calls.
+    slot = inference_executor.reserve()
+    stack = ExitStack()
+    stack.callback(slot.release)
+    try:
+        handler = await slot.run(stack.enter_context, _lease(model, version))
+        _check_extras(handler, extras)
+        reader, first = await slot.run(open_reader)
+    except BaseException:
+        stack.close()
+        raise
+
+    def chunks():
+        yield first
+        with _schema_errors():
+            yield from reader
+
+    async def body():
+        scored = handler.predict_chunks(chunks(), id_col=id_col, **extras)
+        summary = None
+        arrow = columnar.ArrowStreamWriter() if output == "arrow" else None
+        try:
+            if output == "csv":
+                yield ",".join(["id", "prediction", "confidence", *(f"probability_{label}" for label in LABELS)]) + "\n"
+            while True:
+                item = await slot.run(next, scored, None)
+                if item is None:
+                    break
+                results, summary = item
+                if arrow is not None:
+                    yield arrow.write(columnar.results_batch(results, LABELS))
+                else:
+                    yield _format_chunk(results, output)
+        except Exception as e:
+            # The status line is already sent: end the body with an explicit marker instead of truncating it.
+            if not isinstance(e, HTTPException):
+                print(f"[WARN] Streamed prediction failed: {type(e).__name__}: {e}")
+            detail = e.detail if isinstance(e, HTTPException) else f"Prediction failed: {type(e).__name__}"
+            yield _stream_trailer(output, arrow, error=detail)
+            return
+        finally:
+            stack.close()
+        yield _stream_trailer(output, arrow, summary=summary)
+
+    return StreamingResponse(body(), media_type=STREAM_MEDIA_TYPES[output], background=BackgroundTask(stack.close))
+
+
+def _predict_upload(file: UploadFile, model: str, version: str = None, output: str = "json", extras: dict = None):
+    extras = extras or {}
+
+    # Leased before parsing, so the upload is parsed in the dtype this version serves in.
+    with _lease(model, version) as handler:
+        _check_extras(handler, extras)
+        df = _read_upload(PREDICT_SCHEMAS_BY_PRECISION[handler.precision], file, model)
+        payload = handler.predict_csv(
+            df, id_col=ID_COLUMNS[model], columnar=output in ("columnar", "parquet"), **extras
+        )
+    if output == "parquet":
+        data = columnar.write_parquet(columnar.results_batch(payload["results"], LABELS), payload["summary"])
+        return Response(content=data, media_type=columnar.MEDIA_TYPES["parquet"])
+    return payload
 
 
 @router.post("/predict")
-async def predict_exoplanets(file: UploadFile = File(...), model: str = "..."):
+async def predict_exoplanets(
+    file: UploadFile = File(...), model: str = "...", version: str = None, output: str = "json", chunksize: int = 50000,
+    neighbors: int = 0, explain: int = 0, explain_rows: int = None,
+):
+    _registry(model)
+    if output not in OUTPUTS:
+        raise HTTPException(status_code=400, detail=f"output must be one of: {', '.join(OUTPUTS)}.")
+    if not 0 <= neighbors <= MAX_NEIGHBORS:
+        raise HTTPException(status_code=400, detail=f"neighbors must be between 0 and {MAX_NEIGHBORS}.")
+    if explain < 0 or (explain_rows is not None and explain_rows < 0):
+        raise HTTPException(status_code=400, detail="explain and explain_rows must not be negative.")
+    for name, value in (("neighbors", neighbors), ("explain", explain)):
+        if value and output not in RECORD_OUTPUTS:
+            raise HTTPException(
+                status_code=400, detail=f"{name} is only supported with output={', '.join(RECORD_OUTPUTS)}."
+            )
+    extras = {"neighbors": neighbors, "explain": explain}
+    if explain:
+        extras["explain_rows"] = min(EXPLAIN_MAX_ROWS if explain_rows is None else explain_rows, EXPLAIN_MAX_ROWS)
+    if output in columnar.MEDIA_TYPES:
+        try:
+            columnar.pyarrow()
+        except columnar.UnsupportedFormat as e:
+            raise HTTPException(status_code=406, detail=str(e))
+    if output in STREAM_MEDIA_TYPES:
+        return await _stream_predictions(file, model, version, output, chunksize, extras)
     try:
-        df = pd.read_csv(file.file)
-
-        if model == "kepler":
-            expected = KEPLER_EXPECTED_COLUMNS[:-1]
-            string_cols = [col for col in KEPLER_STRING_COLUMNS if col in expected]
-            numeric_cols = [col for col in KEPLER_NUMERIC_COLUMNS if col in expected]
-            missing_cols = [col for col in expected if col not in df.columns]
-            extra_cols = [col for col in df.columns if col not in expected]
-            if missing_cols:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Missing required columns: {', '.join(missing_cols)}"
-                )
-            if extra_cols:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unexpected extra columns: {', '.join(extra_cols)}"
-                )
-            if df.isnull().any().any():
-                raise HTTPException(
-                    status_code=400,
-                    detail="CSV contains missing (NaN) values. Please clean the data."
-                )
-            for col in numeric_cols:
-                if not pd.api.types.is_numeric_dtype(df[col]):
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Column '{col}' must contain only numeric values (int/float)."
-                    )
-        elif model == "k2":
-            expected = K2_EXPECTED_COLUMNS[:-1]
-            string_cols = [col for col in K2_STRING_COLUMNS if col in expected]
-            numeric_cols = [col for col in K2_NUMERIC_COLUMNS if col in expected]
-            missing_cols = [col for col in expected if col not in df.columns]
-            extra_cols = [col for col in df.columns if col not in expected]
-            if missing_cols:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Missing required columns: {', '.join(missing_cols)}"
-                )
-            if extra_cols:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unexpected extra columns: {', '.join(extra_cols)}"
-                )
-            if df.isnull().any().any():
-                raise HTTPException(
-                    status_code=400,
-                    detail="CSV contains missing (NaN) values. Please clean the data."
-                )
-            for col in string_cols:
-                if not pd.api.types.is_string_dtype(df[col]):
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Column '{col}' must contain string/text values."
-                    )
-            for col in numeric_cols:
-                if not pd.api.types.is_numeric_dtype(df[col]):
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Column '{col}' must contain only numeric values (int/float)."
-                    )
-
-        if model == "kepler":
-            result = model_kepler.predict_csv(df, id_col="kepid")
-        elif model == "k2":
-            result = model_k2.predict_csv(df, id_col="pl_name")
-        else:
-            raise HTTPException(status_code=400, detail="Model must be 'kepler' or 'k2'.")
+        return await inference_executor.run(_predict_upload, file, model, version, output, extras)
+
+    except HTTPException:
+        raise
+    except pd.errors.EmptyDataError:
+        raise HTTPException(status_code=400, detail="Uploaded CSV is empty or invalid format.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {e}")
 
-        return result
 
+def _read_multi_upload(file: UploadFile, handlers: dict, discriminator: str = None):
+    # One parse feeds every model, so it is float32 only when every leased version serves in float32.
+    precision = "float32" if all(handler.precision == "float32" for handler in handlers.values()) else "float64"
+    with _schema_errors():
+        fmt = columnar.detect_format(file.file, file.content_type)
+        return PREDICT_MULTI_SCHEMAS[precision].read(file.file, fmt, list(handlers), discriminator)
+
+
+def _predict_frame(df: pd.DataFrame, model: str, handler: ExoplanetModel):
+    return handler.predict_csv(df, id_col=ID_COLUMNS[model])
+
+
+@router.post("/predict/multi")
+async def predict_multi(file: UploadFile = File(...), models: str = "kepler,k2", discriminator: str = None):
+    names = list(dict.fromkeys(name.strip() for name in models.split(",") if name.strip()))
+    if not names:
+        raise HTTPException(status_code=400, detail="models must name at least one model.")
+    for name in names:
+        _registry(name)
+    try:
+        with ExitStack() as stack:
+            handlers = {name: await inference_executor.run(stack.enter_context, _lease(name)) for name in names}
+            routed = await inference_executor.run(_read_multi_upload, file, handlers, discriminator)
+            # Every model's call finishes before the stack releases the leases they score with.
+            payloads = await asyncio.gather(*(
+                inference_executor.run(_predict_frame, df, model, handlers[model]) for model, (_, df) in routed.items()
+            ), return_exceptions=True)
+            for payload in payloads:
+                if isinstance(payload, BaseException):
+                    raise payload
+    except HTTPException:
+        raise
     except pd.errors.EmptyDataError:
         raise HTTPException(status_code=400, detail="Uploaded CSV is empty or invalid format.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {e}")
+    return {
+        "models": {
+            model: {"rows": rows.tolist(), **payload}
+            for (model, (rows, _)), payload in zip(routed.items(), payloads)
+        },
+    }
+
+
+def _stage_ingest_upload(file: UploadFile, model: str) -> str:
+    return stage_upload(model, _read_upload(INGEST_SCHEMAS, file, model))
+
+
+def _feature_matrix(rows, model: str) -> np.ndarray:
+    columns = FEATURE_COLUMNS[model]
+    index = FEATURE_INDEX[model]
+    X = np.empty((len(rows), len(columns)), dtype=np.float64)
+    for i, row in enumerate(rows):
+        features = row.features
+        if len(features) != len(columns) or features.keys() - index.keys():
+            missing = [col for col in columns if col not in features]
+            extra = [col for col in features if col not in index]
+            if missing:
+                raise HTTPException(status_code=400, detail=f"Row {i}: missing required features: {', '.join(missing)}")
+            raise HTTPException(status_code=400, detail=f"Row {i}: unexpected extra features: {', '.join(extra)}")
+        for col, value in features.items():
+            if not math.isfinite(value):
+                raise HTTPException(status_code=400, detail=f"Row {i}: feature '{col}' must be a finite number.")
+            X[i, index[col]] = value
+    return X
+
+
+def _score_matrix(X: np.ndarray, ids, model: str, version: str = None):
+    with _lease(model, version) as handler:
+        results, _ = handler.predict_array(X, ids)
+    return results
 
 
-@router.post("/ingest")
-async def ingest_exoplanets(file: UploadFile = File(...), model: str = "..."):
+def _batcher(model: str, version: str = None) -> MicroBatcher:
+    key = (model, version)
+    if key not in batchers:
+        # Only versions on disk get a batcher, so arbitrary version strings cannot grow the dict.
+        if version is not None and version not in list_versions(model):
+            raise HTTPException(status_code=404, detail=f"Unknown {model} model version '{version}'.")
+        batchers[key] = MicroBatcher(
+            lambda X, ids: inference_executor.run(_score_matrix, X, ids, model, version)
+        )
+    return batchers[key]
+
+
+async def _predict_rows(rows, model: str, version: str = None):
+    _registry(model)
+    ids = [row.id if row.id is not None else str(i) for i, row in enumerate(rows)]
     try:
-        df = pd.read_csv(file.file)
-
-        if model == "kepler":
-            missing_cols = [col for col in KEPLER_EXPECTED_COLUMNS if col not in df.columns]
-            extra_cols = [col for col in df.columns if col not in KEPLER_EXPECTED_COLUMNS]
-            if missing_cols:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Missing required columns: {', '.join(missing_cols)}"
-                )
-            if extra_cols:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unexpected extra columns: {', '.join(extra_cols)}"
-                )
-            if df.isnull().any().any():
-                raise HTTPException(
-                    status_code=400,
-                    detail="CSV contains missing (NaN) values. Please clean the data."
-                )
-            for col in KEPLER_STRING_COLUMNS:
-                if not pd.api.types.is_string_dtype(df[col]):
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Column '{col}' must contain string/text values."
-                    )
-            for col in KEPLER_NUMERIC_COLUMNS:
-                if not pd.api.types.is_numeric_dtype(df[col]):
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Column '{col}' must contain only numeric values (int/float)."
-                    )
-        elif model == "k2":
-            missing_cols = [col for col in K2_EXPECTED_COLUMNS if col not in df.columns]
-            extra_cols = [col for col in df.columns if col not in K2_EXPECTED_COLUMNS]
-            if missing_cols:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Missing required columns: {', '.join(missing_cols)}"
-                )
-            if extra_cols:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unexpected extra columns: {', '.join(extra_cols)}"
-                )
-            if df.isnull().any().any():
-                raise HTTPException(
-                    status_code=400,
-                    detail="CSV contains missing (NaN) values. Please clean the data."
-                )
-            for col in K2_STRING_COLUMNS:
-                if not pd.api.types.is_string_dtype(df[col]):
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Column '{col}' must contain string/text values."
-                    )
-            for col in K2_NUMERIC_COLUMNS:
-                if not pd.api.types.is_numeric_dtype(df[col]):
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Column '{col}' must contain only numeric values (int/float)."
-                    )
+        if len(rows) == 1:
+            X = _feature_matrix(rows, model)
+        else:
+            X = await inference_executor.run(_feature_matrix, rows, model)
+        if microbatching:
+            results = await _batcher(model, version).submit(X, ids)
+        else:
+            results = await inference_executor.run(_score_matrix, X, ids, model, version)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {e}")
+    return ExoplanetModel.to_records(results)
 
-        try:
-            if model == "kepler":
-                metrics, model_path, scaler_path = train_kepler_model(
-                    dataset_path="app/models/kepler_model/Kepler_dataset.csv",
-                    output_dir="app/models/kepler_model"
-                )
-            elif model == "k2":
-                metrics, model_path, scaler_path = train_k2_model(
-                    dataset_path="app/models/k2_model/K2_dataset.csv",
-                    output_dir="app/models/k2_model"
-                )
-            else:
-                raise HTTPException(status_code=400, detail="Model must be 'kepler' or 'k2'.")
-
-            return {
-                "status": "success",
-            }
 
-        except Exception as e:
-            return {
-                "status": "failed",
-            }
+@router.post("/predict/row", response_model=ExoplanetPrediction)
+async def predict_row(row: ExoplanetFeatures, model: str = "...", version: str = None):
+    return (await _predict_rows([row], model, version))[0]
+
+
+@router.post("/predict/batch", response_model=ExoplanetBatchPrediction)
+async def predict_batch(batch: ExoplanetBatch, model: str = "...", version: str = None):
+    if len(batch.rows) > MAX_JSON_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_JSON_BATCH} rows per JSON batch; upload a CSV to /exoplanet/predict instead."
+        )
+    return {"results": await _predict_rows(batch.rows, model, version)}
+
+
+@router.get("/batching")
+def batching_stats():
+    return {
+        "enabled": microbatching,
+        "batchers": [
+            {"model": model, "version": version, **batcher.stats()}
+            for (model, version), batcher in batchers.items()
+        ],
+    }
+
+
+@router.get("/cache")
+def cache_stats():
+    return result_cache.stats()
+
+
+@router.post("/ingest", status_code=202)
+async def ingest_exoplanets(file: UploadFile = File(...), model: str = "...", mode: str = "auto"):
+    _registry(model)
+    if mode not in RETRAIN_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(RETRAIN_MODES)}.")
+    try:
+        upload_path = await inference_executor.run(_stage_ingest_upload, file, model)
     except pd.errors.EmptyDataError:
         raise HTTPException(status_code=400, detail="Uploaded CSV is empty or invalid format.")
 
+    try:
+        job_id = training_jobs.submit(model, upload_path=upload_path, mode=mode)
+    except HTTPException:
+        os.remove(upload_path)
+        raise
+    return {
+        "status": "queued",
+        "model": model,
+        "mode": mode,
+        "job_id": job_id,
+    }
+
+
+@router.get("/jobs")
+def list_jobs(model: str = None, limit: int = 50):
+    return training_jobs.store.list(model=model, limit=limit)
 
 
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = training_jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job
+
+
+@router.get("/ready")
+def ready():
+    """Readiness probe: 200 once every model is loaded, 503 while any is still loading or failed.
+
+    Read-only: loads are started by the lifespan and ``/models/{model}/reload``, never by a probe.
+    """
+    models = {model: registry.status() for model, registry in registries.items()}
+    ok = all(status["status"] == "ready" for status in models.values())
+    return JSONResponse(status_code=200 if ok else 503, content={"ready": ok, "models": models})
+
+
+@router.get("/models")
+def list_models():
+    return [registry.describe() for registry in registries.values()]
+
+
+@router.post("/models/{model}/reload")
+def reload_model(model: str, version: str = None):
+    registry = _registry(model)
+    if version:
+        try:
+            set_current(model, version)
+        except UnknownModelVersion as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    registry.reload()
+    return {"status": "reloading", "model": model, "version": version or "latest"}
+
 
-    
 @router.get("/metrics")
-async def get_metrics():
+def get_metrics(request: Request):
     try:
-        return [model_k2.get_metrics(), model_kepler.get_metrics()]
+        metadata = []
+        for model in ("k2", "kepler"):
+            with _lease(model) as handler:
+                if handler.metadata is None:
+                    raise ValueError("Model not loaded.")
+                metadata.append(handler.metadata)
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting metrics: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error getting metrics: {e}")
+
+    etag = '"' + "-".join(m.etag[:16] for m in metadata) + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    body = b"[" + b",".join(m.metrics_json for m in metadata) + b"]"
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.models.result_cache import result_cache
+from app.services import telemetry
+from app.services.executors import inference_executor, training_executor
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+EXECUTORS = (inference_executor, training_executor)
+
+telemetry.register(telemetry.Gauge(
+    "exoai_executor_in_flight", "Calls running or queued on an executor.", ("executor",),
+    lambda: {(executor.name,): executor.in_flight for executor in EXECUTORS},
+))
+telemetry.register(telemetry.Gauge(
+    "exoai_executor_capacity", "Most calls an executor accepts before answering 503.", ("executor",),
+    lambda: {(executor.name,): executor.max_in_flight for executor in EXECUTORS},
+))
+
+
+def _cache_rows():
+    stats = result_cache.stats()
+    return {("memory",): stats["rows"], ("spill",): stats["spill_rows"]}
+
+
+def _cache_lookups():
+    stats = result_cache.stats()
+    return {
+        ("hit",): stats["hits"], ("spill_hit",): stats["spill_hits"], ("miss",): stats["misses"],
+        ("bypass",): stats["bypassed"],
+    }
+
+
+telemetry.register(telemetry.Gauge("exoai_result_cache_rows", "Rows held by the result cache.", ("tier",), _cache_rows))
+telemetry.register(telemetry.CollectedCounter(
+    "exoai_result_cache_lookups_total", "Result cache row lookups since start, by outcome.", ("outcome",),
+    _cache_lookups,
+))
+
+
+@router.get("/prometheus", response_class=PlainTextResponse)
+def prometheus():
+    return PlainTextResponse(telemetry.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/profiles")
+def list_profiles():
+    return {
+        "enabled": telemetry.PROFILING_ENABLED,
+        "profiles": [
+            {"profile_id": profile_id, "method": p["method"], "route": p["route"], "status": p["status"],
+             "elapsed_seconds": p["elapsed_seconds"]}
+            for profile_id, p in telemetry.list_profiles()
+        ],
+    }
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    profile = telemetry.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return profile
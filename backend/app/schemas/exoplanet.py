@@ -1,14 +1,18 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 
 class ExoplanetFeatures(BaseModel):
-    orbital_period: float
-    transit_duration: float
-    planet_radius: float
-    stellar_radius: float
-    stellar_temp: float
-    # hay que añadir más cosas eh
+    id: Optional[str] = None
+    features: Dict[str, float]
+
+class ExoplanetBatch(BaseModel):
+    rows: List[ExoplanetFeatures] = Field(..., min_length=1)
 
 class ExoplanetPrediction(BaseModel):
+    id: Optional[str] = None
     prediction: str
     probability: Optional[list] = None
+    confidence: Optional[float] = None
+
+class ExoplanetBatchPrediction(BaseModel):
+    results: List[ExoplanetPrediction]
@@ -0,0 +1,118 @@
+import asyncio
+import bisect
+import os
+import time
+
+import numpy as np
+
+MICROBATCH_ENABLED = os.getenv("EXOAI_MICROBATCH", "0").lower() in ("1", "true", "yes")
+MICROBATCH_MAX_ROWS = int(os.getenv("EXOAI_MICROBATCH_MAX_ROWS", "256"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("EXOAI_MICROBATCH_MAX_WAIT_MS", "5"))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100)
+
+
+class BucketCounter:
+    """Per-bucket counts plus sum and count for a size or latency distribution."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self):
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class _Pending:
+    __slots__ = ("X", "ids", "future", "enqueued")
+
+    def __init__(self, X, ids, future):
+        self.X = X
+        self.ids = ids
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """Coalesces concurrent small scoring calls into one batched model call.
+
+    Rows are gathered until ``max_rows`` is reached or the oldest waiter has
+    waited ``max_wait_ms``; ``run_batch(X, ids)`` is then awaited once and each
+    caller gets back its own slice of the columnar results. Must be used from a
+    single event loop.
+    """
+
+    def __init__(self, run_batch, max_rows: int = MICROBATCH_MAX_ROWS, max_wait_ms: float = MICROBATCH_MAX_WAIT_MS):
+        self.run_batch = run_batch
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self.batch_sizes = BucketCounter(BATCH_SIZE_BUCKETS)
+        self.wait_ms = BucketCounter(WAIT_MS_BUCKETS)
+        self._pending = []
+        self._rows = 0
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, X: np.ndarray, ids):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_Pending(X, ids, future))
+        self._rows += len(X)
+        if self._rows >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._rows = self._pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        now = time.perf_counter()
+        for item in batch:
+            self.wait_ms.observe((now - item.enqueued) * 1000)
+        X = batch[0].X if len(batch) == 1 else np.concatenate([item.X for item in batch])
+        ids = [i for item in batch for i in item.ids]
+        self.batch_sizes.observe(len(X))
+        try:
+            results = await self.run_batch(X, ids)
+        except BaseException as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        start = 0
+        for item in batch:
+            end = start + len(item.X)
+            if not item.future.done():
+                item.future.set_result({key: values[start:end] for key, values in results.items()})
+            start = end
+
+    def stats(self):
+        return {
+            "max_rows": self.max_rows,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued_rows": self._rows,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.wait_ms.snapshot(),
+        }
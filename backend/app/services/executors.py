@@ -0,0 +1,112 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+
+INFERENCE_WORKERS = int(os.getenv("EXOAI_INFERENCE_WORKERS", os.cpu_count() or 1))
+INFERENCE_QUEUE = int(os.getenv("EXOAI_INFERENCE_QUEUE", "16"))
+TRAINING_WORKERS = int(os.getenv("EXOAI_TRAINING_WORKERS", "1"))
+TRAINING_QUEUE = int(os.getenv("EXOAI_TRAINING_QUEUE", "1"))
+
+
+class BoundedExecutor:
+    """Runs blocking callables off the event loop with a cap on in-flight work.
+
+    Once ``workers + queue`` calls are pending, new calls are rejected with a 503
+    instead of piling up behind the pool.
+    """
+
+    def __init__(self, name: str, factory, max_in_flight: int):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._factory = factory
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = self._factory()
+        return self._executor
+
+    def _check_capacity(self):
+        if self.in_flight >= self.max_in_flight:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Server busy: {self.name} queue is full, retry later.",
+                headers={"Retry-After": "1"},
+            )
+
+    async def _submit(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); the pool refuses all further work, so the next call builds a new one.
+            self._drop(executor)
+            raise
+
+    def _drop(self, executor):
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn, *args, bypass_limit: bool = False, **kwargs):
+        if not bypass_limit:
+            self._check_capacity()
+        self.in_flight += 1
+        try:
+            return await self._submit(fn, *args, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+    def reserve(self) -> "Reservation":
+        """Hold one in-flight slot for work made of several calls (e.g. a streamed response), or answer 503."""
+        self._check_capacity()
+        self.in_flight += 1
+        return Reservation(self)
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "max_in_flight": self.max_in_flight}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._drop(self._executor)
+
+
+class Reservation:
+    """An in-flight slot taken by :meth:`BoundedExecutor.reserve`; its calls run without taking another."""
+
+    def __init__(self, executor: BoundedExecutor):
+        self._executor = executor
+        self._held = True
+
+    async def run(self, fn, *args, **kwargs):
+        return await self._executor._submit(fn, *args, **kwargs)
+
+    def release(self):
+        if self._held:
+            self._held = False
+            self._executor.in_flight -= 1
+
+
+inference_executor = BoundedExecutor(
+    "inference",
+    lambda: ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="exoai-inference"),
+    INFERENCE_WORKERS + INFERENCE_QUEUE,
+)
+
+training_executor = BoundedExecutor(
+    "training",
+    lambda: ProcessPoolExecutor(max_workers=TRAINING_WORKERS, mp_context=multiprocessing.get_context("spawn")),
+    TRAINING_WORKERS + TRAINING_QUEUE,
+)
+
+
+def shutdown_executors():
+    inference_executor.shutdown()
+    training_executor.shutdown()
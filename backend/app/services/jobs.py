@@ -0,0 +1,311 @@
+import asyncio
+import contextlib
+import importlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from app.models.registry import artifact_paths, new_version_dir, read_current, set_current
+from app.services.executors import training_executor, TRAINING_QUEUE
+from app.services.telemetry import training_jobs, training_stage_duration
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+JOBS_DB_PATH = os.getenv("EXOAI_JOBS_DB", os.path.join(BACKEND_DIR, "jobs.sqlite3"))
+CLAIM_POLL_SECONDS = 1.0
+# A running job refreshes heartbeat_at every quarter lease; one silent for a whole lease is treated as dead.
+JOB_LEASE_SECONDS = float(os.getenv("EXOAI_JOB_LEASE_SECONDS", "120"))
+# How long a job waits for another job of the same model to finish before failing.
+CLAIM_TIMEOUT_SECONDS = float(os.getenv("EXOAI_JOB_CLAIM_TIMEOUT", "7200"))
+
+TRAINERS = ("kepler", "k2")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner_pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    current_stage TEXT,
+    stages TEXT NOT NULL DEFAULT '{}',
+    metrics TEXT,
+    error TEXT,
+    heartbeat_at REAL
+)
+"""
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts else None
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """SQLite-backed job table shared by the API process and the training workers."""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "heartbeat_at" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, model: str) -> str:
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, model, status, owner_pid, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, model, os.getpid(), time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, model: str = None, limit: int = 50):
+        query = "SELECT * FROM jobs"
+        params = []
+        if model:
+            query += " WHERE model = ?"
+            params.append(model)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def claim(self, job_id: str, model: str) -> bool:
+        """Mark the job running unless another job of the same model already is.
+
+        A running job whose lease has expired (no heartbeat for ``JOB_LEASE_SECONDS``)
+        is failed first, so a killed worker cannot block its model family.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, current_stage = NULL, error = ? "
+                "WHERE model = ? AND status = 'running' AND id != ? AND COALESCE(heartbeat_at, started_at) < ?",
+                (now, "Training worker stopped responding (lease expired).", model, job_id, now - JOB_LEASE_SECONDS),
+            )
+            busy = conn.execute(
+                "SELECT 1 FROM jobs WHERE model = ? AND status = 'running' AND id != ?", (model, job_id)
+            ).fetchone()
+            if busy:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ? WHERE id = ?", (now, now, job_id)
+            )
+            conn.execute("COMMIT")
+            return True
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'", (time.time(), job_id)
+            )
+
+    def record_stage(self, job_id: str, stage: str, seconds):
+        with self._connect() as conn:
+            row = conn.execute("SELECT stages FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            stages = json.loads(row["stages"]) if row else {}
+            if seconds is None:
+                conn.execute("UPDATE jobs SET current_stage = ? WHERE id = ?", (stage, job_id))
+                return
+            stages[stage] = seconds
+            conn.execute(
+                "UPDATE jobs SET stages = ?, current_stage = NULL WHERE id = ?", (json.dumps(stages), job_id)
+            )
+
+    def finish(self, job_id: str, metrics=None, error: str = None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, current_stage = NULL, metrics = ?, error = ? WHERE id = ?",
+                ("failed" if error else "done", time.time(), json.dumps(metrics) if metrics else None, error, job_id),
+            )
+
+    def fail_orphaned(self):
+        """Fail queued/running jobs whose owning API process is gone (e.g. after a restart).
+
+        Running jobs are also failed once their lease has expired, since a reused
+        pid can make a dead owner look alive.
+        """
+        stale = time.time() - JOB_LEASE_SECONDS
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, owner_pid, status, COALESCE(heartbeat_at, started_at) AS beat FROM jobs "
+                "WHERE status IN ('queued', 'running')"
+            ).fetchall()
+            for row in rows:
+                expired = row["status"] == "running" and (row["beat"] or 0) < stale
+                if expired or not _pid_alive(row["owner_pid"]):
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                        (time.time(), "Interrupted by server restart.", row["id"]),
+                    )
+
+    @staticmethod
+    def _to_dict(row):
+        started, finished = row["started_at"], row["finished_at"]
+        elapsed = None
+        if started:
+            elapsed = round((finished or time.time()) - started, 3)
+        return {
+            "job_id": row["id"],
+            "model": row["model"],
+            "status": row["status"],
+            "created_at": _iso(row["created_at"]),
+            "started_at": _iso(started),
+            "finished_at": _iso(finished),
+            "elapsed_seconds": elapsed,
+            "current_stage": row["current_stage"],
+            "stages": json.loads(row["stages"]),
+            "metrics": json.loads(row["metrics"]) if row["metrics"] else None,
+            "error": row["error"],
+            "heartbeat_at": _iso(row["heartbeat_at"]),
+        }
+
+
+@contextlib.contextmanager
+def _heartbeat(store: JobStore, job_id: str):
+    """Keep the job's lease fresh from a background thread while the body runs."""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(JOB_LEASE_SECONDS / 4):
+            with contextlib.suppress(sqlite3.Error):
+                store.heartbeat(job_id)
+
+    thread = threading.Thread(target=beat, name=f"exoai-job-heartbeat-{job_id[:8]}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_training_job(db_path: str, job_id: str, model: str, upload_path: str = None, mode: str = "auto"):
+    """Entry point executed inside the training process pool."""
+    store = JobStore(db_path)
+    deadline = time.monotonic() + CLAIM_TIMEOUT_SECONDS
+    while not store.claim(job_id, model):
+        if time.monotonic() >= deadline:
+            if upload_path:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(upload_path)
+            error = f"Timed out after {CLAIM_TIMEOUT_SECONDS:.0f} s waiting for another '{model}' job to finish."
+            store.finish(job_id, error=error)
+            raise TimeoutError(error)
+        time.sleep(CLAIM_POLL_SECONDS)
+    version, output_dir = new_version_dir(model)
+    try:
+        retrain = importlib.import_module("app.models.training").retrain
+        previous_model_path, previous_scaler_path = artifact_paths(model, read_current(model))
+        with _heartbeat(store, job_id):
+            metrics, model_path, scaler_path = retrain(
+                model,
+                output_dir,
+                upload_path=upload_path,
+                previous_model_path=previous_model_path,
+                previous_scaler_path=previous_scaler_path,
+                mode=mode,
+                on_stage=lambda stage, seconds: store.record_stage(job_id, stage, seconds),
+            )
+        metrics["version"] = version
+        set_current(model, version)
+    except Exception as e:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        store.finish(job_id, error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        if upload_path:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(upload_path)
+    store.finish(job_id, metrics=metrics)
+    return metrics, model_path, scaler_path
+
+
+class JobManager:
+    """Queues training jobs so that at most one runs per model family."""
+
+    def __init__(self, store: JobStore, max_pending: int = TRAINING_QUEUE + 1, on_success=None):
+        self.store = store
+        self.on_success = on_success
+        self.max_pending = max_pending
+        self._locks = {model: asyncio.Lock() for model in TRAINERS}
+        self._pending = {model: 0 for model in TRAINERS}
+        self._tasks = set()
+        self.store.fail_orphaned()
+
+    def submit(self, model: str, upload_path: str = None, mode: str = "auto") -> str:
+        if model not in TRAINERS:
+            raise HTTPException(status_code=400, detail="Model must be 'kepler' or 'k2'.")
+        if self._pending[model] >= self.max_pending:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Too many pending training jobs for '{model}', retry later.",
+                headers={"Retry-After": "30"},
+            )
+        job_id = self.store.create(model)
+        self._pending[model] += 1
+        task = asyncio.create_task(self._run(job_id, model, upload_path, mode))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    async def _run(self, job_id: str, model: str, upload_path: str = None, mode: str = "auto"):
+        try:
+            async with self._locks[model]:
+                await training_executor.run(
+                    run_training_job, self.store.path, job_id, model, upload_path, mode, bypass_limit=True
+                )
+            if self.on_success:
+                self.on_success(model)
+        except Exception as e:
+            job = self.store.get(job_id)
+            if job and job["status"] not in ("done", "failed"):
+                self.store.finish(job_id, error=f"{type(e).__name__}: {e}")
+        finally:
+            self._pending[model] -= 1
+            self._observe(job_id, model)
+
+    def _observe(self, job_id: str, model: str):
+        # Stages are timed inside the training process; export them from the job row it leaves behind.
+        job = self.store.get(job_id)
+        if not job or job["status"] not in ("done", "failed"):
+            return
+        for stage, seconds in job["stages"].items():
+            training_stage_duration.observe(seconds, model, stage)
+        training_jobs.inc(model, job["status"], (job["metrics"] or {}).get("mode", "unknown"))
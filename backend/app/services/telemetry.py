@@ -0,0 +1,284 @@
+"""In-process request and stage metrics, rendered in the Prometheus text format.
+
+Metrics are plain counters and fixed-bucket histograms behind one lock each,
+so an observation costs a dictionary lookup and a bisect; they stay on under
+load. ``stage(name)`` times a hot-path step (parse, validate, scale, predict,
+proba, results), ``TelemetryMiddleware`` counts and times every HTTP request
+by route template, and :func:`render` produces the ``/metrics/prometheus`` body.
+
+With ``EXOAI_PROFILING=1`` a request sent with ``X-Profile: 1`` is also run
+under :class:`SamplingProfiler`; the response carries ``X-Profile-Id`` and the
+summary is kept for ``GET /metrics/profiles/{id}``.
+"""
+import bisect
+import collections
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+PROFILING_ENABLED = os.getenv("EXOAI_PROFILING", "0").lower() in ("1", "true", "yes")
+PROFILE_INTERVAL_MS = float(os.getenv("EXOAI_PROFILE_INTERVAL_MS", "2"))
+PROFILE_KEEP = int(os.getenv("EXOAI_PROFILE_KEEP", "20"))
+PROFILE_TOP = 25
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TRAINING_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = collections.defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value:g}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        names = self.labelnames + ("le",)
+        bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {total:g}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Gauge:
+    """Value read from ``collect()`` (a ``{labels_tuple: value}`` dict) at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames, collect):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.collect = collect
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in sorted(self.collect().items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value:g}"
+
+
+class CollectedCounter(Gauge):
+    """Counter kept elsewhere (a monotonic total since start) and read from ``collect()`` at scrape time."""
+
+    kind = "counter"
+
+
+METRICS = []
+
+
+def register(metric):
+    METRICS.append(metric)
+    return metric
+
+
+http_requests = register(Counter(
+    "exoai_http_requests_total", "HTTP requests by method, route template and status.", ("method", "route", "status")
+))
+http_duration = register(Histogram(
+    "exoai_http_request_duration_seconds", "HTTP request latency until the last body byte.", ("method", "route")
+))
+stage_duration = register(Histogram(
+    "exoai_stage_seconds", "Wall-clock time of hot-path stages.", ("stage",)
+))
+stage_rows = register(Counter(
+    "exoai_stage_rows_total", "Rows processed by hot-path stages.", ("stage",)
+))
+training_stage_duration = register(Histogram(
+    "exoai_training_stage_seconds", "Wall-clock time of training job stages.", ("model", "stage"), TRAINING_BUCKETS
+))
+training_jobs = register(Counter(
+    "exoai_training_jobs_total", "Finished training jobs by model, status and retrain mode.",
+    ("model", "status", "mode"),
+))
+
+
+@contextmanager
+def stage(name: str, rows: int = None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_duration.observe(time.perf_counter() - start, name)
+        if rows:
+            stage_rows.inc(name, amount=rows)
+
+
+def render() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+IDLE_FILES = {"threading.py", "queue.py", "selectors.py", "thread.py"}
+
+
+def _frame_key(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack every ``interval_ms`` on a background thread.
+
+    Samples are process-wide, so under concurrent load they include other
+    requests' work; profile under low concurrency for a clean picture.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.samples = 0
+        self.self_counts = collections.Counter()
+        self.total_counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="exoai-profiler", daemon=True)
+        self.started = self.elapsed = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                # Threads parked in a lock, queue or selector (idle pool workers, the idle event loop) are skipped.
+                if ident == me or os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                    continue
+                self.samples += 1
+                self.self_counts[_frame_key(frame)] += 1
+                seen = set()
+                while frame is not None:
+                    key = _frame_key(frame)
+                    if key not in seen:
+                        self.total_counts[key] += 1
+                        seen.add(key)
+                    frame = frame.f_back
+
+    def summary(self, top: int = PROFILE_TOP) -> dict:
+        def table(counts):
+            return [
+                {"function": key, "samples": n, "percent": round(100 * n / self.samples, 1)}
+                for key, n in counts.most_common(top)
+            ]
+
+        return {
+            "elapsed_seconds": round(self.elapsed or 0.0, 6),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "self": table(self.self_counts) if self.samples else [],
+            "cumulative": table(self.total_counts) if self.samples else [],
+        }
+
+
+_profiles = collections.OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def _keep_profile(profile_id: str, summary: dict):
+    with _profiles_lock:
+        _profiles[profile_id] = summary
+        while len(_profiles) > PROFILE_KEEP:
+            _profiles.popitem(last=False)
+
+
+def list_profiles():
+    """``(profile_id, summary)`` of every kept profile, newest first."""
+    with _profiles_lock:
+        return list(reversed(_profiles.items()))
+
+
+def get_profile(profile_id: str):
+    """The kept summary of ``profile_id``, or None once it has been evicted (or never existed)."""
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+class TelemetryMiddleware:
+    """ASGI middleware counting and timing requests, labelled by route template (never the raw path)."""
+
+    def __init__(self, app, profiling: bool = PROFILING_ENABLED):
+        self.app = app
+        self.profiling = profiling
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        profile_id = profiler = None
+        if self.profiling and (b"x-profile", b"1") in scope.get("headers", ()):
+            profile_id = uuid.uuid4().hex[:16]
+            profiler = SamplingProfiler().__enter__()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile_id is not None:
+                    headers = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_requests.inc(scope["method"], route, status)
+            http_duration.observe(elapsed, scope["method"], route)
+            if profiler is not None:
+                profiler.__exit__(None, None, None)
+                request = {"method": scope["method"], "route": route, "status": status}
+                _keep_profile(profile_id, {**request, **profiler.summary()})
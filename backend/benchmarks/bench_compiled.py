@@ -0,0 +1,98 @@
+"""Benchmark: pickled StackingClassifier vs the compiled bundle.
+
+Checks probability parity on the bundled dataset, then loads each format in a
+fresh interpreter to compare load time and resident memory, and times batch
+and single-row scoring.
+
+    cd backend && python -m benchmarks.bench_compiled --model kepler --model-dir /path/to/artifacts
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from app.models.compiled import export_compiled
+from app.models.model_handler import ExoplanetModel
+from benchmarks.timing import best_of
+
+MODELS = {
+    "kepler": ("kepler_model", "Kepler_dataset.csv", "kepid"),
+    "k2": ("k2_model", "K2_dataset.csv", "pl_name"),
+}
+
+_LOAD_PROBE = """
+import json, sys, time
+def rss_kb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS"))
+from app.models.model_handler import ExoplanetModel
+before = rss_kb()
+start = time.perf_counter()
+model = ExoplanetModel(model_path=sys.argv[1], scaler_path=sys.argv[2] or None)
+seconds = time.perf_counter() - start
+print(json.dumps({"load_seconds": seconds, "rss_mb": rss_kb() / 1024, "load_rss_mb": (rss_kb() - before) / 1024}))
+"""
+
+
+def _probe(model_path, scaler_path):
+    out = subprocess.run(
+        [sys.executable, "-c", _LOAD_PROBE, model_path, scaler_path or ""],
+        capture_output=True, text=True, check=True, env={**os.environ, "PYTHONPATH": os.getcwd()},
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def main(args):
+    folder, dataset, id_col = MODELS[args.model]
+    model_dir = os.path.abspath(args.model_dir or os.path.join("app", "models", folder))
+    model_path = os.path.join(model_dir, f"{args.model}_stacking_classifier.pkl")
+    scaler_path = os.path.join(model_dir, f"{args.model}_scaler.pkl")
+    bundle_path = os.path.join(model_dir, f"{args.model}_compiled")
+
+    pickled = ExoplanetModel(model_path=model_path, scaler_path=scaler_path)
+    if pickled.model is None:
+        raise SystemExit("A trained model is required for this benchmark (see --model-dir).")
+    df = pd.read_csv(os.path.join("app", "models", folder, dataset))
+    X = df[list(pickled.scaler.feature_names_in_)].to_numpy(dtype=np.float64)
+    if args.export or not os.path.exists(bundle_path):
+        export_compiled(pickled.model, pickled.scaler, bundle_path)
+    compiled = ExoplanetModel(model_path=bundle_path)
+
+    Xs = pickled.scaler.transform(df[list(pickled.scaler.feature_names_in_)])
+    expected, got = pickled.predict_proba(Xs), compiled.predict_proba(compiled.scaler.transform(X))
+    max_diff = float(np.abs(expected - got).max())
+    agreement = float((expected.argmax(axis=1) == got.argmax(axis=1)).mean())
+
+    rows = [("pickle", _probe(model_path, scaler_path), pickled), ("compiled", _probe(bundle_path, None), compiled)]
+    print(f"rows={len(X)} max |dp|={max_diff:.2e} label agreement={agreement:.4%}")
+    print(f"{'format':<10}{'load s':>9}{'load MB':>9}{'RSS MB':>9}{'batch s':>9}{'row ms':>9}  size MB")
+    for name, probe, handler in rows:
+        batch, _ = best_of(lambda: handler.predict_array(X, df[id_col].astype(str)), args.repeat)
+        single, _ = best_of(lambda: handler.predict_array(X[:1], ["x"]), args.repeat * 10)
+        size = _size(bundle_path) if name == "compiled" else _size(model_path) + _size(scaler_path)
+        print(
+            f"{name:<10}{probe['load_seconds']:>9.3f}{probe['load_rss_mb']:>9.1f}{probe['rss_mb']:>9.1f}"
+            f"{batch:>9.3f}{single * 1000:>9.2f}  {size / 2**20:.1f}"
+        )
+    if max_diff > args.tolerance:
+        raise SystemExit(f"Compiled probabilities deviate by {max_diff:.3g} (> {args.tolerance}).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(MODELS), default="kepler")
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--export", action="store_true", help="re-export the bundle even if it exists")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    main(parser.parse_args())
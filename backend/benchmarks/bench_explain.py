@@ -0,0 +1,84 @@
+"""Benchmark: scoring throughput with per-row explanations on and off.
+
+Tiles the family's dataset to ``--rows`` rows and times ``predict_csv`` on the
+compiled model without explanations and with the top ``--top`` contributors of
+every row, then explains ``--naive-rows`` rows one call at a time (what a
+per-row explanation loop costs). The additivity column is the largest gap
+between ``base`` plus all contributions and the meta-learner score they explain.
+
+    cd backend && python -m benchmarks.bench_explain --model kepler --rows 100000 --model-dir /path/to/artifacts
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.data.validation import PREDICT_SCHEMAS
+from app.models.compiled import CompiledEnsemble, export_compiled
+from app.models.model_handler import ExoplanetModel
+from app.models.registry import SEED_DATASETS
+from benchmarks.timing import best_of
+
+
+def _meta_scores(model: CompiledEnsemble, X, target):
+    """The meta-learner score of class index ``target`` of every scaled row, computed directly."""
+    rf, xgb = model._base_probas(np.ascontiguousarray(X, dtype=np.float32))
+    if model.classes_.size == 2:
+        rf, xgb = rf[:, 1:], xgb[:, 1:]
+    scores = np.hstack([rf, xgb]) @ model.arrays["meta_coef"].T + model.arrays["meta_intercept"]
+    if scores.shape[1] == 1:
+        return np.where(target == 1, scores[:, 0], -scores[:, 0])
+    return scores[np.arange(len(target)), target]
+
+
+def main(args):
+    schema = PREDICT_SCHEMAS[args.model]
+    id_col = schema.string_columns[0]
+    df = pd.read_csv(SEED_DATASETS[args.model])[schema.columns]
+    df = pd.concat([df] * (args.rows // len(df) + 1), ignore_index=True).iloc[:args.rows]
+    model_dir = os.path.abspath(args.model_dir or os.path.dirname(SEED_DATASETS[args.model]))
+    bundle = os.path.join(model_dir, f"{args.model}_compiled")
+    if not os.path.exists(bundle) or not CompiledEnsemble.load(bundle).explainable:
+        pickled = ExoplanetModel(
+            os.path.join(model_dir, f"{args.model}_stacking_classifier.pkl"),
+            os.path.join(model_dir, f"{args.model}_scaler.pkl"),
+        )
+        if pickled.model is None:
+            raise SystemExit("A trained model is required for this benchmark (see --model-dir).")
+        export_compiled(pickled.model, pickled.scaler, bundle)
+    handler = ExoplanetModel(bundle)
+
+    print(f"model={args.model} rows={args.rows} top={args.top} (best of {args.repeat})")
+    print(f"{'mode':>16}{'rows':>9}{'seconds':>10}{'rows/s':>11}")
+    for top in (0, args.top):
+        seconds, _ = best_of(
+            lambda: handler.predict_csv(df, id_col=id_col, columnar=True, explain=top, explain_rows=args.rows),
+            args.repeat,
+        )
+        label = f"explain={top}" if top else "predict only"
+        print(f"{label:>16}{args.rows:>9}{seconds:>10.3f}{args.rows / seconds:>11.0f}")
+
+    features = list(handler.metadata.input_features)
+    X = df[features].to_numpy(dtype=np.float64)[:args.naive_rows]
+    preds = handler.model.predict(handler._transform(X))
+    seconds, _ = best_of(
+        lambda: [handler.explain(X[i:i + 1], preds[i:i + 1], args.top, features) for i in range(len(X))], args.repeat
+    )
+    print(f"{'per-row calls':>16}{len(X):>9}{seconds:>10.3f}{len(X) / seconds:>11.0f}")
+
+    target = np.searchsorted(handler.model.classes_, preds)
+    base, contributions = handler.model.explain(handler._transform(X), target)
+    gap = np.abs(base + contributions.sum(axis=1) - _meta_scores(handler.model, handler._transform(X), target))
+    print(f"additivity: max |base + sum(contributions) - score| = {gap.max():.2e} over {len(X)} rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(SEED_DATASETS), default="kepler")
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--naive-rows", type=int, default=500)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
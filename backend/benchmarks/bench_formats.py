@@ -0,0 +1,82 @@
+"""Benchmark: parse + score time for CSV, Parquet and Arrow IPC uploads.
+
+Tiles the bundled dataset to ``--rows``, serializes it in each format and times
+``TableSchema.read`` alone and followed by scoring, whole-file and chunked.
+Needs pyarrow.
+
+    cd backend && python -m benchmarks.bench_formats --model kepler --rows 100000 --model-dir /path/to/artifacts
+"""
+import argparse
+import io
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.data.columnar import detect_format
+from app.data.validation import PREDICT_SCHEMAS
+from app.models.model_handler import ExoplanetModel
+from benchmarks.timing import best_of
+
+MODELS = {
+    "kepler": ("kepler_model", "Kepler_dataset.csv", "kepid"),
+    "k2": ("k2_model", "K2_dataset.csv", "pl_name"),
+}
+
+
+def _serialize(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    parquet, arrow = io.BytesIO(), io.BytesIO()
+    pq.write_table(table, parquet)
+    with pa.ipc.new_file(arrow, table.schema) as writer:
+        writer.write_table(table)
+    return {"csv": df.to_csv(index=False).encode(), "parquet": parquet.getvalue(), "arrow": arrow.getvalue()}
+
+
+def _handler(model, model_dir):
+    compiled = os.path.join(model_dir, f"{model}_compiled")
+    if os.path.exists(compiled):
+        return ExoplanetModel(model_path=compiled)
+    return ExoplanetModel(
+        model_path=os.path.join(model_dir, f"{model}_stacking_classifier.pkl"),
+        scaler_path=os.path.join(model_dir, f"{model}_scaler.pkl"),
+    )
+
+
+def main(args):
+    folder, dataset, id_col = MODELS[args.model]
+    schema = PREDICT_SCHEMAS[args.model]
+    df = pd.read_csv(os.path.join("app", "models", folder, dataset))[schema.columns]
+    df = pd.concat([df] * (args.rows // len(df) + 1), ignore_index=True).head(args.rows)
+    handler = _handler(args.model, os.path.abspath(args.model_dir or os.path.join("app", "models", folder)))
+    if handler.model is None:
+        raise SystemExit("A trained model is required for this benchmark (see --model-dir).")
+
+    def parse(data):
+        file = io.BytesIO(data)
+        return schema.read(file, detect_format(file))
+
+    def score(data):
+        handler.predict_csv(parse(data), id_col=id_col, columnar=True)
+
+    def chunked(data):
+        file = io.BytesIO(data)
+        for _ in handler.predict_chunks(schema.read(file, detect_format(file), chunksize=args.chunksize), id_col=id_col):
+            pass
+
+    print(f"rows={len(df)} columns={len(schema.columns)}")
+    print(f"{'format':<10}{'size MB':>9}{'parse s':>9}{'+score s':>10}{'chunked s':>11}")
+    for fmt, data in _serialize(df).items():
+        parse_s, score_s, chunked_s = (best_of(lambda: fn(data), args.repeat)[0] for fn in (parse, score, chunked))
+        print(f"{fmt:<10}{len(data) / 2**20:>9.1f}{parse_s:>9.3f}{score_s:>10.3f}{chunked_s:>11.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(MODELS), default="kepler")
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,56 @@
+"""Benchmark: incremental /ingest retrain time vs upload size, against a full rebuild.
+
+Holds out the largest upload size from the family's dataset, trains the full
+pipeline on the rest, then grows a fresh copy of that model with uploads of
+each size. Prints the seconds per run and the previous model's accuracy on the
+uploaded rows.
+
+    cd backend && python -m benchmarks.bench_incremental --model kepler --sizes 50 200 800
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.models.training import FAMILIES, TrainingConfig, train_model, update_model
+from app.models.training_store import TrainingData, TrainingStore
+
+
+def main(args):
+    store = TrainingStore(args.model)
+    df = pd.read_csv(store.seed_path, dtype=store.schema.dtypes)
+    df = df.sample(frac=1.0, random_state=0).reset_index(drop=True)
+    held_out, corpus = df.iloc[:max(args.sizes)], store.to_data(df.iloc[max(args.sizes):])
+    config = TrainingConfig(threads=args.threads)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            _, model_path, scaler_path = train_model(args.model, output_dir=tmp, config=config, data=corpus)
+            full_seconds = time.perf_counter() - started
+        print(f"model={args.model} corpus={len(corpus)} rows threads={args.threads}")
+        print(f"{'upload rows':>12}{'seconds':>10}{'vs full':>10}{'upload acc':>12}")
+        print(f"{'full':>12}{full_seconds:>10.2f}{1.0:>10.2f}{'-':>12}")
+        for size in args.sizes:
+            fresh = store.to_data(held_out.iloc[:size])
+            data = TrainingData(corpus.features, np.vstack([corpus.X, fresh.X]), np.concatenate([corpus.y, fresh.y]),
+                                np.concatenate([corpus.ids, fresh.ids]))
+            stack, scaler = joblib.load(model_path), joblib.load(scaler_path)
+            with tempfile.TemporaryDirectory() as output_dir:
+                started = time.perf_counter()
+                metrics, _, _ = update_model(args.model, stack, scaler, data, fresh, output_dir, config=config)
+                seconds = time.perf_counter() - started
+            print(f"{size:>12}{seconds:>10.2f}{seconds / full_seconds:>10.2f}{metrics['upload_accuracy']:>12.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(FAMILIES), default="kepler")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--threads", type=int, default=TrainingConfig().threads)
+    main(parser.parse_args())
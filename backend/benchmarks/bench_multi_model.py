@@ -0,0 +1,61 @@
+"""Benchmark: one /exoplanet/predict/multi call on a mixed file vs one /exoplanet/predict call per model.
+
+Builds a mixed upload of ``--copies`` copies of the Kepler and K2 datasets
+(union of both schemas, each row's other-model cells left empty) and times
+scoring it in one multi-model request against uploading each model's part to
+``/exoplanet/predict`` in turn. Prints wall and process CPU seconds.
+
+    cd backend && python -m benchmarks.bench_multi_model --copies 1 5
+"""
+import argparse
+import time
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.training_store import SEED_DATASETS
+from app.routes.exoplanet import ID_COLUMNS
+from benchmarks.timing import best_of_cpu
+
+
+def main(args):
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 120
+        while client.get("/exoplanet/ready").status_code != 200:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Models did not become ready within 120 s.")
+            time.sleep(0.1)
+
+        print(f"(best of {args.repeat}, seconds)")
+        print(f"{'rows':>8}{'separate wall':>15}{'multi wall':>12}{'separate cpu':>14}{'multi cpu':>11}")
+        for copies in args.copies:
+            parts = {}
+            for model, path in SEED_DATASETS.items():
+                df = pd.read_csv(path).drop(columns=["target"])
+                df = pd.concat([df.assign(**{ID_COLUMNS[model]: df[ID_COLUMNS[model]].astype(str) + f"-{i}"})
+                                for i in range(copies)], ignore_index=True)
+                parts[model] = df
+            uploads = {model: df.to_csv(index=False).encode() for model, df in parts.items()}
+            mixed = pd.concat(parts.values(), ignore_index=True).to_csv(index=False).encode()
+
+            def separate():
+                for model, data in uploads.items():
+                    files = {"file": ("bench.csv", data, "text/csv")}
+                    client.post(f"/exoplanet/predict?model={model}", files=files).raise_for_status()
+
+            def multi():
+                files = {"file": ("bench.csv", mixed, "text/csv")}
+                client.post("/exoplanet/predict/multi", files=files).raise_for_status()
+
+            separate_wall, separate_cpu = best_of_cpu(separate, args.repeat)
+            multi_wall, multi_cpu = best_of_cpu(multi, args.repeat)
+            rows = sum(len(df) for df in parts.values())
+            print(f"{rows:>8}{separate_wall:>15.3f}{multi_wall:>12.3f}{separate_cpu:>14.3f}{multi_cpu:>11.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,65 @@
+"""Benchmark: "similar known planets" lookups, IVF index vs exhaustive search.
+
+Builds the neighbour index of the family's training store (standardized on the
+store itself, as training does with its scaler) and queries it with the
+family's rows tiled to ``--rows``: with the default ``nprobe``, with every cell
+probed (the exact blocked scan) and, on ``--naive-rows`` rows, with one
+distance computation per query row. Recall is measured against the exact scan.
+
+    cd backend && python -m benchmarks.bench_neighbors --model kepler --rows 200000 --k 5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.models.neighbors import INDEX_CLASSES, NPROBE, NeighborIndex, build_index
+from app.models.training import FAMILIES
+from app.models.training_store import TrainingStore
+from benchmarks.timing import best_of
+
+
+def main(args):
+    data = TrainingStore(args.model).load(mmap=False)
+    X = np.asarray(data.X, dtype=np.float64)
+    mean, std = X.mean(axis=0), X.std(axis=0)
+    std[std == 0] = 1.0
+    scaled = (X - mean) / std
+    known = np.isin(data.y, INDEX_CLASSES)
+
+    started = time.perf_counter()
+    index = NeighborIndex(build_index(scaled[known], data.ids[known]))
+    build_seconds = time.perf_counter() - started
+    queries = np.resize(scaled.astype(np.float32), (args.rows, scaled.shape[1]))
+
+    print(f"model={args.model} points={len(index)} cells={index.cells} build={build_seconds:.2f}s "
+          f"rows={args.rows} k={args.k} (best of {args.repeat})")
+    print(f"{'search':>14}{'nprobe':>8}{'rows':>9}{'seconds':>10}{'rows/s':>12}{'recall':>9}")
+    exact_seconds, (exact, _) = best_of(lambda: index.query(queries, args.k, nprobe=index.cells), args.repeat)
+    for nprobe in sorted({1, NPROBE, 2 * NPROBE} - {index.cells}):
+        if nprobe > index.cells:
+            continue
+        seconds, (found, _) = best_of(lambda: index.query(queries, args.k, nprobe=nprobe), args.repeat)
+        recall = sum(len(np.intersect1d(a, e)) for a, e in zip(found, exact)) / exact.size
+        print(f"{'ivf':>14}{nprobe:>8}{args.rows:>9}{seconds:>10.3f}{args.rows / seconds:>12.0f}{recall:>9.4f}")
+    print(f"{'exact blocked':>14}{index.cells:>8}{args.rows:>9}{exact_seconds:>10.3f}"
+          f"{args.rows / exact_seconds:>12.0f}{1:>9.4f}")
+
+    naive_rows = min(args.naive_rows, args.rows)
+    points = index.points.astype(np.float32)
+
+    def naive():
+        return [np.argsort(np.linalg.norm(points - row, axis=1))[:args.k] for row in queries[:naive_rows]]
+
+    seconds, _ = best_of(naive, args.repeat)
+    print(f"{'naive per-row':>14}{'-':>8}{naive_rows:>9}{seconds:>10.3f}{naive_rows / seconds:>12.0f}{1:>9.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(FAMILIES), default="kepler")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--naive-rows", type=int, default=2_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
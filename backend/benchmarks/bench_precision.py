@@ -0,0 +1,73 @@
+"""Benchmark: float64 vs float32 inference, with and without quantized tree thresholds.
+
+Tiles the family's dataset to ``--rows`` rows and, for each mode, times the
+typed CSV parse plus validation and ``predict_csv`` on the compiled model, and
+records the peak memory NumPy allocates while predicting (tracemalloc). The
+agreement column is the load-time check against float64 on the bundled dataset.
+
+    cd backend && python -m benchmarks.bench_precision --model kepler --rows 1000000 --model-dir /path/to/artifacts
+"""
+import argparse
+import io
+import os
+import time
+import tracemalloc
+
+import pandas as pd
+
+from app.data.validation import PREDICT_SCHEMAS_BY_PRECISION
+from app.models.compiled import export_compiled
+from app.models.model_handler import ExoplanetModel
+from app.models.registry import SEED_DATASETS
+
+MODES = [("float64", "none"), ("float32", "none"), ("float32", "float32"), ("float32", "float16")]
+
+
+def main(args):
+    reference = pd.read_csv(SEED_DATASETS[args.model])
+    schema64 = PREDICT_SCHEMAS_BY_PRECISION["float64"][args.model]
+    id_col = schema64.string_columns[0]
+    df = reference[schema64.columns]
+    df = pd.concat([df] * (args.rows // len(df) + 1), ignore_index=True).iloc[:args.rows]
+    data = df.to_csv(index=False).encode()
+    model_dir = os.path.abspath(args.model_dir or os.path.dirname(SEED_DATASETS[args.model]))
+    bundle = os.path.join(model_dir, f"{args.model}_compiled")
+    if not os.path.exists(bundle):
+        pickled = ExoplanetModel(
+            os.path.join(model_dir, f"{args.model}_stacking_classifier.pkl"),
+            os.path.join(model_dir, f"{args.model}_scaler.pkl"),
+        )
+        if pickled.model is None:
+            raise SystemExit("A trained model is required for this benchmark (see --model-dir).")
+        export_compiled(pickled.model, pickled.scaler, bundle)
+
+    print(f"model={args.model} rows={args.rows} (best of {args.repeat})")
+    print(f"{'precision':>10}{'quantize':>10}{'parse s':>9}{'predict s':>11}{'rows/s':>11}"
+          f"{'peak MB':>9}{'agreement':>11}")
+    for precision, quantize in MODES:
+        handler = ExoplanetModel(bundle, precision=precision, quantize=quantize)
+        check = handler.check_precision(reference) or {"agreement": 1.0}
+        schema = PREDICT_SCHEMAS_BY_PRECISION[handler.precision][args.model]
+
+        parse_seconds = predict_seconds = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            validated = schema.read_csv(io.BytesIO(data))
+            parse_seconds = min(parse_seconds, time.perf_counter() - started)
+            tracemalloc.start()
+            started = time.perf_counter()
+            handler.predict_csv(validated, id_col=id_col, columnar=True)
+            predict_seconds = min(predict_seconds, time.perf_counter() - started)
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+        print(f"{precision:>10}{quantize:>10}{parse_seconds:>9.3f}{predict_seconds:>11.3f}"
+              f"{args.rows / predict_seconds:>11.0f}{peak:>9.0f}{check['agreement']:>11.4%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(SEED_DATASETS), default="kepler")
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,73 @@
+"""Benchmark: re-uploading the same or overlapping data with the per-row result cache.
+
+Scores the dataset cold, again unchanged, then a file where half the rows are
+new, and compares each against scoring without the cache. The cache keeps its
+configured size (``EXOAI_RESULT_CACHE_ROWS``): with ``--repeat`` large enough
+for a file to exceed it, the file bypasses the cache and should cost the same
+as uncached scoring.
+
+    cd backend && python -m benchmarks.bench_result_cache --model kepler --model-dir /path/to/artifacts
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.models.model_handler import ExoplanetModel
+from app.models.result_cache import result_cache
+from benchmarks.timing import timed
+
+MODELS = {
+    "kepler": ("kepler_model", "Kepler_dataset.csv", "kepid"),
+    "k2": ("k2_model", "K2_dataset.csv", "pl_name"),
+}
+
+
+def main(args):
+    folder, dataset, id_col = MODELS[args.model]
+    model_dir = os.path.abspath(args.model_dir or os.path.join("app", "models", folder))
+    compiled = os.path.join(model_dir, f"{args.model}_compiled")
+    if os.path.isdir(compiled) and not args.pickle:
+        model = ExoplanetModel(model_path=compiled)
+    else:
+        model = ExoplanetModel(
+            model_path=os.path.join(model_dir, f"{args.model}_stacking_classifier.pkl"),
+            scaler_path=os.path.join(model_dir, f"{args.model}_scaler.pkl"),
+        )
+    if model.model is None:
+        raise SystemExit("A trained model is required for this benchmark (see --model-dir).")
+
+    df = pd.read_csv(os.path.join("app", "models", folder, dataset)).drop(columns=["target"])
+    df = pd.concat([df] * args.repeat, ignore_index=True)
+    df[id_col] = np.arange(len(df)).astype(str)
+    numeric = [c for c in df.columns if c != id_col]
+    half = len(df) // 2
+    overlap = df.copy()
+    overlap.loc[half:, numeric[0]] += 1e-3
+
+    model.cache_namespace = None
+    reference, uncached, _ = timed(lambda: model.predict_csv(df, id_col, columnar=True))
+    model.cache_namespace = f"{args.model}:bench"
+    result_cache.invalidate()
+
+    print(f"rows={len(df)} cache max_rows={result_cache.max_rows} uncached {uncached:.3f}s")
+    for name, frame in (("cold", df), ("same file", df), ("half new rows", overlap)):
+        before = result_cache.stats()
+        out, seconds, _ = timed(lambda: model.predict_csv(frame, id_col, columnar=True))
+        after = result_cache.stats()
+        hits = after["hits"] + after["spill_hits"] - before["hits"] - before["spill_hits"]
+        print(f"{name:<14}{seconds:>8.3f}s  hits={hits:<8} misses={after['misses'] - before['misses']:<8}"
+              f" bypassed={after['bypassed'] - before['bypassed']:<8} speedup {uncached / seconds:.1f}x")
+        if frame is df:
+            assert np.allclose(out["results"]["probability"], reference["results"]["probability"])
+            assert out["results"]["prediction"] == reference["results"]["prediction"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(MODELS), default="kepler")
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--pickle", action="store_true", help="use the pickled model even if a compiled bundle exists")
+    parser.add_argument("--repeat", type=int, default=1, help="repeat the dataset (rows get distinct ids, same features)")
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+"""Micro-benchmark: per-request latency for scoring one object.
+
+Compares a one-row multipart CSV upload to /exoplanet/predict, the JSON
+/exoplanet/predict/row endpoint, and a direct ExoplanetModel.predict_array call.
+
+    cd backend && python -m benchmarks.bench_single_row --model kepler --iterations 300
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.model_handler import ExoplanetModel
+from app.models.registry import _LoadedVersion
+from app.routes import exoplanet
+
+DATASETS = {"kepler": ("kepler_model", "Kepler_dataset.csv"), "k2": ("k2_model", "K2_dataset.csv")}
+
+
+def _latency(fn, iterations):
+    for _ in range(min(20, iterations)):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    ms = np.array(samples) * 1000
+    return f"p50 {np.percentile(ms, 50):8.3f} ms   p99 {np.percentile(ms, 99):8.3f} ms"
+
+
+def main(args):
+    folder, dataset = DATASETS[args.model]
+    model_dir = args.model_dir or os.path.join("app", "models", folder)
+    handler = ExoplanetModel(
+        model_path=os.path.abspath(os.path.join(model_dir, f"{args.model}_stacking_classifier.pkl")),
+        scaler_path=os.path.abspath(os.path.join(model_dir, f"{args.model}_scaler.pkl")),
+    )
+    if handler.model is None:
+        raise SystemExit("A trained model is required for this benchmark (see --model-dir).")
+    exoplanet.registries[args.model]._swap(_LoadedVersion("bench", handler))
+
+    id_col = exoplanet.ID_COLUMNS[args.model]
+    df = pd.read_csv(os.path.join("app", "models", folder, dataset)).drop(columns=["target"]).head(1)
+    csv_bytes = df.to_csv(index=False).encode()
+    row = df.to_dict(orient="records")[0]
+    payload = {"id": str(row.pop(id_col)), "features": row}
+    X = df[exoplanet.FEATURE_COLUMNS[args.model]].to_numpy(dtype=np.float64)
+
+    client = TestClient(app)
+    print(f"model={args.model} iterations={args.iterations}")
+    print("CSV upload  /predict:     ", _latency(
+        lambda: client.post(f"/exoplanet/predict?model={args.model}", files={"file": ("row.csv", csv_bytes)}),
+        args.iterations,
+    ))
+    print("JSON        /predict/row: ", _latency(
+        lambda: client.post(f"/exoplanet/predict/row?model={args.model}", json=payload), args.iterations
+    ))
+    print("in-process  predict_array:", _latency(lambda: handler.predict_array(X, [payload["id"]]), args.iterations))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(DATASETS), default="kepler")
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--iterations", type=int, default=300)
+    main(parser.parse_args())
@@ -0,0 +1,54 @@
+"""Benchmark: separate predict + predict_proba vs the single-pass ExoplanetModel.predict_proba.
+
+    cd backend && python -m benchmarks.bench_stacking_inference --model kepler --repeat 5
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.models.model_handler import ExoplanetModel
+from benchmarks.timing import timed
+
+MODELS = {
+    "kepler": ("kepler_model", "Kepler_dataset.csv", "kepid"),
+    "k2": ("k2_model", "K2_dataset.csv", "pl_name"),
+}
+
+
+def main(args):
+    folder, dataset, id_col = MODELS[args.model]
+    model_dir = args.model_dir or os.path.join("app", "models", folder)
+    model = ExoplanetModel(
+        model_path=os.path.abspath(os.path.join(model_dir, f"{args.model}_stacking_classifier.pkl")),
+        scaler_path=os.path.abspath(os.path.join(model_dir, f"{args.model}_scaler.pkl")),
+    )
+    if model.model is None:
+        raise SystemExit("A trained model is required for this benchmark (see --model-dir).")
+    df = pd.read_csv(os.path.join("app", "models", folder, dataset)).drop(columns=["target", id_col])
+    X = model.scaler.transform(pd.concat([df] * args.repeat, ignore_index=True))
+
+    def legacy():
+        return model.model.predict(X), model.model.predict_proba(X)
+
+    def single_pass():
+        probas = model.predict_proba(X)
+        return model.model.classes_[probas.argmax(axis=1)], probas
+
+    (old_preds, old_probas), old_wall, old_cpu = timed(legacy)
+    (new_preds, new_probas), new_wall, new_cpu = timed(single_pass)
+    assert np.array_equal(old_preds, new_preds) and np.allclose(old_probas, new_probas)
+
+    print(f"rows={len(X)} cores={os.cpu_count()}")
+    print(f"predict + predict_proba: wall {old_wall:7.2f}s  cpu {old_cpu:7.2f}s")
+    print(f"single pass:             wall {new_wall:7.2f}s  cpu {new_cpu:7.2f}s")
+    print(f"cpu reduction {old_cpu / new_cpu:.2f}x, wall speedup {old_wall / new_wall:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(MODELS), default="kepler")
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,92 @@
+"""Benchmark: cold start, i.e. import time and time to the first successful prediction.
+
+Each configuration runs in a fresh interpreter that imports ``app.main``,
+starts the app (running its lifespan, which warms the models) and polls
+``POST /exoplanet/predict/row`` until it returns 200.
+
+    cd backend && python -m benchmarks.bench_startup --model-root /path/to/model/root
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import pandas as pd
+from fastapi.testclient import TestClient
+import app.main
+imported = time.perf_counter()
+from app.routes.exoplanet import FEATURE_COLUMNS
+row = pd.read_csv("app/models/k2_model/K2_dataset.csv", nrows=1)
+payload = {"id": "probe", "features": row[FEATURE_COLUMNS["k2"]].iloc[0].astype(float).to_dict()}
+with TestClient(app.main.app) as client:
+    started = time.perf_counter()
+    attempts = 0
+    while True:
+        attempts += 1
+        response = client.post("/exoplanet/predict/row?model=k2", json=payload)
+        if response.status_code == 200:
+            break
+        if response.status_code != 503 or time.perf_counter() - start > 120:
+            raise SystemExit(f"prediction failed: {response.status_code} {response.text}")
+        time.sleep(0.005)
+    first = time.perf_counter()
+    ready = client.get("/exoplanet/ready").json()
+print(json.dumps({
+    "import": imported - start,
+    "app_started": started - start,
+    "first_prediction": first - start,
+    "attempts": attempts,
+    "ready": ready["ready"],
+    "sklearn_imported": "sklearn.ensemble" in sys.modules,
+    "xgboost_imported": "xgboost" in sys.modules,
+}))
+"""
+
+CONFIGS = [
+    ("pickle", "eager"),
+    ("pickle", "background"),
+    ("compiled", "eager"),
+    ("compiled", "background"),
+]
+
+
+def run(model_format, loading, model_root):
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.getcwd(),
+        "EXOAI_MODEL_FORMAT": model_format,
+        "EXOAI_MODEL_LOADING": loading,
+        "EXOAI_JOBS_DB": os.path.join("/tmp", f"exoai-startup-{os.getpid()}.sqlite3"),
+    }
+    if model_root:
+        env["EXOAI_MODEL_ROOT"] = model_root
+    wall = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", _CHILD], capture_output=True, text=True, env=env)
+    if out.returncode != 0:
+        raise SystemExit(out.stderr or out.stdout)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process_wall"] = time.perf_counter() - wall
+    return result
+
+
+def main(args):
+    model_root = os.path.abspath(args.model_root) if args.model_root else None
+    print(f"{'format':<10}{'loading':<12}{'import s':>9}{'app up s':>9}{'1st pred s':>11}{'polls':>7}  sklearn xgboost")
+    for model_format, loading in CONFIGS:
+        best = min((run(model_format, loading, model_root) for _ in range(args.repeat)), key=lambda r: r["first_prediction"])
+        print(
+            f"{model_format:<10}{loading:<12}{best['import']:>9.3f}{best['app_started']:>9.3f}"
+            f"{best['first_prediction']:>11.3f}{best['attempts']:>7}  {str(best['sklearn_imported']):<8}{best['xgboost_imported']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-root", default=None, help="folder with kepler_model/ and k2_model/ artifact dirs")
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,45 @@
+"""Benchmark: retrain wall-clock time, legacy pipeline vs the current defaults.
+
+"legacy" fits the diagnostic baselines and every XGBoost round, as the
+per-family training scripts used to; "default" is what ``/ingest`` runs now.
+Prints per-stage seconds, test accuracy and the XGBoost round count of each.
+
+    cd backend && python -m benchmarks.bench_training --model k2 --threads 4
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+
+from app.models.training import FAMILIES, TrainingConfig, train_model
+
+
+def main(args):
+    configs = {
+        "legacy": TrainingConfig(baselines=True, early_stopping_rounds=None, threads=args.threads),
+        "default": TrainingConfig(threads=args.threads),
+    }
+    results = {}
+    for name, config in configs.items():
+        with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+            metrics, _, _ = train_model(args.model, output_dir=output_dir, config=config)
+        results[name] = metrics
+
+    stages = list(dict.fromkeys(stage for m in results.values() for stage in m["stage_seconds"]))
+    print(f"model={args.model} threads={args.threads} split={configs['default'].thread_split()}")
+    print(f"{'stage':<20}" + "".join(f"{name:>10}" for name in results))
+    for stage in stages + ["total"]:
+        row = [
+            sum(m["stage_seconds"].values()) if stage == "total" else m["stage_seconds"].get(stage)
+            for m in results.values()
+        ]
+        print(f"{stage:<20}" + "".join(f"{v:>10.2f}" if v is not None else f"{'-':>10}" for v in row))
+    print(f"{'accuracy':<20}" + "".join(f"{m['accuracy']:>10.4f}" for m in results.values()))
+    print(f"{'xgb rounds':<20}" + "".join(f"{m['xgb_rounds']:>10}" for m in results.values()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(FAMILIES), default="k2")
+    parser.add_argument("--threads", type=int, default=TrainingConfig().threads)
+    main(parser.parse_args())
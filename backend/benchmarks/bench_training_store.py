@@ -0,0 +1,62 @@
+"""Benchmark: loading training data from the CSV vs the memory-mapped training store.
+
+Grows the family's dataset ``--copies`` times (with distinct ids) to mimic an
+ingested corpus, then times parsing it with ``pd.read_csv``, loading the
+feature matrix and target from a store seeded with it, and appending an
+upload of ``--upload`` rows.
+
+    cd backend && python -m benchmarks.bench_training_store --model kepler --copies 1 10 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from app.models.training_store import KEY_COLUMNS, TrainingStore
+from benchmarks.timing import best_of
+
+
+def main(args):
+    base = TrainingStore(args.model)
+    seed = pd.read_csv(base.seed_path, dtype=base.schema.dtypes)
+    id_col = KEY_COLUMNS[args.model][0]
+    print(f"model={args.model} (best of {args.repeat}, seconds)")
+    print(f"{'rows':>10}{'read_csv':>12}{'store load':>12}{'speedup':>10}{'append':>10}")
+    for copies in args.copies:
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus = pd.concat(
+                [seed.assign(**{id_col: seed[id_col] + f"-{i}"}) for i in range(copies)], ignore_index=True
+            )
+            csv_path = os.path.join(tmp, "corpus.csv")
+            corpus.to_csv(csv_path, index=False)
+            store = TrainingStore(args.model, seed_path=csv_path, path=os.path.join(tmp, "store"))
+            len(store)
+
+            def load_csv():
+                df = pd.read_csv(csv_path)
+                return df[store.features].to_numpy(), df["target"].to_numpy()
+
+            def load_store():
+                data = store.load()
+                return data.X, data.y
+
+            csv_seconds, _ = best_of(load_csv, args.repeat)
+            store_seconds, _ = best_of(load_store, args.repeat)
+            upload = seed.sample(n=min(args.upload, len(seed)), random_state=0)
+            upload = upload.assign(**{id_col: upload[id_col] + "-new"})
+            started = time.perf_counter()
+            store.append(upload)
+            append_seconds = time.perf_counter() - started
+            print(f"{len(corpus):>10}{csv_seconds:>12.4f}{store_seconds:>12.4f}"
+                  f"{csv_seconds / store_seconds:>9.0f}x{append_seconds:>10.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(KEY_COLUMNS), default="kepler")
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--upload", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,55 @@
+"""Benchmark: successive-halving hyperparameter search vs the cost of a full grid search.
+
+Times one evaluation of the current RF/XGBoost parameters on every training
+row (what each grid point would cost), then runs the search within
+``--cpu-seconds`` and prints its rungs, the best and current scores and the
+CPU time used next to the full grid's estimated CPU time.
+
+    cd backend && python -m benchmarks.bench_tuning --model k2 --threads 8
+"""
+import argparse
+import os
+import tempfile
+
+from sklearn.model_selection import train_test_split
+
+from app.models.training import FAMILIES, TrainingConfig
+from app.models.training_store import TrainingStore
+from app.models.tuning import _cache_folds, _evaluate, grid_size, tune
+
+
+def main(args):
+    config = TrainingConfig(threads=args.threads)
+    data = TrainingStore(args.model).load()
+    X_train, _, y_train, _ = train_test_split(
+        data.X, data.y, test_size=0.2, stratify=data.y, random_state=config.random_state
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "full")
+        _cache_folds(folder, X_train, y_train, config.cv, config.random_state)
+        params = {"rf": config.rf_params, "xgb": config.xgb_params}
+        _, point_cpu = _evaluate(folder, config.cv, params, config.threads, config.random_state)
+
+    report = tune(
+        X_train, y_train, config.rf_params, config.xgb_params, cv=config.cv, candidates=args.candidates,
+        cpu_seconds=args.cpu_seconds, threads=args.threads, random_state=config.random_state,
+    )
+    print(f"model={args.model} rows={len(y_train)} candidates={report['candidates']} threads={args.threads}")
+    print(f"{'rung rows':>10}{'evaluated':>11}{'best':>8}{'current':>9}")
+    for rung in report["rungs"]:
+        current = f"{rung['current_score']:.4f}" if rung["current_score"] is not None else "-"
+        print(f"{rung['rows']:>10}{rung['evaluated']:>11}{rung['best_score']:>8.4f}{current:>9}")
+    grid_cpu = grid_size() * point_cpu
+    print(f"best:    {report['best']['score']:.4f}  rf={report['best']['rf']} xgb={report['best']['xgb']}")
+    print(f"search:  {report['cpu_seconds']:.0f} CPU s, {report['wall_seconds']:.0f} s wall"
+          f"{' (budget exhausted)' if report['budget_exhausted'] else ''}")
+    print(f"grid:    ~{grid_cpu:.0f} CPU s for {grid_size()} points ({report['cpu_seconds'] / grid_cpu:.2%} of it)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(FAMILIES), default="k2")
+    parser.add_argument("--candidates", type=int, default=27)
+    parser.add_argument("--cpu-seconds", type=float, default=1800)
+    parser.add_argument("--threads", type=int, default=TrainingConfig().threads)
+    main(parser.parse_args())
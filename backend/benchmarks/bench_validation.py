@@ -0,0 +1,78 @@
+"""Benchmark: parsing + validating a large upload, legacy checks vs TableSchema.
+
+The legacy path is the validation the routes used before: type-inferring
+``read_csv`` then list scans, a whole-frame ``isnull`` and per-column dtype
+checks.
+
+    cd backend && python -m benchmarks.bench_validation --model kepler --rows 500000
+"""
+import argparse
+import io
+import os
+
+import pandas as pd
+
+from app.data.data import KEPLER_EXPECTED_COLUMNS, KEPLER_NUMERIC_COLUMNS, K2_EXPECTED_COLUMNS, K2_NUMERIC_COLUMNS
+from app.data.validation import PREDICT_SCHEMAS
+from benchmarks.timing import best_of
+
+MODELS = {
+    "kepler": ("kepler_model", "Kepler_dataset.csv", KEPLER_EXPECTED_COLUMNS[:-1], KEPLER_NUMERIC_COLUMNS),
+    "k2": ("k2_model", "K2_dataset.csv", K2_EXPECTED_COLUMNS[:-1], K2_NUMERIC_COLUMNS),
+}
+
+
+def legacy(buffer, expected, numeric):
+    df = pd.read_csv(buffer)
+    missing_cols = [col for col in expected if col not in df.columns]
+    extra_cols = [col for col in df.columns if col not in expected]
+    assert not missing_cols and not extra_cols
+    assert not df.isnull().any().any()
+    for col in [col for col in numeric if col in expected]:
+        assert pd.api.types.is_numeric_dtype(df[col])
+    return len(df)
+
+
+def main(args):
+    folder, dataset, expected, numeric = MODELS[args.model]
+    df = pd.read_csv(os.path.join("app", "models", folder, dataset))[expected]
+    df = pd.concat([df] * (args.rows // len(df) + 1), ignore_index=True).head(args.rows)
+    data = df.to_csv(index=False).encode()
+    schema = PREDICT_SCHEMAS[args.model]
+
+    runs = {
+        "legacy (inferred dtypes)": lambda: legacy(io.BytesIO(data), expected, numeric),
+        "schema, whole file": lambda: len(schema.read_csv(io.BytesIO(data))),
+        f"schema, chunks of {args.chunksize}": lambda: sum(
+            len(chunk) for chunk in schema.read_csv(io.BytesIO(data), chunksize=args.chunksize)
+        ),
+    }
+    print(f"rows={len(df)} columns={len(expected)} size={len(data) / 2**20:.0f} MB")
+    baseline = None
+    for name, fn in runs.items():
+        seconds, rows = best_of(fn, args.repeat)
+        assert rows == len(df)
+        baseline = baseline or seconds
+        print(f"{name:<30}{seconds:>8.3f}s  {len(df) / seconds / 1e6:>6.2f} M rows/s  {baseline / seconds:.2f}x")
+
+    bad = df.copy()
+    bad[expected[-1]] = bad[expected[-1]].astype(object)
+    bad.loc[len(bad) - 1, expected[-1]] = "n/a"
+    bad_data = bad.to_csv(index=False).encode()
+
+    def report():
+        try:
+            schema.read_csv(io.BytesIO(bad_data))
+        except ValueError as e:
+            return e
+    seconds, error = best_of(report, 1)
+    print(f"{'error report (1 bad cell)':<30}{seconds:>8.3f}s  {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(MODELS), default="kepler")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,84 @@
+"""Load test: /exoplanet/metrics latency while a large /exoplanet/predict runs.
+
+Polls /metrics at a fixed rate, first on an idle server and then while a large
+prediction upload is being scored, and reports p50/p99 for both phases. With
+inference on the executor pool the two distributions should be close.
+
+    cd backend && python -m benchmarks.load_metrics_latency --model k2 --repeat 200
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from app.main import app
+from app.models.model_handler import ExoplanetModel
+from app.models.registry import _LoadedVersion
+from app.routes import exoplanet
+
+MODELS = {"kepler": ("kepler_model", "Kepler_dataset.csv"), "k2": ("k2_model", "K2_dataset.csv")}
+
+
+def _percentiles(samples):
+    ms = np.array(samples) * 1000
+    return {"n": len(ms), "p50_ms": round(float(np.percentile(ms, 50)), 2), "p99_ms": round(float(np.percentile(ms, 99)), 2)}
+
+
+async def _poll(client, stop, interval):
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/exoplanet/metrics")
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def main(args):
+    folder, dataset = MODELS[args.model]
+    model_dir = args.model_dir or os.path.join("app", "models", folder)
+    handler = ExoplanetModel(
+        model_path=os.path.abspath(os.path.join(model_dir, f"{args.model}_stacking_classifier.pkl")),
+        scaler_path=os.path.abspath(os.path.join(model_dir, f"{args.model}_scaler.pkl")),
+    )
+    if handler.model is None:
+        raise SystemExit("A trained model is required for this benchmark (see --model-dir).")
+    exoplanet.registries[args.model]._swap(_LoadedVersion("bench", handler))
+    df = pd.read_csv(os.path.join("app", "models", folder, dataset)).drop(columns=["target"])
+    payload = pd.concat([df] * args.repeat, ignore_index=True).to_csv(index=False).encode()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        stop = asyncio.Event()
+        poller = asyncio.create_task(_poll(client, stop, args.interval))
+        await asyncio.sleep(args.idle_seconds)
+        stop.set()
+        idle = await poller
+
+        stop = asyncio.Event()
+        poller = asyncio.create_task(_poll(client, stop, args.interval))
+        start = time.perf_counter()
+        response = await client.post(f"/exoplanet/predict?model={args.model}", files={"file": ("bench.csv", payload)})
+        predict_seconds = time.perf_counter() - start
+        stop.set()
+        loaded = await poller
+    if response.status_code != 200:
+        raise SystemExit(f"/exoplanet/predict answered {response.status_code}: {response.text[:200]}")
+
+    print(f"predict: status={response.status_code} rows={len(df) * args.repeat} seconds={predict_seconds:.2f}")
+    print("metrics idle:        ", _percentiles(idle))
+    print("metrics under load:  ", _percentiles(loaded))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(MODELS), default="k2")
+    parser.add_argument("--model-dir", default=None, help="directory holding <model>_stacking_classifier.pkl and <model>_scaler.pkl")
+    parser.add_argument("--repeat", type=int, default=100, help="times the bundled dataset is repeated in the upload")
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between /metrics polls")
+    parser.add_argument("--idle-seconds", type=float, default=2.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""Load test: throughput of concurrent /exoplanet/predict/row calls with and without micro-batching.
+
+    cd backend && python -m benchmarks.load_microbatch --model kepler --concurrency 64 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from app.main import app
+from app.models.model_handler import ExoplanetModel
+from app.models.registry import _LoadedVersion
+from app.routes import exoplanet
+from app.services.executors import inference_executor
+
+DATASETS = {"kepler": ("kepler_model", "Kepler_dataset.csv"), "k2": ("k2_model", "K2_dataset.csv")}
+
+
+async def _run(client, payloads, model, concurrency, total):
+    latencies = []
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            response = await client.post(f"/exoplanet/predict/row?model={model}", json=payloads[i % len(payloads)])
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1000
+    return total / elapsed, np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+async def main(args):
+    folder, dataset = DATASETS[args.model]
+    model_dir = args.model_dir or os.path.join("app", "models", folder)
+    handler = ExoplanetModel(
+        model_path=os.path.abspath(os.path.join(model_dir, f"{args.model}_stacking_classifier.pkl")),
+        scaler_path=os.path.abspath(os.path.join(model_dir, f"{args.model}_scaler.pkl")),
+    )
+    if handler.model is None:
+        raise SystemExit("A trained model is required for this benchmark (see --model-dir).")
+    exoplanet.registries[args.model]._swap(_LoadedVersion("bench", handler))
+    # Measure queuing, not 503 backpressure, in the per-request run.
+    inference_executor.max_in_flight = max(inference_executor.max_in_flight, args.concurrency)
+
+    id_col = exoplanet.ID_COLUMNS[args.model]
+    df = pd.read_csv(os.path.join("app", "models", folder, dataset)).drop(columns=["target"]).head(500)
+    payloads = [{"id": str(r.pop(id_col)), "features": r} for r in df.to_dict(orient="records")]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"model={args.model} concurrency={args.concurrency} requests={args.requests}")
+        for enabled in (False, True):
+            exoplanet.microbatching = enabled
+            exoplanet.batchers.clear()
+            rps, p50, p99 = await _run(client, payloads, args.model, args.concurrency, args.requests)
+            label = "micro-batched" if enabled else "per-request  "
+            print(f"{label}: {rps:8.1f} req/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms")
+        print((await client.get("/exoplanet/batching")).json())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(DATASETS), default="kepler")
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""Per-worker memory with 1, 4 and 16 processes each holding both models.
+
+Every worker loads the Kepler and K2 models the way a uvicorn worker does,
+scores the bundled datasets once (so mapped pages are really resident), waits
+until all workers are up, then reports RSS and PSS from
+/proc/self/smaps_rollup. PSS charges shared pages proportionally, so it is the
+number that shows page-cache sharing of memory-mapped bundles. Linux only.
+
+    cd backend && python -m benchmarks.measure_worker_memory --model-dir /path/to/artifacts
+"""
+import argparse
+import multiprocessing as mp
+import os
+
+import numpy as np
+import pandas as pd
+
+MODELS = {
+    "kepler": ("kepler_model", "Kepler_dataset.csv"),
+    "k2": ("k2_model", "K2_dataset.csv"),
+}
+MODES = ("pickle", "compiled", "compiled-mmap")
+
+
+def _paths(model_dir, family, mode):
+    model_dir = model_dir or os.path.join("app", "models", MODELS[family][0])
+    if mode == "pickle":
+        return (
+            os.path.join(model_dir, f"{family}_stacking_classifier.pkl"),
+            os.path.join(model_dir, f"{family}_scaler.pkl"),
+        )
+    return os.path.join(model_dir, f"{family}_compiled"), None
+
+
+def _smaps_mb():
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1].lower()] = int(parts[1]) / 1024
+    return values
+
+
+def _worker(model_dir, mode, ready, done, results):
+    os.environ["EXOAI_MODEL_MMAP"] = "1" if mode == "compiled-mmap" else "0"
+    from app.models.model_handler import ExoplanetModel
+
+    models = []
+    for family, (folder, dataset) in MODELS.items():
+        model_path, scaler_path = _paths(model_dir, family, mode)
+        model = ExoplanetModel(model_path=model_path, scaler_path=scaler_path)
+        df = pd.read_csv(os.path.join("app", "models", folder, dataset))
+        X = df[list(model.scaler.feature_names_in_)].to_numpy(dtype=np.float64)
+        model.predict_array(X, np.arange(len(X)).astype(str))
+        models.append(model)
+    ready.wait()
+    results.put(_smaps_mb())
+    done.wait()
+
+
+def measure(model_dir, mode, workers):
+    ctx = mp.get_context("spawn")
+    ready, done, results = ctx.Barrier(workers), ctx.Barrier(workers + 1), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(model_dir, mode, ready, done, results)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    samples = [results.get() for _ in procs]
+    done.wait()
+    for proc in procs:
+        proc.join()
+    return {
+        "rss": sum(s["rss"] for s in samples) / workers,
+        "pss": sum(s["pss"] for s in samples) / workers,
+        "total_pss": sum(s["pss"] for s in samples),
+    }
+
+
+def main(args):
+    model_dir = os.path.abspath(args.model_dir) if args.model_dir else None
+    print(f"{'mode':<15}{'workers':>8}{'RSS/worker MB':>15}{'PSS/worker MB':>15}{'total PSS MB':>14}")
+    for mode in args.modes:
+        for workers in args.workers:
+            stats = measure(model_dir, mode, workers)
+            print(f"{mode:<15}{workers:>8}{stats['rss']:>15.1f}{stats['pss']:>15.1f}{stats['total_pss']:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default=None, help="one directory holding both families' artifacts (default: the in-tree model folders)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    main(parser.parse_args())
@@ -0,0 +1,213 @@
+"""Benchmark suite: parsing, validation, scaling, inference, HTTP and training on synthetic data.
+
+Synthesizes Kepler and K2 uploads of ``--rows`` rows from the column schema in
+``app/data/data.py`` (each column's values are drawn from that column in the
+bundled dataset, so value ranges are realistic), trains a model per family on
+``--train-rows`` synthetic rows into a temporary model root, and then times,
+per family:
+
+- ``csv_parse``: type-inferring ``pd.read_csv`` of the upload
+- ``validation``: ``TableSchema.read_csv`` (typed parse plus checks)
+- ``scaling``: the model's scaler on the feature matrix
+- ``predict_csv``: ``ExoplanetModel.predict_csv`` on the validated frame
+- ``http_predict``: ``POST /exoplanet/predict`` through the ASGI test client
+- ``training``: one ``train_model`` run
+
+plus ``http_metrics`` (``GET /exoplanet/metrics``) once every family is served.
+Timings are the best of ``--repeat`` runs (training runs once) and are written
+as JSON. With ``--baseline`` each timing is compared with a stored run and the
+process exits with status 1 when one got slower by more than ``--tolerance``
+(status 2 when the baseline file does not exist, so a missing baseline cannot
+pass the gate); ``--update-baseline`` stores the current run as the baseline
+instead.
+
+    cd backend && python -m benchmarks.suite --rows 50000 --out bench.json --baseline benchmarks/baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from app.data.data import KEPLER_EXPECTED_COLUMNS, KEPLER_STRING_COLUMNS, K2_EXPECTED_COLUMNS, K2_STRING_COLUMNS
+from benchmarks.timing import best_of
+
+SCHEMAS = {
+    "kepler": (KEPLER_EXPECTED_COLUMNS, KEPLER_STRING_COLUMNS, "Kepler_dataset.csv"),
+    "k2": (K2_EXPECTED_COLUMNS, K2_STRING_COLUMNS, "K2_dataset.csv"),
+}
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "models")
+# Slower than the baseline by less than this many seconds never fails the gate (timer noise on fast steps).
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def synthesize(model: str, rows: int, seed: int = 0, target: bool = True) -> pd.DataFrame:
+    """``rows`` synthetic rows with the model's columns, each drawn from that column of the bundled dataset."""
+    columns, string_columns, dataset = SCHEMAS[model]
+    folder = "kepler_model" if model == "kepler" else "k2_model"
+    source = pd.read_csv(os.path.join(DATA_DIR, folder, dataset))
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        col: (
+            np.char.add(f"{model}-", np.arange(rows).astype(str)) if col in string_columns
+            else rng.choice(source[col].to_numpy(dtype=np.float64), rows)
+        )
+        for col in columns
+    })
+    if target:
+        df["target"] = df["target"].astype(np.int64)
+        return df
+    return df.drop(columns=["target"])
+
+
+def _result(seconds: float, rows: int = None) -> dict:
+    result = {"seconds": round(seconds, 6)}
+    if rows:
+        result["rows"] = rows
+        result["rows_per_second"] = round(rows / seconds, 1)
+    return result
+
+
+def run(args, root: str) -> dict:
+    # The model root, job database and result cache are read at import, so import the app only now.
+    os.environ["EXOAI_MODEL_ROOT"] = root
+    os.environ["EXOAI_JOBS_DB"] = os.path.join(root, "jobs.sqlite3")
+    os.environ["EXOAI_RESULT_CACHE_ROWS"] = "0"
+    from fastapi.testclient import TestClient
+
+    from app.data.validation import PREDICT_SCHEMAS
+    from app.models.model_handler import ExoplanetModel
+    from app.models.registry import BASE_VERSION, FAMILIES, serving_paths
+    from app.models.training import TrainingConfig, train_model
+    from app.models.training_store import TrainingStore
+
+    results = {}
+    uploads = {}
+    for model in args.models:
+        train = TrainingStore(model).to_data(synthesize(model, args.train_rows, seed=1))
+        output_dir = os.path.join(root, FAMILIES[model])
+        os.makedirs(output_dir, exist_ok=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            train_model(model, output_dir=output_dir, data=train, config=TrainingConfig(threads=args.threads))
+            results[f"{model}.training"] = _result(time.perf_counter() - started, args.train_rows)
+
+        df = synthesize(model, args.rows, target=False)
+        data = df.to_csv(index=False).encode()
+        uploads[model] = data
+        schema = PREDICT_SCHEMAS[model]
+        parse, validate = (lambda: pd.read_csv(io.BytesIO(data))), (lambda: schema.read_csv(io.BytesIO(data)))
+        results[f"{model}.csv_parse"] = _result(best_of(parse, args.repeat)[0], args.rows)
+        results[f"{model}.validation"] = _result(best_of(validate, args.repeat)[0], args.rows)
+
+        validated = schema.read_csv(io.BytesIO(data))
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler = ExoplanetModel(*serving_paths(model, BASE_VERSION))
+        features = list(handler.metadata.input_features) or schema.numeric_columns
+        X = validated[features].to_numpy(dtype=np.float64)
+        id_col = schema.string_columns[0]
+        results[f"{model}.scaling"] = _result(best_of(lambda: handler._transform(X), args.repeat)[0], args.rows)
+        results[f"{model}.predict_csv"] = _result(
+            best_of(lambda: handler.predict_csv(validated, id_col=id_col), args.repeat)[0], args.rows
+        )
+
+    import app.main
+
+    with TestClient(app.main.app) as client:
+        deadline = time.monotonic() + 120
+        while client.get("/exoplanet/ready").status_code != 200:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Models did not become ready within 120 s.")
+            time.sleep(0.1)
+
+        for model, data in uploads.items():
+            def predict():
+                files = {"file": ("bench.csv", data, "text/csv")}
+                client.post(f"/exoplanet/predict?model={model}", files=files).raise_for_status()
+
+            results[f"{model}.http_predict"] = _result(best_of(predict, args.repeat)[0], args.rows)
+
+        if set(args.models) == set(SCHEMAS):
+            def metrics():
+                client.get("/exoplanet/metrics").raise_for_status()
+
+            results["http_metrics"] = _result(best_of(metrics, max(args.repeat, 20))[0])
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Rows of ``(name, baseline_s, current_s, ratio, regressed)`` for the timings in both runs."""
+    rows = []
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["seconds"], current["seconds"]
+        ratio = after / before if before else float("inf")
+        regressed = after > before * (1 + tolerance) and after - before > MIN_REGRESSION_SECONDS
+        rows.append((name, before, after, ratio, regressed))
+    return rows
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as root:
+        results = run(args, root)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "rows": args.rows,
+            "train_rows": args.train_rows,
+            "repeat": args.repeat,
+            "threads": args.threads,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.update_baseline:
+        with open(args.update_baseline, "w") as f:
+            f.write(text + "\n")
+        return 0
+    if not args.baseline:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Baseline {args.baseline} not found; store one with --update-baseline first.", file=sys.stderr)
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    failed = False
+    print(f"{'benchmark':<24}{'baseline':>10}{'current':>10}{'ratio':>8}", file=sys.stderr)
+    for name, before, after, ratio, regressed in compare(results, baseline, args.tolerance):
+        failed |= regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<24}{before:>10.4f}{after:>10.4f}{ratio:>7.2f}x{flag}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", choices=sorted(SCHEMAS), default=sorted(SCHEMAS))
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--train-rows", type=int, default=3_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report to compare with; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown, as a fraction")
+    parser.add_argument("--update-baseline", metavar="PATH", help="store this run as the baseline")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,29 @@
+"""Timing helpers shared by the benchmarks."""
+import time
+
+
+def best_of(fn, repeat: int = 1):
+    """``(seconds, result)``: the fastest wall time of ``repeat`` calls of ``fn`` and the last call's result."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def best_of_cpu(fn, repeat: int = 1):
+    """``(wall, cpu)`` seconds of the fastest of ``repeat`` calls of ``fn`` (ordered by wall time)."""
+    best = (float("inf"), float("inf"))
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        fn()
+        best = min(best, (time.perf_counter() - wall, time.process_time() - cpu))
+    return best
+
+
+def timed(fn, *args):
+    """``(result, wall, cpu)`` of one call ``fn(*args)``; wall and CPU times in seconds."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    out = fn(*args)
+    return out, time.perf_counter() - wall, time.process_time() - cpu
@@ -0,0 +1,126 @@
+"""Shared fixtures: small trained stacking ensembles, their compiled bundles, the upload fixtures and an API client."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+K2_UPLOAD = os.path.join(TESTS_DIR, "test_k2_model.csv")
+KEPLER_UPLOAD = os.path.join(TESTS_DIR, "test_kepler_model.csv")
+UPLOADS = {"k2": (K2_UPLOAD, "pl_name"), "kepler": (KEPLER_UPLOAD, "kepid")}
+
+
+@pytest.fixture
+def k2_upload() -> pd.DataFrame:
+    """The K2 upload fixture as text cells, so single cells can be corrupted."""
+    return pd.read_csv(K2_UPLOAD, dtype=str, keep_default_na=False)
+
+
+@pytest.fixture
+def kepler_upload() -> pd.DataFrame:
+    """The Kepler upload fixture as text cells."""
+    return pd.read_csv(KEPLER_UPLOAD, dtype=str, keep_default_na=False)
+
+
+@pytest.fixture(scope="session")
+def stack():
+    """A small fitted rf + xgb stacking ensemble on three classes, its scaler and unscaled rows."""
+    pytest.importorskip("sklearn")
+    pytest.importorskip("xgboost")
+    from sklearn.datasets import make_classification
+    from sklearn.ensemble import RandomForestClassifier, StackingClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBClassifier
+
+    X, y = make_classification(
+        n_samples=400, n_features=8, n_informative=5, n_classes=3, n_clusters_per_class=1, random_state=0
+    )
+    X = X * np.array([1, 10, 100, 0.1, 1, 5, 50, 2]) + 3
+    scaler = StandardScaler().fit(X)
+    model = StackingClassifier(
+        estimators=[
+            ("rf", RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0)),
+            ("xgb", XGBClassifier(n_estimators=20, max_depth=3, tree_method="hist", random_state=0)),
+        ],
+        final_estimator=LogisticRegression(max_iter=1000),
+        stack_method="predict_proba",
+        cv=3,
+    ).fit(scaler.transform(X), y)
+    return model, scaler, X
+
+
+@pytest.fixture(scope="session")
+def bundle(stack, tmp_path_factory):
+    """``stack`` exported as a compiled ``.npy`` bundle."""
+    from app.models.compiled import export_compiled
+
+    model, scaler, X = stack
+    path = str(tmp_path_factory.mktemp("compiled") / "model_compiled")
+    export_compiled(model, scaler, path, X_check=X)
+    return path
+
+
+def _train_served(model: str, path: str) -> str:
+    """Compile an rf + xgb stack fitted on noisy copies of ``model``'s upload fixture rows to ``path``."""
+    from sklearn.ensemble import RandomForestClassifier, StackingClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBClassifier
+
+    from app.models.compiled import export_compiled
+
+    upload, id_col = UPLOADS[model]
+    df = pd.read_csv(upload).drop(columns=[id_col])
+    rng = np.random.default_rng(0)
+    source = np.repeat(np.arange(len(df)), 60)
+    X = pd.DataFrame(df.to_numpy(dtype=np.float64)[source] * rng.normal(1, 0.02, (len(source), df.shape[1])),
+                     columns=df.columns)
+    # The scaler is fitted on a frame so the bundle records the column order the handler selects.
+    scaler = StandardScaler().fit(X)
+    stack = StackingClassifier(
+        estimators=[
+            ("rf", RandomForestClassifier(n_estimators=10, max_depth=5, random_state=0)),
+            ("xgb", XGBClassifier(n_estimators=10, max_depth=3, tree_method="hist", random_state=0)),
+        ],
+        final_estimator=LogisticRegression(max_iter=1000),
+        stack_method="predict_proba",
+        cv=3,
+    ).fit(scaler.transform(X), source % 3)
+    export_compiled(stack, scaler, path, X_check=X.to_numpy())
+    return path
+
+
+@pytest.fixture(scope="session")
+def served_bundles(tmp_path_factory):
+    """Compiled bundles for both model families, trained on their upload fixtures."""
+    pytest.importorskip("sklearn")
+    pytest.importorskip("xgboost")
+    root = tmp_path_factory.mktemp("served")
+    return {model: _train_served(model, str(root / f"{model}_compiled")) for model in UPLOADS}
+
+
+@pytest.fixture
+def client(served_bundles, monkeypatch):
+    """A client of the API with a ``test`` version of every model family served from ``served_bundles``.
+
+    The registries are replaced for the test, so nothing is loaded from (or left behind in) the model folders.
+    """
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.models import registry
+    from app.models.model_handler import ExoplanetModel
+    from app.models.registry import ModelRegistry, _LoadedVersion
+    from app.routes import exoplanet
+
+    monkeypatch.setattr(registry, "POLL_SECONDS", 3600.0)
+    registries = {model: ModelRegistry(model) for model in UPLOADS}
+    for model, registry_ in registries.items():
+        registry_._swap(_LoadedVersion("test", ExoplanetModel(served_bundles[model], precision="float64")))
+    monkeypatch.setattr(exoplanet, "registries", registries)
+    monkeypatch.setattr(exoplanet, "batchers", {})
+    # Without a ``with`` block the lifespan does not run, so it never reloads the real models.
+    return TestClient(app)
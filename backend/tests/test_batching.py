@@ -0,0 +1,70 @@
+"""Micro-batching: coalescing concurrent calls, slicing results back and propagating errors.
+
+    cd backend && python -m pytest -q tests/test_batching.py
+"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.batching import MicroBatcher
+
+
+def _rows(n: int, first: int):
+    """``n`` one-feature rows numbered from ``first``, with matching ids."""
+    return np.arange(first, first + n, dtype=np.float64).reshape(-1, 1), [f"r{i}" for i in range(first, first + n)]
+
+
+def _recording_batcher(calls, **kwargs):
+    async def run_batch(X, ids):
+        calls.append(len(X))
+        await asyncio.sleep(0)
+        return {"id": ids, "value": X[:, 0].tolist()}
+
+    return MicroBatcher(run_batch, **kwargs)
+
+
+def test_concurrent_calls_are_coalesced_and_sliced_back():
+    calls = []
+
+    async def scenario():
+        batcher = _recording_batcher(calls, max_rows=100, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(*_rows(n, first)) for n, first in ((1, 0), (2, 1), (3, 3))))
+        return batcher, results
+
+    batcher, results = asyncio.run(scenario())
+    assert calls == [6]
+    assert [result["id"] for result in results] == [["r0"], ["r1", "r2"], ["r3", "r4", "r5"]]
+    assert [result["value"] for result in results] == [[0.0], [1.0, 2.0], [3.0, 4.0, 5.0]]
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == 1 and stats["queue_wait_ms"]["count"] == 3
+    assert stats["queued_rows"] == 0
+
+
+def test_batch_is_flushed_at_max_rows():
+    calls = []
+
+    async def scenario():
+        batcher = _recording_batcher(calls, max_rows=3, max_wait_ms=20)
+        return await asyncio.gather(*(batcher.submit(*_rows(n, first)) for n, first in ((2, 0), (2, 2), (1, 4))))
+
+    results = asyncio.run(scenario())
+    # The second call reaches max_rows at once; the third waits for the timer on its own.
+    assert calls == [4, 1]
+    assert [result["id"] for result in results] == [["r0", "r1"], ["r2", "r3"], ["r4"]]
+
+
+def test_batch_error_reaches_every_waiter():
+    async def failing(X, ids):
+        raise ValueError("model failed")
+
+    async def scenario():
+        batcher = MicroBatcher(failing, max_rows=100, max_wait_ms=10)
+        outcomes = await asyncio.gather(*(batcher.submit(*_rows(1, i)) for i in range(3)), return_exceptions=True)
+        assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+        # The failed batch leaves nothing queued behind.
+        assert batcher.stats()["queued_rows"] == 0
+        with pytest.raises(ValueError, match="model failed"):
+            await batcher.submit(*_rows(1, 9))
+
+    asyncio.run(scenario())
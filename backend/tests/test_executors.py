@@ -0,0 +1,97 @@
+"""Backpressure and pool recovery in the bounded executors and the training job queue.
+
+    cd backend && python -m pytest -q tests/test_executors.py
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.executors import BoundedExecutor
+from app.services.jobs import JobManager, JobStore
+
+
+def _busy(fn):
+    with pytest.raises(HTTPException) as info:
+        fn()
+    assert info.value.status_code == 503
+    assert "Retry-After" in info.value.headers
+
+
+class _BrokenPool(ThreadPoolExecutor):
+    """A pool whose worker has died: it refuses every call, like a broken ``ProcessPoolExecutor``."""
+
+    def submit(self, fn, *args, **kwargs):
+        raise BrokenProcessPool("A child process terminated abruptly.")
+
+
+def test_full_executor_answers_503():
+    executor = BoundedExecutor("test", lambda: ThreadPoolExecutor(max_workers=1), max_in_flight=2)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0)
+        reservation = executor.reserve()
+        assert executor.stats() == {"in_flight": 2, "max_in_flight": 2}
+        _busy(executor.reserve)
+        with pytest.raises(HTTPException):
+            await executor.run(int)
+        # Work under a reservation does not take another slot.
+        release.set()
+        assert await reservation.run(int, "7") == 7
+        reservation.release()
+        reservation.release()
+        await first
+        assert executor.in_flight == 0
+        assert await executor.run(int, "3") == 3
+
+    asyncio.run(scenario())
+    executor.shutdown()
+
+
+def test_broken_pool_is_rebuilt():
+    pools = [_BrokenPool(max_workers=1), ThreadPoolExecutor(max_workers=1)]
+    executor = BoundedExecutor("test", lambda: pools.pop(0), max_in_flight=2)
+
+    async def scenario():
+        with pytest.raises(BrokenProcessPool):
+            await executor.run(int, "1")
+        assert executor.in_flight == 0
+        assert await executor.run(int, "2") == 2
+
+    asyncio.run(scenario())
+    assert pools == []
+    executor.shutdown()
+
+
+def test_full_training_queue_answers_503(tmp_path, monkeypatch):
+    started = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def run(self, job_id, model, upload_path=None, mode="auto"):
+            started.append(job_id)
+            try:
+                await release.wait()
+            finally:
+                self._pending[model] -= 1
+
+        monkeypatch.setattr(JobManager, "_run", run)
+        jobs = JobManager(JobStore(str(tmp_path / "jobs.sqlite3")), max_pending=2)
+        jobs.submit("k2")
+        jobs.submit("k2")
+        _busy(lambda: jobs.submit("k2"))
+        # The limit is per model family.
+        jobs.submit("kepler")
+        release.set()
+        await asyncio.gather(*jobs._tasks)
+        jobs.submit("k2")
+        await asyncio.gather(*jobs._tasks)
+
+    asyncio.run(scenario())
+    assert len(started) == 4
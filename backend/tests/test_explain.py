@@ -0,0 +1,104 @@
+"""Per-row explanations: contributions add up to the meta-learner score they explain.
+
+    cd backend && python -m pytest -q tests/test_explain.py
+"""
+import numpy as np
+import pytest
+
+
+def _meta_scores(model, X, target):
+    """The meta-learner score of class index ``target`` of every scaled row, computed directly."""
+    rf, xgb = model._base_probas(np.ascontiguousarray(X, dtype=np.float32))
+    scores = np.hstack([rf, xgb]) @ model.arrays["meta_coef"].T + model.arrays["meta_intercept"]
+    return scores[np.arange(len(target)), target]
+
+
+def test_explanations_add_up_to_the_score(stack, bundle):
+    from app.models.compiled import CompiledEnsemble
+
+    _, scaler, X = stack
+    model = CompiledEnsemble.load(bundle)
+    assert model.explainable
+    scaled = scaler.transform(X)
+    for target in (model.predict_proba(scaled).argmax(axis=1), np.zeros(len(X), dtype=np.intp)):
+        base, contributions = model.explain(scaled, target)
+        assert contributions.shape == X.shape
+        np.testing.assert_allclose(base + contributions.sum(axis=1), _meta_scores(model, scaled, target), atol=1e-3)
+
+
+def test_handler_explanations_add_up(stack, bundle):
+    from app.models.model_handler import ExoplanetModel
+
+    _, _, X = stack
+    handler = ExoplanetModel(bundle, precision="float64")
+    scaled = handler._transform(X[:50])
+    target = handler.model.predict_proba(scaled).argmax(axis=1)
+    preds = handler.model.classes_[target]
+    explanations = handler.explain(X[:50], preds, 3, [f"f{i}" for i in range(X.shape[1])])
+    scores = _meta_scores(handler.model, scaled, target)
+    for explanation, score in zip(explanations, scores):
+        assert len(explanation["contributions"]) == 3
+        total = explanation["base"] + explanation["rest"] + sum(c["contribution"] for c in explanation["contributions"])
+        # Every part is rounded to four decimals.
+        assert total == pytest.approx(score, abs=2e-3)
+
+
+def test_other_stacking_layouts_are_not_explainable(stack, tmp_path):
+    import joblib
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier, StackingClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    from app.models.model_handler import ExoplanetModel
+
+    _, scaler, X = stack
+    y = np.arange(len(X)) % 3
+    other = StackingClassifier(
+        estimators=[
+            ("rf", RandomForestClassifier(n_estimators=5, random_state=0)),
+            ("et", ExtraTreesClassifier(n_estimators=5, random_state=0)),
+        ],
+        final_estimator=LogisticRegression(max_iter=1000),
+        stack_method="predict_proba",
+        cv=3,
+    ).fit(scaler.transform(X), y)
+    joblib.dump(other, tmp_path / "model.pkl")
+    joblib.dump(scaler, tmp_path / "scaler.pkl")
+    handler = ExoplanetModel(str(tmp_path / "model.pkl"), str(tmp_path / "scaler.pkl"), precision="float64")
+    assert not handler.explainable
+    with pytest.raises(ValueError, match="cannot explain"):
+        handler.explain(X[:5], other.predict(scaler.transform(X[:5])), 3, [f"f{i}" for i in range(X.shape[1])])
+
+
+def test_pickled_model_is_compiled_once(stack, tmp_path, monkeypatch):
+    import threading
+
+    import joblib
+
+    from app.models import model_handler
+    from app.models.model_handler import ExoplanetModel
+
+    model, scaler, X = stack
+    joblib.dump(model, tmp_path / "model.pkl")
+    joblib.dump(scaler, tmp_path / "scaler.pkl")
+    handler = ExoplanetModel(str(tmp_path / "model.pkl"), str(tmp_path / "scaler.pkl"), precision="float64")
+    assert handler.explainable
+    calls = []
+    compile_ensemble = model_handler.compile_ensemble
+    monkeypatch.setattr(model_handler, "compile_ensemble", lambda *a: calls.append(1) or compile_ensemble(*a))
+
+    preds = model.predict(scaler.transform(X[:20]))
+    features = [f"f{i}" for i in range(X.shape[1])]
+    start = threading.Barrier(4)
+    results = []
+
+    def explain():
+        start.wait()
+        results.append(handler.explain(X[:20], preds, 3, features))
+
+    threads = [threading.Thread(target=explain) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 4 and all(result == results[0] for result in results)
@@ -0,0 +1,97 @@
+"""Incremental retraining: warm-started trees and rounds, a kept meta-learner and the full-rebuild fallbacks.
+
+    cd backend && python -m pytest -q tests/test_incremental.py
+"""
+import copy
+
+import numpy as np
+import pytest
+
+
+def _data(stack):
+    """The fixture rows as a training store's data, labelled by the fitted model so every class is present."""
+    from app.models.training_store import TrainingData
+
+    model, scaler, X = stack
+    ids = np.array([f"r{i}" for i in range(len(X))], dtype=object)
+    return TrainingData([f"f{i}" for i in range(X.shape[1])], X, model.predict(scaler.transform(X)), ids)
+
+
+def _counts(fresh_rows: int, store_rows: int = 400) -> dict:
+    return {"fresh_rows": fresh_rows, "store_rows": store_rows}
+
+
+def test_update_grows_the_ensemble_and_keeps_the_meta_learner(stack, tmp_path):
+    import joblib
+
+    from app.models.training import TrainingConfig, update_model
+
+    model, scaler, _ = stack
+    model = copy.deepcopy(model)
+    meta, coef = model.final_estimator_, model.final_estimator_.coef_.copy()
+    trees, rounds = len(model.named_estimators_["rf"].estimators_), model.named_estimators_["xgb"].n_estimators
+    data = _data(stack)
+    fresh = data.take(np.arange(40))
+
+    config = TrainingConfig(threads=1, min_incremental_estimators=5)
+    metrics, model_path, scaler_path = update_model("k2", model, scaler, data, fresh, str(tmp_path), config=config)
+    # A 10% share adds ceil(10% of the trees or rounds), but at least min_incremental_estimators.
+    assert metrics["rf_trees"] == len(model.named_estimators_["rf"].estimators_) == trees + 5
+    assert metrics["xgb_rounds"] == rounds + 5
+    assert model.estimators_[1] is model.named_estimators_["xgb"]
+    assert not model.named_estimators_["rf"].warm_start
+    assert 0 <= metrics["upload_accuracy"] <= 1
+
+    saved = joblib.load(model_path)
+    assert model.final_estimator_ is meta
+    np.testing.assert_array_equal(saved.final_estimator_.coef_, coef)
+    np.testing.assert_array_equal(joblib.load(scaler_path).mean_, scaler.mean_)
+    assert metrics["compiled_max_abs_diff"] <= 1e-6
+
+
+def test_a_large_share_adds_proportionally_more(stack, tmp_path):
+    from app.models.training import TrainingConfig, update_model
+
+    model, scaler, _ = stack
+    model = copy.deepcopy(model)
+    trees = len(model.named_estimators_["rf"].estimators_)
+    data = _data(stack)
+    fresh = data.take(np.arange(len(data)))
+    metrics, _, _ = update_model(
+        "k2", model, scaler, data, fresh, str(tmp_path), config=TrainingConfig(threads=1, min_incremental_estimators=1)
+    )
+    assert metrics["rf_trees"] == 2 * trees
+
+
+@pytest.mark.parametrize("mode, case, reason", [
+    ("full", "same", "requested"),
+    ("auto", "no_previous", "no_previous_model"),
+    ("incremental", "no_previous", "no_previous_model"),
+    ("incremental", "new_class", "new_class"),
+    ("auto", "new_class", "new_class"),
+    ("incremental", "large", None),
+    ("auto", "large", "new_data_fraction"),
+    ("auto", "drifted", "drift"),
+    ("incremental", "drifted", None),
+    ("auto", "few_drifted", None),
+    ("auto", "same", None),
+])
+def test_full_retrain_reason(stack, mode, case, reason):
+    from app.models.training import TrainingConfig, _full_retrain_reason
+
+    model, scaler, _ = stack
+    data = _data(stack)
+    fresh, counts = data.take(np.arange(60)), _counts(60)
+    if case == "new_class":
+        fresh.y[0] = 7
+    elif case == "large":
+        counts = _counts(120)
+    elif case in ("drifted", "few_drifted"):
+        # Five training standard deviations off on every feature.
+        fresh.X[:] += 5 * scaler.scale_
+        if case == "few_drifted":
+            fresh = fresh.take(np.arange(10))
+            counts = _counts(10)
+    previous = None if case == "no_previous" else (model, scaler)
+    config = TrainingConfig(full_retrain_fraction=0.2, drift_threshold=0.5, drift_min_rows=50)
+    assert _full_retrain_reason(mode, counts, previous, fresh, config) == reason
@@ -0,0 +1,80 @@
+"""Training job leases in ``JobStore``: claiming, heartbeats and failing orphaned jobs.
+
+    cd backend && python -m pytest -q tests/test_jobs.py
+"""
+import subprocess
+import sys
+
+import pytest
+
+from app.services import jobs
+from app.services.jobs import JobManager, JobStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 60.0)
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def _age(store: JobStore, job_id: str, seconds: float):
+    """Move the job's start and last heartbeat ``seconds`` into the past."""
+    with store._connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET started_at = started_at - ?, heartbeat_at = heartbeat_at - ? WHERE id = ?",
+            (seconds, seconds, job_id),
+        )
+
+
+def _dead_pid() -> int:
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    return child.pid
+
+
+def test_second_claim_of_a_model_waits(store):
+    first, second, other = store.create("k2"), store.create("k2"), store.create("kepler")
+    assert store.claim(first, "k2")
+    assert not store.claim(second, "k2")
+    assert store.get(second)["status"] == "queued"
+    # Families are leased independently.
+    assert store.claim(other, "kepler")
+    store.finish(first, metrics={"accuracy": 0.9})
+    assert store.claim(second, "k2")
+    assert store.get(second)["status"] == "running"
+
+
+def test_claim_fails_a_job_whose_lease_expired(store):
+    first, second = store.create("k2"), store.create("k2")
+    assert store.claim(first, "k2")
+    _age(store, first, 61)
+    assert store.claim(second, "k2")
+    stale = store.get(first)
+    assert stale["status"] == "failed"
+    assert "lease expired" in stale["error"]
+    assert stale["finished_at"] is not None
+
+
+def test_heartbeat_keeps_the_lease(store):
+    first, second = store.create("k2"), store.create("k2")
+    assert store.claim(first, "k2")
+    _age(store, first, 61)
+    store.heartbeat(first)
+    assert not store.claim(second, "k2")
+    assert store.get(first)["status"] == "running"
+
+
+def test_orphaned_jobs_are_failed_at_startup(store):
+    orphaned, expired, finished = (store.create("k2") for _ in range(3))
+    running = store.create("kepler")
+    with store._connect() as conn:
+        conn.execute("UPDATE jobs SET owner_pid = ? WHERE id = ?", (_dead_pid(), orphaned))
+    assert store.claim(expired, "k2")
+    _age(store, expired, 61)
+    store.finish(finished)
+    assert store.claim(running, "kepler")
+
+    JobManager(store)
+    statuses = {job_id: store.get(job_id)["status"] for job_id in (orphaned, expired, finished, running)}
+    assert statuses == {orphaned: "failed", expired: "failed", finished: "done", running: "running"}
+    assert store.get(orphaned)["error"] == store.get(expired)["error"] == "Interrupted by server restart."
@@ -0,0 +1,152 @@
+"""Similar known planets: the IVF index, its recall report and the route's ``neighbors`` option.
+
+    cd backend && python -m pytest -q tests/test_neighbors.py
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.compiled import save_compiled
+from app.models.neighbors import NPROBE, NeighborIndex, build_index, export_neighbors
+
+
+class _Identity:
+    """Stands in for the scaler: the points are indexed as given."""
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64)
+
+
+def _points(n: int, features: int = 4, seed: int = 0):
+    """``n`` points around a few well separated centres, with string ids."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(scale=10, size=(6, features))
+    X = centres[rng.integers(0, len(centres), n)] + rng.normal(size=(n, features))
+    return X, np.array([f"p{i}" for i in range(n)])
+
+
+def _exact(points, queries, k):
+    d = np.sqrt(((queries[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))
+    order = np.argsort(d, axis=1, kind="stable")[:, :k]
+    return order, np.take_along_axis(d, order, axis=1)
+
+
+def test_index_layout():
+    X, ids = _points(900)
+    arrays = build_index(X, ids)
+    assert len(arrays["centroids"]) == 30
+    offsets = arrays["offsets"]
+    assert offsets[0] == 0 and offsets[-1] == len(X) and np.all(np.diff(offsets) >= 0)
+    assert arrays["points"].dtype == np.float32
+    assert sorted(arrays["ids"].tolist()) == sorted(ids.tolist())
+    # Points are reordered with their ids.
+    position = {name: i for i, name in enumerate(ids)}
+    rows = [position[name] for name in arrays["ids"]]
+    np.testing.assert_allclose(arrays["points"], X[rows].astype(np.float32))
+
+
+def test_exact_query_matches_brute_force():
+    X, ids = _points(900)
+    index = NeighborIndex(build_index(X, ids))
+    queries = _points(50, seed=1)[0]
+    indices, distances = index.query(queries, 5, nprobe=index.cells)
+    expected, expected_distances = _exact(index.points.astype(np.float64), queries, 5)
+    # Distances come from float32 dot products.
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-3, atol=2e-2)
+    assert [set(row) for row in indices.tolist()] == [set(row) for row in expected.tolist()]
+    assert np.all(np.diff(distances, axis=1) >= 0)
+    # An indexed point is its own nearest neighbour.
+    nearest, zero = index.query(index.points[:10], 1, nprobe=index.cells)
+    assert nearest[:, 0].tolist() == list(range(10))
+    np.testing.assert_allclose(zero[:, 0], 0, atol=5e-2)
+
+
+def test_probed_query_stays_close_to_exact():
+    X, ids = _points(2500)
+    index = NeighborIndex(build_index(X, ids))
+    queries = _points(200, seed=2)[0]
+    approx, _ = index.query(queries, 10, nprobe=4)
+    exact, _ = index.query(queries, 10, nprobe=index.cells)
+    found = sum(len(np.intersect1d(a, e)) for a, e in zip(approx, exact))
+    assert found / exact.size > 0.8
+    # k is capped at the number of indexed points.
+    few = NeighborIndex(build_index(X[:3], ids[:3]))
+    assert few.query(queries[:2], 10)[0].shape == (2, 3)
+
+
+def test_export_reports_the_recall_of_the_saved_index(tmp_path):
+    X, ids = _points(1600)
+    y = np.where(np.arange(len(X)) % 4 == 0, 0, 1)
+    path = str(tmp_path / "k2_neighbors")
+    stats = export_neighbors(_Identity(), X, y, ids, path, k=10)
+    index = NeighborIndex.load(path, mmap_mode="r")
+    assert stats["points"] == len(index) == int((y == 1).sum())
+    assert stats["cells"] == index.cells == int(np.sqrt(len(index)))
+    assert stats["nprobe"] == NPROBE
+    assert set(index.ids.tolist()) == set(ids[y == 1].tolist())
+
+    # The same sample export_neighbors draws, checked against a brute-force search.
+    sample = index.points[np.random.default_rng(42).choice(len(index), 500, replace=False)]
+    approx, _ = index.query(sample, 10)
+    exact, _ = _exact(np.asarray(index.points, dtype=np.float64), sample.astype(np.float64), 10)
+    found = sum(len(np.intersect1d(a, e)) for a, e in zip(approx, exact))
+    assert stats["recall_at_10"] == pytest.approx(found / exact.size, abs=2e-3)
+    assert 0 < stats["recall_at_10"] <= 1
+
+
+def test_export_probing_every_cell_has_full_recall(tmp_path):
+    X, ids = _points(40)
+    stats = export_neighbors(_Identity(), X, np.ones(len(X), dtype=int), ids, str(tmp_path / "small"), k=5)
+    assert stats["cells"] <= NPROBE and stats["recall_at_5"] == 1.0
+
+
+def test_export_without_known_planets_writes_nothing(tmp_path):
+    X, ids = _points(20)
+    path = tmp_path / "none"
+    assert export_neighbors(_Identity(), X, np.zeros(len(X), dtype=int), ids, str(path)) is None
+    assert not path.exists()
+
+
+def test_unsupported_index_format_is_refused(tmp_path):
+    X, ids = _points(30)
+    arrays = build_index(X, ids)
+    arrays["format_version"] = np.int32(99)
+    save_compiled(arrays, str(tmp_path / "future"))
+    with pytest.raises(ValueError, match="format 99"):
+        NeighborIndex.load(str(tmp_path / "future"))
+
+
+def _post(client, df: pd.DataFrame, **params):
+    files = {"file": ("upload.csv", df.to_csv(index=False).encode(), "text/csv")}
+    return client.post("/exoplanet/predict", params={"model": "k2", **params}, files=files)
+
+
+def test_route_without_an_index_answers_409(client, k2_upload):
+    response = _post(client, k2_upload, neighbors=3)
+    assert response.status_code == 409
+    assert "neighbour index" in response.json()["detail"]
+    assert _post(client, k2_upload, neighbors=3, output="csv").status_code == 400
+    assert _post(client, k2_upload, neighbors=10_000).status_code == 400
+
+
+def test_route_returns_neighbors_from_the_index(client, k2_upload, monkeypatch):
+    from app.routes import exoplanet
+
+    handler = exoplanet.registries["k2"]._current.model
+    points, ids = _points(60, features=len(handler.metadata.input_features))
+    monkeypatch.setattr(handler, "neighbors", NeighborIndex(build_index(points, ids)))
+    for output in ("json", "ndjson"):
+        response = _post(client, k2_upload, neighbors=3, output=output)
+        assert response.status_code == 200
+        if output == "json":
+            records = response.json()["results"]
+        else:
+            records = [json.loads(line) for line in response.text.splitlines()[:-1]]
+        assert len(records) == len(k2_upload)
+        for record in records:
+            assert len(record["neighbors"]) == 3
+            assert {n["id"] for n in record["neighbors"]} <= set(ids.tolist())
+            distances = [n["distance"] for n in record["neighbors"]]
+            assert distances == sorted(distances)
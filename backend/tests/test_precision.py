@@ -0,0 +1,55 @@
+"""float32 serving: quantized thresholds, the load-time agreement check and its float64 fallback.
+
+    cd backend && python -m pytest -q tests/test_precision.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _handlers(bundle, quantize="float32"):
+    from app.models.model_handler import ExoplanetModel
+
+    return ExoplanetModel(bundle, precision="float64"), ExoplanetModel(bundle, precision="float32", quantize=quantize)
+
+
+def _proba(handler, X):
+    return handler.predict_proba(handler._transform(X.astype(handler.dtype)))
+
+
+def test_float32_serving_matches_float64(stack, bundle):
+    from app.data.validation import PREDICT_SCHEMAS_BY_PRECISION
+
+    _, _, X = stack
+    reference, handler = _handlers(bundle)
+    assert reference.check_precision(pd.DataFrame(X)) is None
+    assert (handler.precision, handler.dtype) == ("float32", np.float32)
+    assert handler.model.arrays["rf_threshold"].dtype == np.float32
+
+    report = handler.check_precision(pd.DataFrame(X), min_agreement=0.99)
+    assert report["fallback"] is False
+    assert report == handler.precision_check
+    assert report["rows"] == len(X) and report["agreement"] >= 0.99 and report["quantize"] == "float32"
+    # Still float32 after the check, so uploads are parsed straight into float32 columns.
+    assert handler.precision == "float32"
+    assert PREDICT_SCHEMAS_BY_PRECISION[handler.precision]["k2"].float_dtype == np.float32
+    np.testing.assert_allclose(_proba(handler, X), _proba(reference, X), rtol=0, atol=1e-4)
+
+
+@pytest.mark.parametrize("quantize", ["none", "float16"])
+def test_precision_drift_falls_back_to_float64(stack, bundle, quantize):
+    from app.data.validation import PREDICT_SCHEMAS_BY_PRECISION
+    from app.models.compiled import TOLERANCE
+
+    _, _, X = stack
+    reference, handler = _handlers(bundle, quantize)
+    # Any disagreement at all is over the tolerance.
+    report = handler.check_precision(pd.DataFrame(X), min_agreement=1.01)
+    assert report["fallback"] is True
+    assert report["min_agreement"] == 1.01
+    assert (handler.precision, handler.dtype) == ("float64", np.float64)
+    assert PREDICT_SCHEMAS_BY_PRECISION[handler.precision]["k2"].float_dtype == np.float64
+    assert handler.model.arrays["rf_threshold"].dtype == np.float64
+    np.testing.assert_allclose(_proba(handler, X), _proba(reference, X), rtol=0, atol=TOLERANCE)
+    # The check runs once; the float64 reference is not kept around after it.
+    assert handler.check_precision(pd.DataFrame(X)) is None
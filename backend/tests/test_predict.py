@@ -0,0 +1,247 @@
+"""Regression tests for the prediction path: compiled vs pickled model parity and streamed uploads.
+
+    cd backend && python -m pytest -q tests
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.mark.parametrize("suffix", ["", ".npz"])
+def test_compiled_matches_sklearn(stack, tmp_path, suffix):
+    from app.models.compiled import TOLERANCE, CompiledEnsemble, export_compiled
+
+    model, scaler, X = stack
+    path = str(tmp_path / f"model_compiled{suffix}")
+    assert export_compiled(model, scaler, path, X_check=X) <= TOLERANCE
+    compiled = CompiledEnsemble.load(path)
+    scaled = scaler.transform(X)
+    np.testing.assert_allclose(compiled.predict_proba(scaled), model.predict_proba(scaled), rtol=0, atol=TOLERANCE)
+    np.testing.assert_array_equal(compiled.predict(scaled), model.predict(scaled))
+
+
+def test_compiled_handler_matches_pickle(stack, bundle, tmp_path):
+    import joblib
+
+    from app.models.compiled import TOLERANCE
+    from app.models.model_handler import ExoplanetModel
+
+    model, scaler, X = stack
+    joblib.dump(model, tmp_path / "model.pkl")
+    joblib.dump(scaler, tmp_path / "scaler.pkl")
+    pickled = ExoplanetModel(str(tmp_path / "model.pkl"), str(tmp_path / "scaler.pkl"), precision="float64")
+    compiled = ExoplanetModel(bundle, precision="float64")
+    expected = pickled.predict_proba(pickled._transform(X))
+    got = compiled.predict_proba(compiled._transform(X))
+    np.testing.assert_allclose(got, expected, rtol=0, atol=TOLERANCE)
+
+
+
+# --- single-pass stacking (user-006) ---
+
+def test_single_pass_matches_stacking_for_binary_and_passthrough(stack, tmp_path):
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier, StackingClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import LinearSVC
+
+    from app.models.model_handler import ExoplanetModel
+
+    _, scaler, X = stack
+    scaled = scaler.transform(X)
+    # A forest's binary probabilities lose their first column and LinearSVC's 1-D decision function
+    # becomes a single column, then the raw features follow.
+    binary = StackingClassifier(
+        estimators=[("rf", RandomForestClassifier(n_estimators=5, random_state=0)), ("svc", LinearSVC())],
+        final_estimator=LogisticRegression(max_iter=1000),
+        passthrough=True,
+        cv=3,
+    ).fit(scaled, scaled[:, 0] > 0)
+    joblib.dump(binary, tmp_path / "model.pkl")
+    handler = ExoplanetModel(str(tmp_path / "model.pkl"), precision="float64")
+    np.testing.assert_allclose(handler.predict_proba(scaled), binary.predict_proba(scaled), rtol=0, atol=1e-12)
+
+
+def test_base_estimators_share_the_thread_budget(stack, tmp_path, monkeypatch):
+    import joblib
+
+    from app.models import model_handler
+    from app.models.model_handler import ExoplanetModel
+
+    model, scaler, _ = stack
+    joblib.dump(model, tmp_path / "model.pkl")
+    joblib.dump(scaler, tmp_path / "scaler.pkl")
+    for budget, per_estimator in ((8, 4), (3, 1), (1, 1)):
+        monkeypatch.setattr(model_handler, "BASE_ESTIMATOR_JOBS", budget)
+        handler = ExoplanetModel(str(tmp_path / "model.pkl"), str(tmp_path / "scaler.pkl"), precision="float64")
+        assert [est.n_jobs for est in handler.model.estimators_] == [per_estimator] * 2
+
+
+# --- streamed predictions (user-001) ---
+
+def _post(client, df: pd.DataFrame, **params):
+    files = {"file": ("upload.csv", df.to_csv(index=False).encode(), "text/csv")}
+    return client.post("/exoplanet/predict", params={"model": "k2", **params}, files=files)
+
+
+def _served(model: str = "k2"):
+    from app.routes import exoplanet
+
+    return exoplanet.registries[model]._current
+
+
+def _record_chunks(monkeypatch):
+    """Wrap the served k2 handler's scoring to record each chunk's size and the slots held meanwhile."""
+    from app.services.executors import inference_executor
+
+    loaded = _served()
+    score = loaded.model._score
+    seen = []
+
+    def recording(df, *args, **kwargs):
+        seen.append((len(df), inference_executor.in_flight, loaded.in_flight))
+        return score(df, *args, **kwargs)
+
+    monkeypatch.setattr(loaded.model, "_score", recording)
+    return seen
+
+
+def _assert_released():
+    from app.services.executors import inference_executor
+
+    assert inference_executor.in_flight == 0
+    assert _served().in_flight == 0
+
+
+@pytest.mark.parametrize("output", ["ndjson", "csv"])
+def test_stream_is_scored_in_chunks_and_ends_with_a_summary(client, k2_upload, monkeypatch, output):
+    df = pd.concat([k2_upload] * 10, ignore_index=True)
+    seen = _record_chunks(monkeypatch)
+    response = _post(client, df, output=output, chunksize=4)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith({"ndjson": "application/x-ndjson", "csv": "text/csv"}[output])
+    assert [size for size, _, _ in seen] == [4] * 12 + [2]
+
+    lines = response.text.splitlines()
+    if output == "ndjson":
+        records = [json.loads(line) for line in lines[:-1]]
+        trailer = json.loads(lines[-1])
+        assert [record["id"] for record in records] == df["pl_name"].tolist()
+        assert all(len(record["probability"]) == 3 for record in records)
+    else:
+        assert lines[0].split(",") == ["id", "prediction", "confidence"] + [
+            f"probability_{label}" for label in ("candidate", "confirmed", "false_positive")
+        ]
+        rows = lines[1:-1]
+        assert [row.split(",")[0] for row in rows] == df["pl_name"].tolist()
+        assert lines[-1].startswith("# summary: ")
+        trailer = {"summary": json.loads(lines[-1].removeprefix("# summary: "))}
+    summary = trailer["summary"]
+    assert summary["total"] == len(df)
+    assert summary["candidate"] + summary["confirmed"] + summary["false_positive"] == len(df)
+
+
+@pytest.mark.parametrize("output", ["ndjson", "csv"])
+def test_stream_ends_with_an_error_after_a_partial_body(client, k2_upload, output):
+    df = pd.concat([k2_upload] * 4, ignore_index=True)
+    df.loc[10, "pl_rade"] = "abc"
+    response = _post(client, df, output=output, chunksize=4)
+    # The status line went out with the first chunk.
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    if output == "ndjson":
+        assert [json.loads(line)["id"] for line in lines[:-1]] == df["pl_name"].tolist()[:8]
+        error = json.loads(lines[-1])["error"]
+    else:
+        assert len(lines[1:-1]) == 8
+        assert lines[-1].startswith("# error: ")
+        error = json.loads(lines[-1].removeprefix("# error: "))
+    assert [(cell["row"], cell["column"]) for cell in error["row_errors"]] == [(10, "pl_rade")]
+    _assert_released()
+
+
+def test_stream_releases_its_slot_and_lease(client, k2_upload, monkeypatch):
+    seen = _record_chunks(monkeypatch)
+    response = _post(client, pd.concat([k2_upload] * 3, ignore_index=True), output="ndjson", chunksize=5)
+    assert response.status_code == 200
+    # Every chunk was scored under the stream's one inference slot and one lease, both returned afterwards.
+    assert seen == [(5, 1, 1)] * 3
+    _assert_released()
+    # A stream that fails before its body starts releases them too.
+    response = _post(client, k2_upload.drop(columns=["pl_rade"]), output="ndjson", chunksize=5)
+    assert response.status_code == 400
+    _assert_released()
+
+
+# --- upload options (user-005) ---
+
+@pytest.mark.parametrize("output", ["xml", "JSON", ""])
+def test_unknown_output_is_rejected(client, k2_upload, output):
+    response = _post(client, k2_upload, output=output)
+    assert response.status_code == 400
+    assert "output must be one of" in response.json()["detail"]
+    _assert_released()
+
+
+# --- multi-model routing (user-021) ---
+
+def _post_multi(client, df: pd.DataFrame, **params):
+    files = {"file": ("upload.csv", df.to_csv(index=False).encode(), "text/csv")}
+    return client.post("/exoplanet/predict/multi", params=params, files=files)
+
+
+def test_mixed_upload_is_routed_by_filled_columns(client, k2_upload, kepler_upload):
+    # The other model's cells are left empty.
+    df = pd.concat([kepler_upload, k2_upload], ignore_index=True)
+    response = _post_multi(client, df)
+    assert response.status_code == 200
+    models = response.json()["models"]
+    assert models["kepler"]["rows"] == list(range(len(kepler_upload)))
+    assert models["k2"]["rows"] == list(range(len(kepler_upload), len(df)))
+    assert [r["id"] for r in models["kepler"]["results"]] == kepler_upload["kepid"].tolist()
+    assert [r["id"] for r in models["k2"]["results"]] == k2_upload["pl_name"].tolist()
+    assert models["k2"]["summary"]["total"] == len(k2_upload)
+
+
+def test_upload_is_routed_by_discriminator(client, k2_upload, kepler_upload):
+    df = pd.concat([k2_upload, kepler_upload], ignore_index=True)
+    df["family"] = ["K2"] * len(k2_upload) + ["kepler"] * len(kepler_upload)
+    response = _post_multi(client, df, models="k2,kepler", discriminator="family")
+    assert response.status_code == 200
+    models = response.json()["models"]
+    assert models["k2"]["rows"] == list(range(len(k2_upload)))
+    assert models["kepler"]["rows"] == list(range(len(k2_upload), len(df)))
+    # Only the named model gets a row, so a single-model upload yields a single entry.
+    response = _post_multi(client, df.iloc[:len(k2_upload)], models="k2,kepler", discriminator="family")
+    assert list(response.json()["models"]) == ["k2"]
+
+
+def test_failing_model_waits_for_the_others_before_releasing(client, k2_upload, kepler_upload, monkeypatch):
+    import threading
+    import time
+
+    failed = threading.Event()
+    leases = []
+
+    def fail(*args, **kwargs):
+        failed.set()
+        raise RuntimeError("kepler broke")
+
+    def slow(*args, **kwargs):
+        failed.wait(5)
+        time.sleep(0.2)
+        # Still scoring with the k2 model: its lease must not have been returned yet.
+        leases.append(_served("k2").in_flight)
+        return predict_csv(*args, **kwargs)
+
+    monkeypatch.setattr(_served("kepler").model, "predict_csv", fail)
+    predict_csv = _served("k2").model.predict_csv
+    monkeypatch.setattr(_served("k2").model, "predict_csv", slow)
+    response = _post_multi(client, pd.concat([kepler_upload, k2_upload], ignore_index=True))
+    assert response.status_code == 500
+    assert "kepler broke" in response.json()["detail"]
+    assert leases == [1]
+    _assert_released()
+    assert _served("kepler").in_flight == 0
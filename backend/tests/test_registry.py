@@ -0,0 +1,95 @@
+"""Version leasing and unloading in ``ModelRegistry``.
+
+    cd backend && python -m pytest -q tests/test_registry.py
+"""
+import numpy as np
+import pytest
+
+from app.models import registry
+from app.models.registry import ModelRegistry, _LoadedVersion
+from app.models.result_cache import result_cache
+
+
+class _Model:
+    """Stands in for an ``ExoplanetModel``: the registry only reads ``cache_namespace`` from it."""
+
+    def __init__(self, version: str):
+        self.cache_namespace = f"k2:{version}:test"
+
+
+@pytest.fixture
+def models(monkeypatch):
+    monkeypatch.setattr(registry, "POLL_SECONDS", 3600.0)
+    monkeypatch.setattr(registry, "PINNED_VERSIONS", 2)
+    models = ModelRegistry("k2")
+    # Pinned versions load without touching the disk.
+    monkeypatch.setattr(models, "_load", lambda version, check=True: _LoadedVersion(version, _Model(version)))
+    models._swap(_LoadedVersion("v1", _Model("v1")))
+    return models
+
+
+def _cache(namespace: str):
+    result_cache.put_many(namespace, [(1, 2)], np.array([[0.2, 0.3, 0.5]]))
+
+
+def _cached(namespace: str) -> bool:
+    return len(result_cache.get_many(namespace, [(1, 2)], 3)[1]) == 0
+
+
+def test_superseded_version_is_unloaded_when_drained(models):
+    _cache("k2:v1:test")
+    with models.acquire() as model:
+        assert model.cache_namespace == "k2:v1:test"
+        models._swap(_LoadedVersion("v2", _Model("v2")))
+        # Still serving the request that started on v1.
+        assert list(models._loaded) == ["v1", "v2"]
+        with models.acquire() as newer:
+            assert newer.cache_namespace == "k2:v2:test"
+    assert list(models._loaded) == ["v2"]
+    assert models.current_version == "v2"
+    if result_cache.enabled:
+        assert not _cached("k2:v1:test")
+
+
+def test_idle_superseded_version_is_unloaded_at_swap(models):
+    models._swap(_LoadedVersion("v2", _Model("v2")))
+    assert list(models._loaded) == ["v2"]
+
+
+def test_superseded_version_is_not_kept_as_pinned(models):
+    with models.acquire("v1"):
+        models._swap(_LoadedVersion("v2", _Model("v2")))
+    assert list(models._loaded) == ["v2"]
+
+
+def test_pinned_versions_are_kept_least_recently_used_first(models):
+    for version in ("p1", "p2"):
+        with models.acquire(version):
+            pass
+    assert list(models._loaded) == ["v1", "p1", "p2"]
+    with models.acquire("p1"):
+        pass
+    with models.acquire("p3"):
+        pass
+    assert list(models._loaded) == ["v1", "p1", "p3"]
+    assert all(models._loaded[v].pinned for v in ("p1", "p3"))
+    assert not models._loaded["v1"].pinned
+
+
+def test_ready_does_not_start_a_load(client, monkeypatch):
+    from app.routes import exoplanet
+
+    loading = ModelRegistry("kepler")
+    reloads = []
+    monkeypatch.setattr(loading, "reload", lambda wait=False: reloads.append(wait))
+    monkeypatch.setitem(exoplanet.registries, "kepler", loading)
+    response = client.get("/exoplanet/ready")
+    assert response.status_code == 503
+    body = response.json()
+    assert body["ready"] is False
+    assert body["models"]["kepler"]["status"] == "loading"
+    assert body["models"]["k2"]["status"] == "ready"
+    assert reloads == []
+
+    monkeypatch.setitem(exoplanet.registries, "kepler", exoplanet.registries["k2"])
+    assert client.get("/exoplanet/ready").json()["ready"] is True
@@ -0,0 +1,90 @@
+"""Per-row result cache: digests, hits and misses, namespaces, spill and bypass.
+
+    cd backend && python -m pytest -q tests/test_result_cache.py
+"""
+import numpy as np
+
+from app.models.result_cache import ResultCache, row_digests
+
+
+def _keys(X):
+    return list(zip(*(h.tolist() for h in row_digests(X))))
+
+
+def _rows(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    probas = rng.dirichlet(np.ones(3), size=n)
+    return X, probas
+
+
+def test_row_digests_are_stable_and_distinct():
+    X, _ = _rows(100)
+    assert _keys(X) == _keys(X.copy())
+    assert len(set(_keys(X))) == len(X)
+    assert _keys(np.array([[0.0, 1.0]])) == _keys(np.array([[-0.0, 1.0]]))
+    assert _keys(X.astype(np.float32)) == _keys(X.astype(np.float32).astype(np.float64))
+
+
+def test_cache_hits_and_misses():
+    cache = ResultCache(max_rows=100)
+    X, probas = _rows(10)
+    keys = _keys(X)
+    namespace = "k2:v1:0123456789ab:float64"
+
+    got, missing = cache.get_many(namespace, keys, 3)
+    assert missing.tolist() == list(range(10))
+    cache.put_many(namespace, [keys[i] for i in missing], probas[missing])
+
+    X2, probas2 = _rows(5, seed=1)
+    got, missing = cache.get_many(namespace, keys + _keys(X2), 3)
+    assert missing.tolist() == list(range(10, 15))
+    np.testing.assert_array_equal(got[:10], probas)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["rows"]) == (10, 15, 10)
+
+
+def test_cache_namespaces_isolate_versions_and_etags():
+    cache = ResultCache(max_rows=100)
+    X, probas = _rows(6)
+    keys = _keys(X)
+    old, rebuilt = "kepler:v3:aaaaaaaaaaaa:float64", "kepler:v3:bbbbbbbbbbbb:float64"
+    cache.put_many(old, keys, probas)
+
+    # A rebuilt version has a new etag, hence a new namespace: nothing cached for the old artifacts is served.
+    assert len(cache.get_many(rebuilt, keys, 3)[1]) == len(keys)
+    assert len(cache.get_many("kepler:v3:aaaaaaaaaaaa:float32", keys, 3)[1]) == len(keys)
+    cache.put_many(rebuilt, keys, probas)
+
+    cache.invalidate(old)
+    assert len(cache.get_many(old, keys, 3)[1]) == len(keys)
+    assert len(cache.get_many(rebuilt, keys, 3)[1]) == 0
+    cache.invalidate()
+    assert cache.stats()["rows"] == 0
+
+
+def test_cache_spills_evicted_rows(tmp_path):
+    cache = ResultCache(max_rows=4, spill_path=str(tmp_path / "spill.sqlite3"))
+    X, probas = _rows(10)
+    keys = _keys(X)
+    namespace = "k2:v1:0123456789ab:float64"
+    cache.put_many(namespace, keys, probas)
+    stats = cache.stats()
+    assert (stats["rows"], stats["spilled"], stats["spill_rows"]) == (4, 6, 6)
+
+    got, missing = cache.get_many(namespace, keys, 3)
+    assert missing.size == 0
+    np.testing.assert_array_equal(got, probas)
+    stats = cache.stats()
+    assert (stats["hits"], stats["spill_hits"]) == (4, 6)
+
+    cache.invalidate(namespace)
+    assert cache.stats()["spill_rows"] == 0
+    assert len(cache.get_many(namespace, keys, 3)[1]) == len(keys)
+
+
+def test_cache_bypasses_batches_larger_than_capacity():
+    cache = ResultCache(max_rows=8)
+    assert cache.accepts(8)
+    assert not cache.accepts(9)
+    assert cache.stats()["bypassed"] == 9
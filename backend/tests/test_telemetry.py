@@ -0,0 +1,50 @@
+"""Kept request profiles: eviction and the locked accessors the metrics routes read them through.
+
+    cd backend && python -m pytest -q tests/test_telemetry.py
+"""
+import threading
+
+from app.services import telemetry
+
+
+def _summary(route: str) -> dict:
+    return {"method": "POST", "route": route, "status": 200, "elapsed_seconds": 0.1}
+
+
+def test_profiles_are_listed_newest_first_and_evicted(monkeypatch):
+    monkeypatch.setattr(telemetry, "_profiles", type(telemetry._profiles)())
+    monkeypatch.setattr(telemetry, "PROFILE_KEEP", 2)
+    for i in range(3):
+        telemetry._keep_profile(f"p{i}", _summary(f"/r{i}"))
+    assert [profile_id for profile_id, _ in telemetry.list_profiles()] == ["p2", "p1"]
+    assert telemetry.get_profile("p1")["route"] == "/r1"
+    assert telemetry.get_profile("p0") is None
+
+
+def test_profiles_can_be_read_while_kept(monkeypatch):
+    monkeypatch.setattr(telemetry, "_profiles", type(telemetry._profiles)())
+    monkeypatch.setattr(telemetry, "PROFILE_KEEP", 5)
+    done = threading.Event()
+    errors = []
+
+    def keep():
+        for i in range(2000):
+            telemetry._keep_profile(f"p{i}", _summary("/r"))
+        done.set()
+
+    def read():
+        try:
+            while not done.is_set():
+                listed = telemetry.list_profiles()
+                assert len(listed) <= 5
+                for profile_id, _ in listed:
+                    telemetry.get_profile(profile_id)
+        except Exception as e:  # e.g. "OrderedDict mutated during iteration"
+            errors.append(e)
+
+    threads = [threading.Thread(target=keep), threading.Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
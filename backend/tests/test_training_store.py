@@ -0,0 +1,84 @@
+"""Training store: seeding, upserts by key, live masks and compaction.
+
+    cd backend && python -m pytest -q tests/test_training_store.py
+"""
+import pandas as pd
+import pytest
+
+from app.models.training_store import TrainingStore
+
+
+@pytest.fixture
+def store(tmp_path, k2_upload):
+    seed = k2_upload.iloc[:4].copy()
+    seed["pl_name"] = ["a", "b", "c", "d"]
+    seed["target"] = ["0", "1", "2", "1"]
+    seed = pd.concat([seed, seed.iloc[[1]]], ignore_index=True)  # an exact duplicate row
+    path = tmp_path / "seed.csv"
+    seed.to_csv(path, index=False)
+    return TrainingStore("k2", seed_path=str(path), path=str(tmp_path / "store"))
+
+
+def _upload(store, names, targets):
+    """Upload rows: a stored name keeps its stored values, a new name copies the first stored row."""
+    stored = store.frame()
+    position = {name: i for i, name in enumerate(stored["pl_name"])}
+    rows = stored.iloc[[position.get(name, 0) for name in names]].reset_index(drop=True)
+    rows["pl_name"], rows["target"] = names, targets
+    return rows
+
+
+def test_store_seeds_without_duplicates(store):
+    data = store.load()
+    assert len(store) == len(data) == 4
+    assert sorted(data.ids.tolist()) == ["a", "b", "c", "d"]
+    assert data.X.shape == (4, len(store.features))
+
+
+def test_store_upserts_by_key(store):
+    fresh, counts = store.append(_upload(store, ["b", "e"], [2, 0]))
+    assert counts == {"added": 1, "updated": 1, "unchanged": 0, "fresh_rows": 2, "store_rows": 5}
+    assert sorted(fresh["pl_name"]) == ["b", "e"]
+
+    data = store.load()
+    labels = dict(zip(data.ids.tolist(), data.y.tolist()))
+    assert labels == {"a": 0, "b": 2, "c": 2, "d": 1, "e": 0}
+
+    # The replaced seed row is masked out, not deleted: the seed segment stays on disk.
+    manifest = store._read_manifest()
+    seed_segment = manifest["segments"][0]
+    live = store._array(seed_segment, seed_segment["live"])
+    assert live.tolist() == [True, False, True, True]
+
+
+def test_store_skips_unchanged_rows(store):
+    rows = _upload(store, ["a", "c"], [0, 2])
+    fresh, counts = store.append(rows)
+    assert len(fresh) == 0
+    assert counts["unchanged"] == 2 and counts["store_rows"] == 4
+    assert len(store._read_manifest()["segments"]) == 1
+
+    rows.loc[1, "pl_orbper"] = 123.0
+    fresh, counts = store.append(rows)
+    assert fresh["pl_name"].tolist() == ["c"]
+    assert (counts["unchanged"], counts["updated"]) == (1, 1)
+
+
+def test_store_rejects_unknown_labels(store):
+    with pytest.raises(ValueError, match="target"):
+        store.append(_upload(store, ["z"], [7]))
+    assert len(store) == 4
+
+
+def test_store_compacts_to_one_live_segment(store):
+    for i in range(3):
+        rows = _upload(store, ["a"], [0])
+        rows["pl_orbper"] = float(i + 1)
+        store.append(rows)
+    before = store.load(mmap=False)
+    store.compact()
+    manifest = store._read_manifest()
+    assert len(manifest["segments"]) == 1
+    after = store.load()
+    assert sorted(after.ids.tolist()) == sorted(before.ids.tolist())
+    assert store._array(manifest["segments"][0], manifest["segments"][0]["live"]).all()
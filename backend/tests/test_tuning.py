@@ -0,0 +1,47 @@
+"""Successive-halving search: rung bookkeeping on a worker pool and the CPU budget that stops it.
+
+    cd backend && python -m pytest -q tests/test_tuning.py
+"""
+import pytest
+
+SPACE = {
+    "rf": {"n_estimators": [5, 10], "max_depth": [3, 5]},
+    "xgb": {"n_estimators": [5, 10], "max_depth": [2, 3]},
+}
+
+
+@pytest.fixture(scope="module")
+def rows():
+    pytest.importorskip("sklearn")
+    pytest.importorskip("xgboost")
+    from sklearn.datasets import make_classification
+
+    return make_classification(n_samples=1800, n_features=6, n_informative=4, n_classes=3, random_state=0)
+
+
+def test_search_runs_every_rung(rows):
+    from app.models import tuning
+
+    X, y = rows
+    current = {"rf": {"n_estimators": 5, "max_depth": 3}, "xgb": {"n_estimators": 5, "max_depth": 2}}
+    report = tuning.tune(X, y, current["rf"], current["xgb"], cv=3, candidates=4, eta=2, cpu_seconds=600,
+                         workers=2, threads=2, space=SPACE)
+    assert report["budget_exhausted"] is False
+    assert report["candidates"] == 4 and report["grid_size"] == 16
+    assert [rung["candidates"] for rung in report["rungs"]] == [4, 2, 1]
+    assert report["rungs"][-1]["rows"] == len(y)
+    assert report["current"]["rf"] == current["rf"]
+    assert 0 < report["best"]["score"] <= 1
+
+
+def test_budget_stops_the_search(rows, monkeypatch):
+    from app.models import tuning
+
+    monkeypatch.setattr(tuning, "POLL_SECONDS", 0.05)
+    X, y = rows
+    report = tuning.tune(X, y, {"n_estimators": 5}, {"n_estimators": 5}, cv=3, candidates=6, eta=2,
+                         cpu_seconds=1e-3, workers=2, threads=2, space=SPACE)
+    # The first evaluations to finish are kept; the rest are killed instead of awaited.
+    assert report["budget_exhausted"] is True
+    assert len(report["rungs"]) == 1
+    assert 1 <= report["rungs"][0]["evaluated"] < report["candidates"]
@@ -0,0 +1,92 @@
+"""Upload validation: typed parsing per precision, capped error reports and upload row numbers.
+
+    cd backend && python -m pytest -q tests/test_validation.py
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.data.validation import (
+    MAX_REPORTED_ERRORS, PREDICT_SCHEMAS, PREDICT_SCHEMAS_BY_PRECISION, ErrorReport, SchemaError,
+)
+
+
+def _csv(df: pd.DataFrame) -> io.BytesIO:
+    return io.BytesIO(df.to_csv(index=False).encode())
+
+
+def _tile(df: pd.DataFrame, copies: int) -> pd.DataFrame:
+    return pd.concat([df] * copies, ignore_index=True)
+
+
+def _schema_error(fn) -> dict:
+    with pytest.raises(SchemaError) as info:
+        fn()
+    assert isinstance(info.value.detail, dict)
+    return info.value.detail
+
+
+@pytest.mark.parametrize("precision, dtype", [("float64", np.float64), ("float32", np.float32)])
+def test_valid_upload_parses_in_each_precision(k2_upload, precision, dtype):
+    schema = PREDICT_SCHEMAS_BY_PRECISION[precision]["k2"]
+    df = schema.read_csv(_csv(k2_upload))
+    assert list(df.columns) == schema.columns
+    assert len(df) == len(k2_upload)
+    assert all(df[col].dtype == dtype for col in schema.numeric_columns)
+
+
+def test_error_report_is_capped_with_exact_counts(k2_upload):
+    df = _tile(k2_upload, 40)
+    bad = np.arange(3, len(df), 2)
+    assert len(bad) > MAX_REPORTED_ERRORS
+    df.loc[bad, "pl_rade"] = "abc"
+
+    detail = _schema_error(lambda: PREDICT_SCHEMAS["k2"].read_csv(_csv(df)))
+    assert detail["error_count"] == len(bad)
+    assert detail["column_errors"] == {"pl_rade": len(bad)}
+    assert detail["truncated"] is True
+    assert len(detail["row_errors"]) == MAX_REPORTED_ERRORS
+    assert [cell["row"] for cell in detail["row_errors"]] == bad[:MAX_REPORTED_ERRORS].tolist()
+    assert {(cell["column"], cell["error"], cell["value"]) for cell in detail["row_errors"]} == {
+        ("pl_rade", "not numeric", "abc")
+    }
+
+
+def test_error_report_limit():
+    report = ErrorReport(limit=2)
+    report.add(np.array([4, 7, 9]), "a", "missing")
+    report.add(np.array([1]), "b", "not finite")
+    detail = _schema_error(report.raise_if_any)
+    assert detail["error_count"] == 4
+    assert detail["column_errors"] == {"a": 3, "b": 1}
+    assert [cell["row"] for cell in detail["row_errors"]] == [4, 7]
+    assert detail["truncated"] is True
+    ErrorReport().raise_if_any()
+
+
+@pytest.mark.parametrize("chunksize", [None, 4])
+def test_error_rows_are_upload_rows(k2_upload, chunksize):
+    df = _tile(k2_upload, 3)
+    df.loc[10, "sy_dist"] = "inf"
+    df.loc[13, "pl_name"] = ""
+
+    def read():
+        result = PREDICT_SCHEMAS["k2"].read_csv(_csv(df), chunksize=chunksize)
+        if chunksize is not None:
+            for _ in result:
+                pass
+
+    detail = _schema_error(read)
+    cells = {(cell["row"], cell["column"], cell["error"]) for cell in detail["row_errors"]}
+    if chunksize is None:
+        assert cells == {(10, "sy_dist", "not finite"), (13, "pl_name", "missing")}
+    else:
+        # Chunks are validated one at a time, so only the first bad chunk is reported.
+        assert cells == {(10, "sy_dist", "not finite")}
+
+
+def test_missing_column_is_a_schema_error(k2_upload):
+    with pytest.raises(SchemaError, match="pl_rade"):
+        PREDICT_SCHEMAS["k2"].read_csv(_csv(k2_upload.drop(columns=["pl_rade"])))